@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк повторного подбора порога сопоставления с ОКПДТР (misc/candidates.py):
+полное сопоставление при каждом пороге против выбора кода по сохраненным k лучшим кандидатам.
+Результаты обоих способов сравниваются поэлементно.
+
+Запуск из корня проекта: python -m bench.bench_candidates [число вакансий] [число наименований ОКПДТР] [k]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+import misc.candidates as candidates_
+import misc.codes as codes
+import misc.jobs as jobs_
+import misc.okpdtr as okpdtr
+from bench.synthetic import make_okpdtr, make_pages
+
+# пороги сопоставления с ОКПДТР (similarity_level_okpdtr), которые перебирает аналитик
+LEVELS = [70, 75, 79, 85, 90]
+
+
+def main(vacancies, names, k):
+    ids, okpdtr_names = make_okpdtr(names)
+    records = [v['vacancy'] for page in make_pages(vacancies) for v in page]
+    jobs = jobs_.JobNormalizer().normalize_column([v['job-name'] for v in records])
+    matcher = okpdtr.OkpdtrMatcher(pd.DataFrame({'id': ids, 'name': okpdtr_names}))
+
+    start = time.perf_counter()
+    expected = {level: matcher.match(jobs, level / 100.0) for level in LEVELS}
+    match_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = matcher.top_many(jobs, k, min(okpdtr.TOP_MIN_SCORE, min(LEVELS) / 100.0))
+    table = candidates_.frame([v['id'] for v in records], 'okpdtr', found)
+    top_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = {level: candidates_.rethreshold(table, 0, level) for level in LEVELS}
+    rethreshold_time = time.perf_counter() - start
+
+    same = True
+    for level in LEVELS:
+        codes_by_id = got[level].set_index('id')['id_okpdtr']
+        result = codes_by_id.reindex([v['id'] for v in records]).tolist()
+        same &= codes.normalize_code(pd.Series(expected[level])).fillna('').tolist() == pd.Series(result).fillna('').tolist()
+    print(f"вакансий: {vacancies}, наименований ОКПДТР: {names}, порогов: {len(LEVELS)}, кандидатов: {k}")
+    print(f"сопоставление при каждом пороге: {match_time:.2f} с")
+    print(f"кандидаты (один раз): {top_time:.2f} с, выбор кодов по порогам: {rethreshold_time:.2f} с")
+    print(f"результаты совпадают: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 7000,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 5)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Микро-бенчмарк нормализации столбцов с кодами:
+прежние astype('str') + apply(re.split) + replace({'nan': np.nan}) по всей таблице
+против misc.codes.normalize_codes.
+
+Запуск из корня проекта: python -m bench.bench_codes [число строк]
+"""
+
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import misc.codes as codes
+
+COLUMNS = ['region_code', 'ogrn', 'id_mrigo', 'id_okpdtr']
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(10000, 20000, rows).astype(float)
+    ids[rng.random(rows) < 0.2] = np.nan
+    return pd.DataFrame({
+        'region_code': np.where(rng.random(rows) < 0.5, '5400000000000', '5400000000000.0'),
+        'ogrn': (1025400000000 + rng.integers(0, 5000, rows)).astype(float),
+        'id_mrigo': rng.integers(1, 40, rows).astype(float),
+        'id_okpdtr': ids,
+        'duty': ['Текст обязанностей ' * 20] * rows,
+        'qualification': ['Текст требований ' * 10] * rows,
+    })
+
+
+def old_normalize(frame):
+    frame = frame.astype({column: 'str' for column in COLUMNS})
+    for column in COLUMNS:
+        frame[column] = frame[column].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
+    return frame.replace({'nan': np.nan})
+
+
+def main(rows):
+    frame = make_frame(rows)
+    start = time.perf_counter()
+    expected = old_normalize(frame)
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    got = codes.normalize_codes(frame, COLUMNS)
+    new_time = time.perf_counter() - start
+    same = all(
+        expected[column].fillna('<NA>').tolist() == got[column].fillna('<NA>').astype(str).tolist()
+        for column in COLUMNS)
+    print(f"строк: {rows}")
+    print(f"astype + apply + replace: {old_time:.3f} с")
+    print(f"normalize_codes:          {new_time:.3f} с")
+    print(f"результаты совпадают: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк построения "сырой" таблицы из страниц API:
+прежний pd.concat на каждой странице против однократного json_normalize.
+
+Запуск из корня проекта: python -m bench.bench_ingest [число вакансий ...]
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+import misc.api as api
+from bench.synthetic import make_pages
+
+
+def concat_per_page(pages):
+    df_raw = pd.DataFrame()
+    for new_data in pages:
+        df_tmp = pd.json_normalize(new_data)
+        df_raw = pd.concat([df_raw, df_tmp], sort=False, ignore_index=True)
+    return df_raw
+
+
+def main(sizes):
+    print(f"{'вакансий':>10} {'страниц':>8} {'concat, с':>10} {'мс/стр.':>8} {'accum, с':>10} {'мс/стр.':>8}")
+    for size in sizes:
+        pages = make_pages(size)
+        row = [size, len(pages)]
+        for build in (concat_per_page, api.collect_frame):
+            start = time.perf_counter()
+            df = build(pages)
+            elapsed = time.perf_counter() - start
+            assert len(df) == size
+            row += [elapsed, elapsed * 1000 / len(pages)]
+        print("{:>10} {:>8} {:>10.2f} {:>8.2f} {:>10.2f} {:>8.2f}".format(*row))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 100000])
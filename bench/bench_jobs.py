@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк нормализации имен вакансий перед сопоставлением с ОКПДТР:
+прежний цикл (шаблон разделителей собирается для каждого имени) против misc.jobs.JobNormalizer.
+Результаты обоих способов сравниваются поэлементно.
+
+Запуск из корня проекта: python -m bench.bench_jobs [число вакансий]
+"""
+
+import re
+import sys
+import time
+
+import misc.jobs as jobs_
+import misc.okpdtr_splits as oks
+from bench.synthetic import make_pages
+
+
+def loop(jobs):
+    jobs = list(jobs)
+    for i in range(len(jobs)):
+        jobs[i] = re.sub(r"[\W\d]", '', re.split(r'{}'.format('|'.join(oks.dictionary)), jobs[i].lower())[0])
+    return jobs
+
+
+def main(vacancies):
+    jobs = [v['vacancy']['job-name'] for page in make_pages(vacancies) for v in page]
+    # имена с разделителями из словаря, в том числе пересекающимися ('разряд'/'разряда')
+    jobs += [f"{job} {word} {i % 6 + 1}" for i, (job, word) in enumerate(zip(jobs, oks.dictionary * len(jobs)))]
+
+    start = time.perf_counter()
+    expected = loop(jobs)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    normalizer = jobs_.JobNormalizer()
+    got = normalizer.normalize_column(jobs)
+    normalizer_time = time.perf_counter() - start
+
+    print(f"имен: {len(jobs)}, уникальных: {len(set(jobs))}")
+    print(f"прежний цикл:  {loop_time:.2f} с")
+    print(f"JobNormalizer: {normalizer_time:.2f} с")
+    print(f"результаты совпадают: {expected == got}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк сопоставления имен вакансий с ОКПДТР:
+прежний полный перебор jaro по всем наименованиям против OkpdtrMatcher.
+Результаты обоих способов сравниваются поэлементно.
+
+Запуск из корня проекта: python -m bench.bench_okpdtr [число вакансий] [число наименований ОКПДТР]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import misc.jobs as jobs_
+import misc.okpdtr as okpdtr
+from bench.synthetic import make_okpdtr, make_pages
+
+# порог по умолчанию из sql/insert/tv_params.sql
+SIMILARITY_LEVEL_OKPDTR = 79
+
+
+def full_scan(jobs, okpdtr_names, id_okpdtr, threshold):
+    names = [okpdtr.clean_name(name) for name in okpdtr_names]
+    result = []
+    for _job in jobs:
+        sub_lst = [okpdtr.jaro(_okpdtr, _job) for _okpdtr in names]
+        biggest = max(sub_lst)
+        result.append(np.nan if biggest < threshold else id_okpdtr[sub_lst.index(biggest)])
+    return result
+
+
+def main(vacancies, names):
+    ids, okpdtr_names = make_okpdtr(names)
+    jobs = [v['vacancy']['job-name'] for page in make_pages(vacancies) for v in page]
+    jobs = jobs_.JobNormalizer().normalize_column(jobs)
+    threshold = SIMILARITY_LEVEL_OKPDTR / 100.0
+
+    start = time.perf_counter()
+    expected = full_scan(jobs, okpdtr_names, ids, threshold)
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = okpdtr.OkpdtrMatcher(pd.DataFrame({'id': ids, 'name': okpdtr_names}))
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    got = matcher.match(jobs, threshold)
+    match_time = time.perf_counter() - start
+
+    same = all((a == b) or (pd.isna(a) and pd.isna(b)) for a, b in zip(expected, got))
+    print(f"вакансий: {vacancies}, наименований ОКПДТР: {names}, уникальных имен: {len(set(jobs))}")
+    print(f"полный перебор: {scan_time:.2f} с")
+    print(f"OkpdtrMatcher:  {build_time + match_time:.2f} с (индекс {build_time:.2f} с, сопоставление {match_time:.2f} с)")
+    print(f"результаты совпадают: {same}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [500, 7000][len(args):]))
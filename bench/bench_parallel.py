@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк параллельного сопоставления с ОКПДТР и МРИГО (misc/parallel.py):
+время при разном числе процессов и сравнение результатов с последовательным вызовом.
+
+Запуск из корня проекта: python -m bench.bench_parallel [число вакансий] [число наименований ОКПДТР] [процессы через запятую]
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+import misc.jobs as jobs_
+import misc.mrigo as mrigo
+import misc.okpdtr as okpdtr
+import misc.parallel as parallel
+import misc.regions as regions
+from bench.synthetic import SETTLEMENTS, make_okpdtr, make_pages
+
+# порог по умолчанию из sql/insert/tv_params.sql
+SIMILARITY_LEVEL_OKPDTR = 79
+
+
+def same(expected, got):
+    return all((a == b) or (pd.isna(a) and pd.isna(b)) for a, b in zip(expected, got)) and len(expected) == len(got)
+
+
+def main(vacancies, names, workers_list):
+    ids, okpdtr_names = make_okpdtr(names)
+    records = [v['vacancy'] for page in make_pages(vacancies) for v in page]
+    jobs = jobs_.JobNormalizer().normalize_column([v['job-name'] for v in records])
+    addresses = regions.clean_addresses(
+        pd.Series([v['addresses']['address'][0]['location'] for v in records]),
+        pd.Series([v['region']['name'] for v in records]), regions.address_rules('54')).tolist()
+    threshold = SIMILARITY_LEVEL_OKPDTR / 100.0
+    okpdtr_matcher = okpdtr.OkpdtrMatcher(pd.DataFrame({'id': ids, 'name': okpdtr_names}))
+    mrigo_id_name = pd.DataFrame({'id_mrigo': range(len(SETTLEMENTS)), 'mrigo': SETTLEMENTS})
+
+    print(f"вакансий: {vacancies}, наименований ОКПДТР: {names}, уникальных имен: {len(set(jobs))}, "
+          f"уникальных адресов: {len(set(addresses))}, ядер: {os.cpu_count()}")
+    expected_okpdtr = okpdtr_matcher.match(jobs, threshold)
+    expected_mrigo = mrigo.MrigoMatcher(mrigo_id_name).match(addresses)
+    for workers in workers_list:
+        executor = parallel.MatchExecutor(workers)
+        executor.register('okpdtr', okpdtr_matcher)
+        executor.register('mrigo', mrigo.MrigoMatcher(mrigo_id_name, workers=1 if workers > 1 else -1))
+        start = time.perf_counter()
+        got_okpdtr = executor.match('okpdtr', jobs, threshold)
+        okpdtr_time = time.perf_counter() - start
+        start = time.perf_counter()
+        got_mrigo = executor.match('mrigo', addresses)
+        mrigo_time = time.perf_counter() - start
+        executor.close()
+        print(f"процессов: {workers:2d}  ОКПДТР: {okpdtr_time:.2f} с  МРИГО: {mrigo_time:.2f} с  "
+              f"результаты совпадают: {same(expected_okpdtr, got_okpdtr) and same(expected_mrigo, got_mrigo)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 7000,
+         [int(w) for w in sys.argv[3].split(',')] if len(sys.argv) > 3 else [1, 2, 4, os.cpu_count() or 1])
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк полного конвейера tv_.py (загрузка из API, очистка, сопоставление, выгрузка в БД)
+на воспроизводимых данных: страницы отдает локальная заглушка API (bench/stub_api.py), а справочники
+и параметры находятся в одноразовой локальной БД PostgreSQL (bench/local_db.py).
+Печатает время и число строк в секунду по этапам и пиковый объем памяти для каждого запуска
+(первый запуск создает таблицы, следующие -- сравнивают выгрузку с БД), может сохранить результаты
+в JSON и сравнить их с предыдущими.
+
+ВНИМАНИЕ: схемы blinov и vacs в указанной БД удаляются и создаются заново.
+
+Запуск из корня проекта:
+  python -m bench.bench_pipeline --dsn postgresql://postgres@localhost/tv_bench --vacancies 100000
+  python -m bench.bench_pipeline --fixture pages.jsonl.gz --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import sqlalchemy as sa
+
+from bench import local_db, stub_api
+from bench.synthetic import make_pages
+
+# регион синтетических страниц (bench/synthetic.py)
+REGION = '54'
+
+
+def stage_rows(metrics):
+    """
+    Число строк в секунду по этапам (по числу загруженных из API строк).
+
+    Входные параметры:
+    metrics -- метрики запуска из vacs.tv_log.metrics
+    """
+    rows = metrics.get('counters', {}).get('rows_fetched', 0)
+    return {name: round(rows / seconds, 1) if seconds else None for name, seconds in metrics['stages_s'].items()}
+
+
+def report(label, metrics):
+    print(f"\n{label}: всего {metrics['total_s']:.2f} с, строк в секунду -- {metrics.get('rows_per_s')}, "
+          f"пиковый RSS -- {metrics['peak_rss_mb']} МБ")
+    rates = stage_rows(metrics)
+    for name, seconds in metrics['stages_s'].items():
+        print(f"  {name:15s} {seconds:8.2f} с  {rates[name] or 0:12.1f} строк/с")
+
+
+def compare(previous, current):
+    print("\nСравнение с предыдущими результатами (время этапа, с):")
+    for before, after in zip(previous, current):
+        print(f"  {after['label']}:")
+        stages = list(dict.fromkeys(list(before['metrics']['stages_s']) + list(after['metrics']['stages_s'])))
+        for name in stages + ['total_s']:
+            old = before['metrics']['total_s'] if name == 'total_s' else before['metrics']['stages_s'].get(name)
+            new = after['metrics']['total_s'] if name == 'total_s' else after['metrics']['stages_s'].get(name)
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else '-'
+            print(f"    {name:15s} {old if old is not None else '-':>8}  ->  {new if new is not None else '-':>8}  {change}")
+
+
+def main(args):
+    database = sa.engine.url.make_url(args.dsn).database or ''
+    if 'bench' not in database and not args.force:
+        sys.exit(f"База данных '{database}' не похожа на одноразовую (нет 'bench' в имени); "
+                 f"схемы blinov и vacs будут удалены -- укажите --force, если это допустимо.")
+
+    # модуль misc.db подменяется до импорта tv_
+    db = local_db.install(args.dsn)
+    import misc.regions as regions
+    import tv_
+
+    pages = stub_api.load_fixture(args.fixture) if args.fixture else make_pages(args.vacancies)
+    server = stub_api.serve(pages, latency=args.latency / 1000.0)
+    regions.API_BASE = stub_api.base_url(server)
+    local_db.seed(db.engine, args.okpdtr_names)
+    cache_dir = tempfile.mkdtemp(prefix='tv_bench_')
+
+    print(f"страниц: {len(pages)}, вакансий: {sum(len(page) for page in pages)}, "
+          f"порция: {args.chunk_rows}, процессов сопоставления: {args.workers}, ядер: {os.cpu_count()}")
+    results = []
+    try:
+        for run in range(args.runs):
+            label = 'первый запуск (создание таблиц)' if run == 0 else f'повторный запуск {run}'
+            _, exit_point, *_ = tv_.run_region(
+                args.region, api_workers=args.api_workers, upsert=args.upsert, chunk_rows=args.chunk_rows,
+                match_workers=args.workers,
+                cache_path=None if args.no_match_cache else os.path.join(cache_dir, 'match_cache.sqlite'),
+                snapshot_dir=os.path.join(cache_dir, 'snapshots'), runs_dir=os.path.join(cache_dir, 'runs'),
+                archive_dir=os.path.join(cache_dir, 'archive'))
+            if exit_point != 0:
+                sys.exit(f"Обработка завершилась с кодом {exit_point} (см. vacs.tv_log)")
+            metrics = db.engine.execute(
+                "SELECT metrics FROM vacs.tv_log WHERE metrics IS NOT NULL ORDER BY id DESC LIMIT 1").scalar()
+            if isinstance(metrics, str):
+                metrics = json.loads(metrics)
+            results.append({'label': label, 'metrics': metrics})
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    for result in results:
+        report(result['label'], result['metrics'])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'options': vars(args), 'runs': results}, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f)['runs'], results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера tv_.py на заглушке API и локальной БД.")
+    parser.add_argument('--dsn', default=os.environ.get('TV_BENCH_DSN', 'postgresql://postgres@localhost/tv_bench'),
+                        help="адрес одноразовой БД (по умолчанию переменная окружения TV_BENCH_DSN)")
+    parser.add_argument('--force', action='store_true', help="разрешить БД без 'bench' в имени")
+    parser.add_argument('--vacancies', type=int, default=20000, help="число синтетических вакансий")
+    parser.add_argument('--fixture', help="файл записанных страниц API (см. bench/stub_api.py --record)")
+    parser.add_argument('--region', default=REGION, help="код региона записанных страниц")
+    parser.add_argument('--okpdtr-names', type=int, default=7000, help="число синтетических наименований ОКПДТР")
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка ответа заглушки API, мс")
+    parser.add_argument('--runs', type=int, default=2, help="число запусков (первый создает таблицы)")
+    parser.add_argument('--api-workers', type=int, default=8)
+    parser.add_argument('--chunk-rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=1, help="число процессов для сопоставления")
+    parser.add_argument('--upsert', action='store_true')
+    parser.add_argument('--no-match-cache', action='store_true')
+    parser.add_argument('--output', help="сохранить результаты в JSON")
+    parser.add_argument('--compare', help="сравнить с результатами из JSON")
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Бенчмарк запуска: время импорта модулей и команд, не выполняющих обработку, в отдельных процессах
+(медиана по нескольким запускам), а также список тяжелых зависимостей, загруженных при импорте tv_.
+Подключение к БД (misc.db) при импорте не создается, поэтому доступ к БД не нужен.
+
+Запуск из корня проекта: python -m bench.bench_startup [число запусков]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# тяжелые зависимости, которые не должны загружаться до этапа, которому они нужны
+HEAVY_MODULES = ['pandas', 'numpy', 'sqlalchemy', 'rapidfuzz', 'jellyfish', 'misc.db']
+
+# проверяемые команды: название -> параметры интерпретатора
+COMMANDS = {
+    'python -c pass': ['-c', 'pass'],
+    'import tv_': ['-c', 'import tv_'],
+    'python -m tv --help': ['-m', 'tv', '--help'],
+    'python -m tv run --help': ['-m', 'tv', 'run', '--help'],
+}
+COMMANDS.update({f'import {name}': ['-c', f'import {name}'] for name in HEAVY_MODULES if name != 'misc.db'})
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(args, runs):
+    """
+    Медиана времени выполнения интерпретатора с параметрами args (сек.) или None при ошибке.
+
+    Входные параметры:
+    args -- параметры интерпретатора
+    runs -- число запусков
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            return None
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(runs):
+    print(f"Медиана по {runs} запускам:")
+    for name, args in COMMANDS.items():
+        seconds = measure(args, runs)
+        print(f"  {name:<28} {'ошибка' if seconds is None else f'{seconds * 1000:7.0f} мс'}")
+    loaded = subprocess.run(
+        [sys.executable, '-c', f"import sys, tv_; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    print(f"Тяжелые зависимости после import tv_: {loaded or 'нет'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
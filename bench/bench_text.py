@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Микро-бенчмарк очистки текстовых полей вакансий:
+прежние astype('str') + apply(remove_tags) + regex по repr списка адресов
+против misc.text (адреса преобразуются при разборе страниц, тэги удаляются по столбцу целиком).
+
+Запуск из корня проекта: python -m bench.bench_text [число вакансий] [доля различных текстов]
+"""
+
+import copy
+import html
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+import misc.api as api
+import misc.text as text
+
+from bench.synthetic import make_vacancy
+
+COLUMNS = ['vacancy.addresses.address', 'vacancy.duty', 'vacancy.requirement.qualification']
+
+
+def remove_tags(s):
+    return html.escape(re.sub(r'(<!--.*?-->|<[^>]*>)', '', s))
+
+
+def old_clean(df_raw):
+    df_raw = df_raw.astype({column: 'str' for column in COLUMNS})
+    df_raw['vacancy.addresses.address'] = df_raw['vacancy.addresses.address'].apply(
+        lambda s: re.sub("'location': |{|\[|lng': |'lat': |}|\]|\'", '', s))
+    df_raw['vacancy.duty'] = df_raw['vacancy.duty'].apply(remove_tags)
+    df_raw['vacancy.requirement.qualification'] = df_raw['vacancy.requirement.qualification'].apply(remove_tags)
+    for column in COLUMNS:
+        df_raw[column] = df_raw[column].mask(df_raw[column] == 'nan', np.nan)
+    return df_raw
+
+
+def new_clean(df_raw):
+    df_raw['vacancy.duty'] = text.strip_tags(df_raw['vacancy.duty'])
+    df_raw['vacancy.requirement.qualification'] = text.strip_tags(df_raw['vacancy.requirement.qualification'])
+    return df_raw
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(vacancies, unique_share):
+    rng = random.Random(0)
+    records = [make_vacancy(i, rng) for i in range(vacancies)]
+    # работодатели часто публикуют вакансии с одинаковыми обязанностями и требованиями
+    distinct = max(1, int(vacancies * unique_share))
+    for i, record in enumerate(records[distinct:]):
+        source = records[i % distinct]['vacancy']
+        record['vacancy']['duty'] = source['duty']
+        record['vacancy']['requirement']['qualification'] = source['requirement']['qualification']
+    # прежний путь не изменяет записи, новый -- изменяет, поэтому каждый получает свою копию
+    old_records, new_records = records, copy.deepcopy(records)
+
+    old_frame, old_parse = timed(api.collect_frame, [old_records])
+    expected, old_time = timed(old_clean, old_frame)
+    new_frame, new_parse = timed(lambda: api.collect_frame([text.flatten_addresses(new_records)]))
+    got, new_time = timed(new_clean, new_frame)
+
+    same = all(expected[column].fillna('<NA>').tolist() == got[column].fillna('<NA>').tolist()
+               for column in COLUMNS)
+    print(f"вакансий: {vacancies}, различных текстов: {distinct}")
+    print(f"разбор страниц:                       {old_parse:.3f} с")
+    print(f"разбор страниц + flatten_addresses:   {new_parse:.3f} с")
+    print(f"astype + apply + repr regex:          {old_time:.3f} с")
+    print(f"strip_tags:                           {new_time:.3f} с")
+    print(f"результаты совпадают: {same}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Локальная (одноразовая) БД PostgreSQL для бенчмарков.
+  - Подключение с тем же интерфейсом, что и misc.db (engine, get_table_from_db_by_table_name),
+    которое подставляется вместо misc.db до импорта tv_.
+  - Пересоздание схем blinov и vacs и заполнение справочников blinov.mrigo, blinov.okpdtr,
+    blinov.okpdtr_assoc и таблиц vacs.tv_params, vacs.tv_job_splits, vacs.tv_fetch_state, vacs.tv_log (по файлам из каталога sql).
+"""
+
+import os
+import re
+import sys
+import types
+
+import pandas as pd
+import sqlalchemy as sa
+
+from bench.synthetic import SETTLEMENTS, make_okpdtr
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+
+# файлы, выполняемые при заполнении БД (владелец таблиц в локальной БД не меняется)
+SEED_FILES = ['create/tv_log.sql', 'create/tv_params.sql', 'insert/tv_params.sql',
+              'create/tv_job_splits.sql', 'insert/tv_job_splits.sql', 'create/tv_fetch_state.sql']
+
+
+def connect(dsn):
+    """
+    Модуль с интерфейсом misc.db для локальной БД.
+
+    Входные параметры:
+    dsn -- адрес БД, например postgresql://postgres@localhost/tv_bench
+    """
+    engine = sa.create_engine(dsn)
+
+    def get_table_from_db_by_table_name(table):
+        schema, name = table.split('.')
+        return pd.read_sql_table(name, engine, schema=schema)
+
+    module = types.ModuleType('misc.db')
+    module.engine = engine
+    module.get_table_from_db_by_table_name = get_table_from_db_by_table_name
+    return module
+
+
+def install(dsn):
+    """
+    Подставить локальную БД вместо misc.db (до импорта tv_); возвращает модуль.
+
+    Входные параметры:
+    dsn -- адрес БД
+    """
+    module = connect(dsn)
+    sys.modules['misc.db'] = module
+    return module
+
+
+def seed(engine, okpdtr_names=7000):
+    """
+    Пересоздать схемы blinov и vacs и заполнить справочники и параметры сопоставления.
+
+    Входные параметры:
+    engine -- подключение к локальной БД
+    okpdtr_names -- число синтетических наименований ОКПДТР
+    """
+    with engine.begin() as conn:
+        for schema in ('vacs', 'blinov'):
+            conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            conn.execute(f"CREATE SCHEMA {schema}")
+        for name in SEED_FILES:
+            with open(os.path.join(SQL_DIR, name), encoding='utf-8') as f:
+                sql = re.sub(r"ALTER TABLE \S+\s+OWNER to \w+;?", '', f.read())
+            conn.execute(sa.text(sql))
+
+    mrigo = pd.DataFrame({'id_mrigo': range(1, len(SETTLEMENTS) + 1), 'mrigo': SETTLEMENTS})
+    mrigo.to_sql('mrigo', engine, schema='blinov', index=False)
+    ids, names = make_okpdtr(okpdtr_names)
+    okpdtr = pd.DataFrame({'id': ids, 'name': names})
+    half = len(okpdtr) // 2
+    okpdtr.iloc[:half].to_sql('okpdtr', engine, schema='blinov', index=False)
+    okpdtr.iloc[half:].to_sql('okpdtr_assoc', engine, schema='blinov', index=False)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Локальная заглушка API ТРУДВСЕМ для бенчмарков.
+Отдает страницы results.vacancies из записанного файла (fixture) или синтетические страницы
+(bench/synthetic.py) по адресу /vacancies/region/<код>?offset=&limit=[&modifiedFrom=], в том же формате, что и API.
+
+Файл страниц -- JSON Lines (по одной странице-списку вакансий в строке), можно сжатый gzip или zstd;
+файлы архива страниц (misc/archive.py) подходят без преобразования.
+
+Запуск из корня проекта:
+  python -m bench.stub_api --vacancies 100000 --port 8080          # синтетические страницы
+  python -m bench.stub_api --fixture pages.jsonl.gz --port 8080    # записанные страницы
+  python -m bench.stub_api --record 54 --fixture pages.jsonl.gz    # записать страницы из API
+Затем: TRUDVSEM_API_URL=http://127.0.0.1:8080 python tv_.py
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import misc.api as api
+import misc.archive as archive
+import misc.regions as regions
+from bench.synthetic import make_pages
+
+
+def load_fixture(path):
+    """
+    Прочитать страницы из файла.
+
+    Входные параметры:
+    path -- путь к файлу страниц
+    """
+    return list(archive.read_pages(path))
+
+
+def record_fixture(region, path, max_pages=None, workers=4):
+    """
+    Загрузить страницы региона из API и записать их в файл; возвращает число страниц.
+
+    Входные параметры:
+    region -- двузначный код региона
+    path -- путь к файлу страниц
+    max_pages -- наибольшее число страниц (None -- все)
+    workers -- число одновременно загружаемых страниц
+    """
+    fetcher = api.Fetcher(regions.api_url(region), workers=workers)
+    count = 0
+    with archive.open_archive(path, 'wt') as f:
+        for page in fetcher.fetch(0):
+            f.write(json.dumps(page, ensure_ascii=False) + '\n')
+            count += 1
+            if max_pages is not None and count >= max_pages:
+                break
+    return count
+
+
+def make_handler(pages, latency=0.0):
+    """
+    Класс обработчика запросов, отдающего заданные страницы.
+
+    Входные параметры:
+    pages -- список страниц (списков вакансий) по PAGE_LIMIT вакансий
+    latency -- задержка ответа (сек.), имитирующая время ответа API
+    """
+    records = [vacancy for page in pages for vacancy in page]
+    # вакансии, измененные начиная с заданного времени (параметр modifiedFrom), по значению параметра
+    modified = {}
+
+    def modified_from(value):
+        if value not in modified:
+            since = value.rstrip('Z')
+            modified[value] = [v for v in records if (v['vacancy'].get('modify-date') or '') >= since]
+        return modified[value]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            parts = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(parts.query)
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query.get('limit', [str(api.PAGE_LIMIT)])[0])
+            selected = modified_from(query['modifiedFrom'][0]) if 'modifiedFrom' in query else records
+            vacancies = selected[offset * limit:(offset + 1) * limit]
+            if latency:
+                time.sleep(latency)
+            if vacancies:
+                data = {'status': '200', 'meta': {'total': len(selected), 'limit': limit},
+                        'results': {'vacancies': vacancies}}
+            else:
+                data = {'status': '404', 'meta': {'total': len(selected), 'limit': limit}}
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(pages, port=0, latency=0.0):
+    """
+    Запустить заглушку в фоновом потоке; возвращает сервер (адрес -- server.server_address).
+
+    Входные параметры:
+    pages -- список страниц (списков вакансий)
+    port -- порт (0 -- любой свободный)
+    latency -- задержка ответа (сек.)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(pages, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server):
+    """
+    Адрес заглушки для misc.regions.API_BASE (переменной окружения TRUDVSEM_API_URL).
+
+    Входные параметры:
+    server -- сервер, запущенный функцией serve
+    """
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка API ТРУДВСЕМ.")
+    parser.add_argument('--vacancies', type=int, default=10000, help="число синтетических вакансий")
+    parser.add_argument('--fixture', help="файл страниц (JSON Lines, .gz -- сжатый)")
+    parser.add_argument('--record', metavar='REGION', help="записать страницы региона из API в --fixture и завершить работу")
+    parser.add_argument('--max-pages', type=int, help="наибольшее число записываемых страниц")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка ответа, мс")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.fixture:
+            parser.error("для --record нужно указать --fixture")
+        count = record_fixture(args.record, args.fixture, args.max_pages)
+        print(f"> Записано страниц: {count} ({args.fixture})")
+    else:
+        pages = load_fixture(args.fixture) if args.fixture else make_pages(args.vacancies)
+        server = serve(pages, args.port, args.latency / 1000.0)
+        print(f"> Заглушка API: {base_url(server)} (страниц -- {len(pages)}); остановка -- Ctrl+C")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
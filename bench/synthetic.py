@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Синтетические страницы API ТРУДВСЕМ для бенчмарков.
+Структура записей повторяет поле results.vacancies реального ответа.
+"""
+
+import random
+
+PAGE_LIMIT = 100
+
+JOBS = [
+    'Водитель автомобиля', 'Продавец-консультант', 'Инженер-программист', 'Бухгалтер',
+    'Электросварщик ручной сварки 4 разряда', 'Воспитатель детского сада', 'Врач-терапевт участковый',
+    'Повар 5 разряда', 'Кладовщик', 'Менеджер по продажам', 'Учитель математики высшей категории',
+    'Слесарь-ремонтник 3 разряда', 'Уборщик служебных помещений', 'Охранник 4 разряда',
+    'Младший воспитатель ясли', 'Машинист крана', 'Токарь', 'Медицинская сестра', 'Кассир',
+]
+SETTLEMENTS = [
+    'г Новосибирск', 'г Бердск', 'г Искитим', 'г Куйбышев', 'рн Коченевский', 'рн Тогучинский',
+    'рн Новосибирский', 'г Обь', 'рн Искитимский', 'рн Каргатский', 'г Барабинск',
+]
+STREETS = ['ул Ленина', 'ул Советская', 'пр-кт Красный', 'ул Кирова', 'ул Мира']
+SCHEDULES = ['Полный рабочий день', 'Сменный график', 'Гибкий график', 'Неполный рабочий день']
+EMPLOYMENT = ['Полная занятость', 'Частичная занятость', 'Временная']
+EDUCATION = ['Среднее', 'Среднее профессиональное', 'Высшее', 'Незаконченное высшее']
+INDUSTRIES = ['Транспорт', 'Торговля', 'Образование', 'Здравоохранение', 'Производство', 'ИТ']
+WORDS = [
+    'работа', 'с', 'клиентами', 'оформление', 'документов', 'контроль', 'качества', 'выполнение',
+    'поручений', 'руководителя', 'обслуживание', 'оборудования', 'соблюдение', 'техники', 'безопасности',
+]
+
+
+def _text(rng, words):
+    parts = []
+    for _ in range(words // 8 + 1):
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(8))
+        parts.append(rng.choice(['<p>{}</p>', '<li>{}</li>', '{}<br/>', '<b>{}</b> &amp; ...']).format(sentence))
+    return ''.join(parts)
+
+
+def make_vacancy(i, rng, companies=2000):
+    """
+    Одна синтетическая вакансия.
+
+    Входные параметры:
+    i -- порядковый номер вакансии (используется в идентификаторе)
+    rng -- генератор случайных чисел (random.Random)
+    companies -- число различных компаний
+    """
+    c = rng.randrange(companies)
+    settlement = rng.choice(SETTLEMENTS)
+    salary_min = rng.choice([0, 15000, 20000, 25000, 30000, 40000])
+    return {'vacancy': {
+        'id': f'{i:08x}-0000-0000-0000-{c:012x}',
+        'source': rng.choice(['Кадровые агентства', 'Работодатель', 'ЦЗН']),
+        'region': {'region_code': '5400000000000', 'name': 'Новосибирская область'},
+        'company': {
+            'companycode': f'{c:010d}', 'inn': str(5400000000 + c), 'ogrn': str(1025400000000 + c),
+            'kpp': str(540001001 + c), 'name': f'ООО "Компания {c}"', 'hr-agency': rng.random() < 0.1,
+            'url': f'https://trudvsem.ru/company/{c}', 'site': f'company{c}.ru', 'phone': '+7(383)0000000',
+            'fax': False, 'email': f'hr{c}@company{c}.ru', 'code_industry_branch': str(rng.randrange(20)),
+        },
+        'creation-date': '2020-09-01', 'modify-date': f'2020-09-{1 + i % 28:02d}',
+        'salary': f'от {salary_min}', 'salary_min': salary_min, 'salary_max': salary_min + 10000,
+        'job-name': rng.choice(JOBS) + rng.choice(['', '', f' {rng.choice(OKPDTR_SUFFIXES).strip()}', f' ({rng.choice(WORDS)})']), 'vac_url': f'https://trudvsem.ru/vacancy/card/{i}',
+        'employment': rng.choice(EMPLOYMENT), 'schedule': rng.choice(SCHEDULES),
+        'duty': _text(rng, rng.randrange(20, 120)),
+        'category': {'industry': rng.choice(INDUSTRIES), 'specialisation': rng.choice(INDUSTRIES)},
+        'requirement': {
+            'education': rng.choice(EDUCATION), 'experience': rng.randrange(5),
+            'qualification': _text(rng, rng.randrange(10, 60)),
+        },
+        'addresses': {'address': [{
+            'location': f'Новосибирская область, {settlement}, {rng.choice(STREETS)}, {rng.randrange(1, 200)}',
+            'lng': f'{82 + rng.random():.6f}', 'lat': f'{54 + rng.random():.6f}',
+        }]},
+        'social_protected': rng.choice([False, 'Инвалиды']),
+        'term': {'text': 'Социальный пакет'},
+        'currency': '«руб.»',
+    }}
+
+
+def make_pages(vacancies, limit=PAGE_LIMIT, seed=0):
+    """
+    Список страниц (списков вакансий) заданного общего размера.
+
+    Входные параметры:
+    vacancies -- общее число вакансий
+    limit -- число вакансий на странице
+    seed -- зерно генератора случайных чисел
+    """
+    rng = random.Random(seed)
+    records = [make_vacancy(i, rng) for i in range(vacancies)]
+    return [records[i:i + limit] for i in range(0, vacancies, limit)]
+
+
+OKPDTR_ROOTS = [
+    'водитель', 'продавец', 'инженер', 'бухгалтер', 'электросварщик', 'воспитатель', 'врач', 'повар',
+    'кладовщик', 'менеджер', 'учитель', 'слесарь', 'уборщик', 'охранник', 'машинист', 'токарь',
+    'сестра', 'кассир', 'оператор', 'монтажник', 'техник', 'экономист', 'юрисконсульт', 'лаборант',
+]
+OKPDTR_SUFFIXES = [
+    '', ' автомобиля', '-консультант', '-программист', ' ручной сварки', ' по ремонту', ' участковый',
+    ' детского сада', ' крана', ' медицинская', ' станков', ' по продажам', ' связи', ' котельной',
+    ' производственных помещений', ' электронно-вычислительных машин', ' главный', ' ведущий',
+]
+
+
+def make_okpdtr(names=7000, seed=0):
+    """
+    Синтетическая объединенная таблица наименований ОКПДТР (списки id и name).
+
+    Входные параметры:
+    names -- число наименований
+    seed -- зерно генератора случайных чисел
+    """
+    rng = random.Random(seed)
+    result = []
+    for i in range(names):
+        words = [rng.choice(OKPDTR_ROOTS) + rng.choice(OKPDTR_SUFFIXES)]
+        if rng.random() < 0.3:
+            words.append(rng.choice(OKPDTR_SUFFIXES).strip() or rng.choice(OKPDTR_ROOTS))
+        result.append(' '.join(words))
+    return [str(10000 + i) for i in range(names)], result
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Загрузка страниц с вакансиями через API ТРУДВСЕМ.
+  - Параллельная загрузка страниц с ограничением числа одновременных запросов.
+  - Переиспользование keep-alive соединений (одно соединение на поток).
+  - Повторные попытки с экспоненциальной задержкой для каждой страницы.
+  - Определение последней страницы по первой (пробной) странице.
+  - Накопление страниц и построение таблицы за один проход (без повторного копирования).
+"""
+
+import http.client
+import json
+import math
+import threading
+import time
+import urllib.parse
+
+from concurrent.futures import ThreadPoolExecutor
+
+import misc.lazy as lazy
+
+# pandas нужен только для построения таблиц (iter_frames, collect_frame), но не для загрузки страниц
+pd = lazy.LazyModule('pandas')
+
+PAGE_LIMIT = 100
+
+
+class PageError(Exception):
+    """Страница не была получена после всех попыток."""
+
+
+class RetryableStatus(Exception):
+    """HTTP-ответ, после которого имеет смысл повторить запрос (429, 5xx)."""
+
+
+def page_vacancies(data):
+    """
+    Список вакансий со страницы API (None, если страница пустая или с ошибкой).
+
+    Входные параметры:
+    data -- разобранный JSON страницы
+    """
+    if data is None:
+        return None
+    return (data.get('results') or {}).get('vacancies')
+
+
+class Fetcher:
+    """
+    Загрузчик страниц API с пулом потоков.
+
+    Входные параметры:
+    url -- адрес ресурса без параметров offset/limit (см. misc.regions.api_url)
+    limit -- число вакансий на странице
+    params -- дополнительные параметры запроса (например, modifiedFrom)
+    workers -- максимальное число одновременных запросов
+    retries -- число повторных попыток для одной страницы
+    backoff -- начальная задержка перед повтором (сек.), удваивается с каждой попыткой
+    timeout -- таймаут сокета (сек.)
+    """
+
+    def __init__(self, url, limit=PAGE_LIMIT, workers=8, retries=3, backoff=0.5, timeout=60, params=None):
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path
+        self.limit = limit
+        self.query = f"&{urllib.parse.urlencode(params)}" if params else ''
+        self.workers = max(1, int(workers))
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # время успешных запросов страниц (сек.)
+        self.latencies = []
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.scheme == 'https':
+                conn = http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(self, offset):
+        conn = self._connection()
+        conn.request('GET', f"{self.path}?offset={offset}&limit={self.limit}{self.query}")
+        response = conn.getresponse()
+        body = response.read()
+        if response.status == 429 or response.status >= 500:
+            raise RetryableStatus(f"HTTP {response.status}")
+        return json.loads(body.decode("utf-8"))
+
+    def get_page(self, offset):
+        """
+        Получить данные с заданной страницы; повторяет запрос при сетевых ошибках.
+        Возвращает пару (данные, статус); данные равны None, если статус не 200.
+
+        Входные параметры:
+        offset -- сдвиг (номер страницы)
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                start = time.perf_counter()
+                data = self._request(offset)
+                self.latencies.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException, RetryableStatus, ValueError) as e:
+                self._reset_connection()
+                if attempt == self.retries:
+                    raise PageError(f"Страница {offset} не загружена: {e}") from e
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            status = int(data['status'])
+            if status != 200:
+                return None, status
+            return data, status
+
+    def last_offset(self, data, start_offset):
+        """
+        Номер последней страницы по полю meta.total пробной страницы (None, если его нет).
+
+        Входные параметры:
+        data -- данные пробной (первой) страницы
+        start_offset -- номер пробной страницы
+        """
+        try:
+            total = int(data['meta']['total'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return max(start_offset, math.ceil(total / self.limit) - 1)
+
+    def fetch(self, start_offset=0):
+        """
+        Генератор списков вакансий по страницам в порядке возрастания сдвига.
+        Загрузка останавливается на первой странице со статусом, отличным от 200,
+        или на первой странице без вакансий.
+
+        Входные параметры:
+        start_offset -- начальная страница для загрузки данных
+        """
+        data, _ = self.get_page(start_offset)
+        vacancies = page_vacancies(data)
+        if not vacancies:
+            return
+        yield vacancies
+        last = self.last_offset(data, start_offset)
+
+        window = 2 * self.workers
+        next_offset = start_offset + 1
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                while True:
+                    while len(pending) < window and (last is None or next_offset <= last):
+                        pending.append(pool.submit(self.get_page, next_offset))
+                        next_offset += 1
+                    if not pending:
+                        break
+                    data, _ = pending.pop(0).result()
+                    vacancies = page_vacancies(data)
+                    if not vacancies:
+                        break
+                    yield vacancies
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+def normalize(records, columns=None):
+    """
+    Таблица из списка вакансий (json_normalize).
+
+    Входные параметры:
+    records -- список вакансий
+    columns -- столбцы таблицы: лишние отбрасываются, отсутствующие добавляются пустыми
+               (None -- столбцы по полям, которые есть хотя бы у одной вакансии)
+    """
+    frame = pd.json_normalize(records)
+    return frame if columns is None else frame.reindex(columns=columns)
+
+
+def iter_frames(pages, chunk_rows=None, columns=None):
+    """
+    Собрать страницы с вакансиями в таблицы.
+    Записи накапливаются в списке, и json_normalize вызывается один раз на таблицу,
+    поэтому ранее загруженные строки не копируются при добавлении каждой страницы.
+
+    Входные параметры:
+    pages -- итерируемый объект со списками вакансий (страницами)
+    chunk_rows -- число строк в одной таблице (None -- одна таблица со всеми строками)
+    columns -- постоянный состав столбцов таблиц (см. normalize); необязательные поля API
+               могут отсутствовать у всех вакансий порции, особенно в последней, неполной порции
+    """
+    records = []
+    for vacancies in pages:
+        records.extend(vacancies)
+        while chunk_rows and len(records) >= chunk_rows:
+            yield normalize(records[:chunk_rows], columns)
+            del records[:chunk_rows]
+    if records or not chunk_rows:
+        yield normalize(records, columns)
+
+
+def collect_frame(pages, columns=None):
+    """
+    Собрать все страницы с вакансиями в одну таблицу.
+
+    Входные параметры:
+    pages -- итерируемый объект со списками вакансий (страницами)
+    columns -- постоянный состав столбцов таблицы (см. normalize)
+    """
+    return next(iter_frames(pages, columns=columns))
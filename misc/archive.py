@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Архив "сырых" страниц API для повторной обработки без загрузки.
+  - Каждый запуск записывает полученные страницы (списки вакансий в том виде, в котором их вернул API)
+    в файл <каталог архива>/<регион>/<время запуска>.jsonl.zst (или .jsonl.gz, если пакет zstandard
+    не установлен) -- по одной странице в строке.
+  - Файлы инкрементальной загрузки (только измененные вакансии) отмечаются в имени (INCREMENTAL_MARK):
+    по ним нельзя закрывать отсутствующие вакансии, в отличие от файлов полной загрузки (см. is_full).
+  - Файл пишется с суффиксом .part и переименовывается после получения всех страниц
+    (при прерывании загрузки удаляется), поэтому в архиве остаются только полные выгрузки.
+  - После записи файла в каталоге региона остаются только KEEP_FILES последних полных файлов.
+  - Повторная обработка (replay) читает страницы из файла архива вместо API.
+"""
+
+import gzip
+import io
+import json
+import os
+import time
+
+# расширения файлов архива
+ZSTD_SUFFIX = '.jsonl.zst'
+GZIP_SUFFIX = '.jsonl.gz'
+
+# суффикс незавершенного файла архива
+PART_SUFFIX = '.part'
+
+# отметка в имени файла инкрементальной загрузки
+INCREMENTAL_MARK = '_incremental'
+
+# число хранимых файлов архива на регион (старые файлы удаляются после записи нового)
+KEEP_FILES = 7
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Для архива в формате zstd установите пакет: pip install zstandard")
+    return zstandard
+
+
+def default_suffix():
+    """Расширение файлов архива: zstd, если установлен пакет zstandard, иначе gzip."""
+    try:
+        _zstandard()
+    except ImportError:
+        return GZIP_SUFFIX
+    return ZSTD_SUFFIX
+
+
+def open_archive(path, mode):
+    """
+    Открыть файл архива как текстовый поток (формат определяется по расширению, без учета .part).
+
+    Входные параметры:
+    path -- путь к файлу
+    mode -- 'rt' или 'wt'
+    """
+    name = path[:-len(PART_SUFFIX)] if path.endswith(PART_SUFFIX) else path
+    if name.endswith('.zst'):
+        zstandard = _zstandard()
+        raw = open(path, mode.replace('t', 'b'))
+        if 'w' in mode:
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    if name.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_pages(path):
+    """
+    Генератор страниц (списков вакансий) из файла архива.
+
+    Входные параметры:
+    path -- путь к файлу архива
+    """
+    with open_archive(path, 'rt') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def archive_path(directory, region, suffix=None, full=True):
+    """
+    Путь к новому файлу архива региона.
+
+    Входные параметры:
+    directory -- каталог архива
+    region -- двузначный код региона
+    suffix -- расширение файла (по умолчанию default_suffix())
+    full -- файл полной загрузки (False -- инкрементальной, см. INCREMENTAL_MARK)
+    """
+    # номер процесса различает файлы запусков, начавшихся в одну секунду
+    name = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}{'' if full else INCREMENTAL_MARK}{suffix or default_suffix()}"
+    return os.path.join(directory, region, name)
+
+
+def is_full(path):
+    """
+    Файл архива содержит полную загрузку региона (а не только измененные вакансии).
+
+    Входные параметры:
+    path -- путь к файлу архива
+    """
+    return INCREMENTAL_MARK not in os.path.basename(path)
+
+
+def _files(path):
+    return sorted(name for name in os.listdir(path) if not name.endswith(PART_SUFFIX)) if os.path.isdir(path) else []
+
+
+def prune(path, keep=KEEP_FILES):
+    """
+    Удалить старые файлы архива региона, оставив keep последних полных файлов.
+
+    Входные параметры:
+    path -- каталог архива региона
+    keep -- число оставляемых файлов (None -- не удалять)
+    """
+    if keep is None:
+        return
+    names = _files(path)
+    for name in names[:max(len(names) - keep, 0)]:
+        os.remove(os.path.join(path, name))
+
+
+def record(pages, path, keep=KEEP_FILES):
+    """
+    Генератор страниц, записывающий каждую страницу в файл архива до передачи дальше.
+    Файл переименовывается из path + '.part' в path, только если получены все страницы;
+    затем старые файлы региона удаляются (см. prune).
+
+    Входные параметры:
+    pages -- итерируемый объект со страницами API
+    path -- путь к файлу архива
+    keep -- число хранимых файлов архива региона (None -- не удалять старые файлы)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = path + PART_SUFFIX
+    complete = False
+    try:
+        with open_archive(part, 'wt') as f:
+            for page in pages:
+                # страница записывается до передачи дальше (последующие этапы изменяют записи на месте)
+                f.write(json.dumps(page, ensure_ascii=False) + '\n')
+                yield page
+            complete = True
+    finally:
+        if complete:
+            os.replace(part, path)
+            prune(os.path.dirname(path), keep)
+        elif os.path.exists(part):
+            os.remove(part)
+
+
+def latest(directory, region):
+    """
+    Последний полный файл архива региона или None, если архива нет.
+
+    Входные параметры:
+    directory -- каталог архива
+    region -- двузначный код региона
+    """
+    path = os.path.join(directory, region)
+    names = _files(path)
+    return os.path.join(path, names[-1]) if names else None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Постоянный кэш результатов сопоставления (адрес -> МРИГО, имя вакансии -> ОКПДТР).
+  - Хранится в файле SQLite; ключ -- вид сопоставления, версия справочника и нормализованная строка.
+  - Версия вычисляется по содержимому справочников и порогам сопоставления, поэтому
+    изменение blinov.mrigo, blinov.okpdtr, blinov.okpdtr_assoc или vacs.tv_params
+    автоматически делает старые записи недействительными (они удаляются).
+  - Размер ограничен: при превышении удаляются записи, которые дольше всего не использовались.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+import pandas as pd
+
+# максимальное число записей в кэше
+MAX_ENTRIES = 1_000_000
+
+# максимальное число параметров в одном запросе SQLite
+BATCH = 500
+
+
+def reference_version(*parts):
+    """
+    Версия справочных данных: хэш содержимого таблиц и значений параметров.
+
+    Входные параметры:
+    parts -- таблицы (pd.DataFrame) и скалярные параметры (пороги и т.п.)
+    """
+    digest = hashlib.md5()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(','.join(map(str, part.columns)).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        else:
+            digest.update(repr(part).encode('utf-8'))
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    return json.dumps(value, default=lambda o: o.item(), ensure_ascii=False)
+
+
+class MatchCache:
+    """
+    Кэш результатов сопоставления в файле SQLite.
+
+    Входные параметры:
+    path -- путь к файлу кэша
+    max_entries -- максимальное число записей
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            "kind TEXT NOT NULL, version TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "last_used REAL NOT NULL, PRIMARY KEY (kind, version, key))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS matches_last_used ON matches (last_used)")
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, kind, version):
+        """
+        Удалить записи вида kind, построенные по другим версиям справочников.
+
+        Входные параметры:
+        kind -- вид сопоставления (например, 'okpdtr' или 'mrigo:blinov.mrigo')
+        version -- текущая версия справочников
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM matches WHERE kind = ? AND version <> ?", (kind, version))
+
+    def get_many(self, kind, version, keys):
+        """
+        Найденные в кэше значения для списка ключей (словарь ключ -> значение).
+
+        Входные параметры:
+        kind -- вид сопоставления
+        version -- версия справочников
+        keys -- список уникальных ключей
+        """
+        found = {}
+        for start in range(0, len(keys), BATCH):
+            batch = keys[start:start + BATCH]
+            rows = self.conn.execute(
+                f"SELECT key, value FROM matches WHERE kind = ? AND version = ? AND key IN ({','.join('?' * len(batch))})",
+                [kind, version] + batch).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE matches SET last_used = ? WHERE kind = ? AND version = ? AND key = ?",
+                [(now, kind, version, key) for key in found])
+        return found
+
+    def put_many(self, kind, version, items):
+        """
+        Сохранить значения в кэш и удалить самые старые записи при превышении размера.
+
+        Входные параметры:
+        kind -- вид сопоставления
+        version -- версия справочников
+        items -- словарь ключ -> значение (значение должно сериализоваться в JSON)
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO matches (kind, version, key, value, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(kind, version, key, _to_json(value), now) for key, value in items.items()])
+            excess = self.conn.execute("SELECT count(*) FROM matches").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM matches WHERE rowid IN (SELECT rowid FROM matches ORDER BY last_used LIMIT ?)", (excess,))
+
+    def lookup(self, kind, version, keys, compute):
+        """
+        Результаты сопоставления для списка ключей в исходном порядке;
+        compute вызывается только для ключей, которых нет в кэше.
+
+        Входные параметры:
+        kind -- вид сопоставления
+        version -- версия справочников
+        keys -- список ключей (нормализованных строк), возможно с повторами
+        compute -- функция: список отсутствующих в кэше ключей -> список значений
+        """
+        unique = list(dict.fromkeys(keys))
+        found = self.get_many(kind, version, unique)
+        missing = [key for key in unique if key not in found]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            computed = dict(zip(missing, compute(missing)))
+            self.put_many(kind, version, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def close(self):
+        self.conn.close()
+
+
+def cached(cache, kind, version, keys, compute):
+    """
+    Сопоставление с использованием кэша (без кэша, если cache равен None).
+
+    Входные параметры:
+    cache -- кэш (MatchCache) или None
+    kind -- вид сопоставления
+    version -- версия справочников
+    keys -- список ключей (нормализованных строк)
+    compute -- функция: список ключей -> список значений
+    """
+    if cache is None:
+        return compute(keys)
+    cache.invalidate(kind, version)
+    return cache.lookup(kind, version, keys, compute)
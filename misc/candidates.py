@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Кандидаты сопоставления с МРИГО/ОКПДТР для повторного подбора порогов.
+  - Для каждой вакансии сохраняются k лучших кодов с оценками (таблица vacs.vacancies_tv_candidates:
+    id вакансии, вид сопоставления, номер кандидата, код, оценка).
+  - Коды при других порогах (vacs.tv_params) вычисляются по этой таблице без пересчета оценок:
+    МРИГО -- первый кандидат с оценкой строго выше порога (оценки от 0 до 100),
+    ОКПДТР -- первый кандидат с оценкой не ниже порога / 100 (оценки от 0 до 1),
+    как и при основном сопоставлении.
+"""
+
+import numpy as np
+import pandas as pd
+
+import misc.codes as codes
+
+# столбцы таблицы кандидатов
+COLUMNS = ['id', 'kind', 'rank', 'code', 'score']
+
+
+def best_mrigo(candidates):
+    """
+    Пары (id_mrigo, оценка) лучших кандидатов МРИГО, как у MrigoMatcher.match
+    (порог сопоставления применяется к оценке далее, как обычно).
+
+    Входные параметры:
+    candidates -- список списков кандидатов (id_mrigo, оценка) по вакансиям
+    """
+    return [tuple(found[0]) if found else (np.nan, 0.0) for found in candidates]
+
+
+def best_okpdtr(candidates, threshold):
+    """
+    Коды ОКПДТР лучших кандидатов (NaN, если оценка ниже порога), как у OkpdtrMatcher.match.
+
+    Входные параметры:
+    candidates -- список списков кандидатов (код ОКПДТР, оценка) по вакансиям
+    threshold -- порог оценки (от 0 до 1)
+    """
+    return [found[0][0] if found and found[0][1] >= threshold else np.nan for found in candidates]
+
+
+def frame(ids, kind, candidates):
+    """
+    Таблица кандидатов порции (столбцы COLUMNS).
+
+    Входные параметры:
+    ids -- идентификаторы вакансий
+    kind -- вид сопоставления ('mrigo' или 'okpdtr')
+    candidates -- список списков кандидатов (код, оценка) в порядке ids
+    """
+    rows = [(vacancy_id, kind, rank, code, score)
+            for vacancy_id, found in zip(ids, candidates) for rank, (code, score) in enumerate(found, 1)]
+    result = pd.DataFrame(rows, columns=COLUMNS)
+    # коды записываются строками, как в отношении 'Вакансии'
+    result['code'] = codes.normalize_code(result['code'])
+    return result
+
+
+def rethreshold(candidates, level_mrigo, level_okpdtr):
+    """
+    Коды МРИГО/ОКПДТР вакансий при заданных порогах по таблице кандидатов;
+    возвращает таблицу со столбцами id, id_mrigo, id_okpdtr (NaN, если кандидат не прошел порог).
+
+    Входные параметры:
+    candidates -- таблица кандидатов (столбцы COLUMNS), например из vacs.vacancies_tv_candidates
+    level_mrigo -- порог сопоставления с МРИГО (как similarity_level_mrigo)
+    level_okpdtr -- порог сопоставления с ОКПДТР (как similarity_level_okpdtr)
+    """
+    first = candidates.sort_values(['id', 'kind', 'rank']).drop_duplicates(['id', 'kind'])
+    passed = np.where(first['kind'] == 'mrigo', first['score'] > level_mrigo, first['score'] >= level_okpdtr / 100.0)
+    found = first.assign(code=first['code'].where(passed)).pivot(index='id', columns='kind', values='code')
+    found = found.reindex(columns=['mrigo', 'okpdtr']).rename(columns={'mrigo': 'id_mrigo', 'okpdtr': 'id_okpdtr'})
+    return found.reset_index().rename_axis(columns=None)
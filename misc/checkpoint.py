@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Контрольные точки обработки региона для продолжения прерванного запуска.
+  - Каждый запуск получает идентификатор (run id) и каталог <каталог запусков>/<регион>/<run id>.
+  - Полученные страницы API записываются в сжатые файлы (по SPOOL_PAGES страниц, JSON Lines + gzip);
+    при продолжении запуска страницы читаются из файлов, а загрузка из API продолжается
+    со следующей страницы.
+  - Результаты сопоставления каждой порции (отношения 'Компании', 'Вакансии' и кандидаты) сохраняются
+    до передачи на выгрузку, а после успешной выгрузки порция отмечается как выгруженная:
+    при продолжении выгруженные порции пропускаются, сопоставленные -- только выгружаются.
+  - Запуск продолжается, только если совпадают параметры, от которых зависит разбиение на порции;
+    после успешного завершения каталог запуска удаляется. Новый запуск удаляет незавершенные запуски
+    региона только с теми же параметрами.
+Все файлы записываются через временный файл и переименование, поэтому прерывание не оставляет
+частично записанных файлов.
+"""
+
+import gzip
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+# число страниц API в одном файле
+SPOOL_PAGES = 50
+
+# файл с параметрами и состоянием запуска
+META_FILE = 'meta.json'
+
+
+def runs(directory, region):
+    """
+    Незавершенные запуски региона: список пар (идентификатор запуска, параметры) от ранних к поздним.
+
+    Входные параметры:
+    directory -- каталог запусков
+    region -- двузначный код региона
+    """
+    region_dir = os.path.join(directory, region)
+    result = []
+    for run in sorted(os.listdir(region_dir)) if os.path.isdir(region_dir) else []:
+        try:
+            with open(os.path.join(region_dir, run, META_FILE), encoding='utf-8') as f:
+                result.append((run, json.load(f)['options']))
+        except (OSError, ValueError, KeyError):
+            continue
+    return result
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Checkpoint:
+    """
+    Контрольные точки одного запуска обработки региона.
+
+    Входные параметры:
+    directory -- каталог запусков
+    region -- двузначный код региона
+    options -- параметры, при изменении которых запуск нельзя продолжить (сериализуемые в JSON)
+    resume -- идентификатор продолжаемого запуска, 'latest' -- последний незавершенный запуск
+              с теми же параметрами, None -- новый запуск
+    """
+
+    def __init__(self, directory, region, options, resume=None):
+        self.region_dir = os.path.join(directory, region)
+        self.options = json.loads(json.dumps(options, default=str))
+        # состояние запуска изменяется из потоков загрузки страниц и выгрузки
+        self._lock = threading.Lock()
+        runs = sorted(os.listdir(self.region_dir)) if os.path.isdir(self.region_dir) else []
+        if resume == 'latest':
+            resume = next((run for run in reversed(runs) if self._options(run) == self.options), None)
+        elif resume is not None and self._options(resume) != self.options:
+            print(f">> Запуск {resume} не найден или выполнялся с другими параметрами, начинается новый запуск.")
+            resume = None
+        self.resumed = resume is not None
+        if self.resumed:
+            self.run_id = resume
+            self.path = os.path.join(self.region_dir, resume)
+            self.meta = self._read_meta(resume)
+        else:
+            # незавершенные запуски с теми же параметрами больше не понадобятся; запуски с другими параметрами
+            # (например, порции python -m tv match, ожидающие выгрузки командой load) сохраняются
+            for run in runs:
+                if self._options(run) == self.options:
+                    shutil.rmtree(os.path.join(self.region_dir, run), ignore_errors=True)
+            os.makedirs(self.region_dir, exist_ok=True)
+            # к времени запуска добавляется уникальный суффикс: запуски региона могут начаться в одну секунду
+            self.path = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d_%H%M%S_'), dir=self.region_dir)
+            self.run_id = os.path.basename(self.path)
+            self.meta = {'options': self.options, 'fetched': False, 'created': []}
+            self._write_meta()
+
+    def _read_meta(self, run):
+        try:
+            with open(os.path.join(self.region_dir, run, META_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _options(self, run):
+        meta = self._read_meta(run)
+        return meta['options'] if meta is not None else None
+
+    def _write_meta(self):
+        _write_atomic(os.path.join(self.path, META_FILE), json.dumps(self.meta, ensure_ascii=False).encode('utf-8'))
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith('pages_') and name.endswith('.jsonl.gz'))
+
+    def _write_segment(self, first, lines):
+        data = gzip.compress(''.join(lines).encode('utf-8'))
+        _write_atomic(os.path.join(self.path, f"pages_{first:07d}.jsonl.gz"), data)
+
+    def pages(self, fetch):
+        """
+        Генератор страниц (списков вакансий): сначала сохраненные, затем загружаемые из API
+        начиная со следующей страницы; загруженные страницы сохраняются.
+
+        Входные параметры:
+        fetch -- функция: номер начальной страницы -> генератор страниц API
+        """
+        count = 0
+        for name in self._segments():
+            with gzip.open(os.path.join(self.path, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    count += 1
+                    yield json.loads(line)
+        if self.meta.get('fetched'):
+            return
+        first, lines = count, []
+        try:
+            for page in fetch(count):
+                # страница записывается до передачи дальше (последующие этапы изменяют записи на месте)
+                lines.append(json.dumps(page, ensure_ascii=False) + '\n')
+                yield page
+                if len(lines) == SPOOL_PAGES:
+                    self._write_segment(first, lines)
+                    first, lines = first + len(lines), []
+            with self._lock:
+                self.meta['fetched'] = True
+                self._write_meta()
+        finally:
+            # полностью полученные страницы сохраняются и при прерывании загрузки
+            if lines:
+                self._write_segment(first, lines)
+
+    def save_chunk(self, index, ids, chunk):
+        """
+        Сохранить результаты обработки порции до выгрузки.
+
+        Входные параметры:
+        index -- номер порции
+        ids -- идентификаторы вакансий порции (после исключения повторов)
+        chunk -- данные для выгрузки (кортеж таблиц)
+        """
+        _write_atomic(os.path.join(self.path, f"chunk_{index:05d}.pkl"),
+                      pickle.dumps((ids, chunk), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def chunk(self, index):
+        """
+        Сохраненные результаты порции: пара (идентификаторы вакансий, данные) или None.
+
+        Входные параметры:
+        index -- номер порции
+        """
+        path = os.path.join(self.path, f"chunk_{index:05d}.pkl")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def mark_loaded(self, index):
+        """
+        Отметить порцию как выгруженную в БД.
+
+        Входные параметры:
+        index -- номер порции
+        """
+        _write_atomic(os.path.join(self.path, f"loaded_{index:05d}"), b'')
+
+    def loaded(self, index):
+        """
+        Выгружена ли порция в БД.
+
+        Входные параметры:
+        index -- номер порции
+        """
+        return os.path.exists(os.path.join(self.path, f"loaded_{index:05d}"))
+
+    @property
+    def created(self):
+        """Таблицы, созданные в этом запуске (в них загружаются все столбцы порций)."""
+        return set(self.meta['created'])
+
+    def add_created(self, table):
+        """
+        Запомнить таблицу, созданную в этом запуске.
+
+        Входные параметры:
+        table -- имя таблицы со схемой
+        """
+        with self._lock:
+            self.meta['created'] = sorted(set(self.meta['created']) | {table})
+            self._write_meta()
+
+    def finish(self):
+        """Удалить каталог успешно завершенного запуска."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        try:
+            os.rmdir(self.region_dir)
+        except OSError:
+            pass
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Нормализация столбцов с кодами (ИНН, ОГРН, КПП, код региона, коды МРИГО/ОКПДТР).
+Коды приводятся к строкам без дробной части ('5400000000000.0' -> '5400000000000'),
+пустые значения -- к pd.NA. Обработка выполняется строковыми методами pandas над уникальными
+значениями столбца, а числовые столбцы переводятся в строки через целочисленный тип без записи float.
+"""
+
+import numpy as np
+import pandas as pd
+
+# строковые значения, означающие отсутствие кода (сравниваются без учета регистра)
+MISSING = ['', 'nan', 'none']
+
+
+def normalize_code(values):
+    """
+    Нормализовать столбец с кодами. Строковые операции выполняются только над уникальными
+    значениями столбца, после чего результат раскладывается по строкам по их меткам.
+
+    Входные параметры:
+    values -- столбец (pd.Series) с кодами в виде строк или чисел
+    """
+    # пропуски получают метку -1 и остаются пропусками
+    labels, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques)
+    if pd.api.types.is_float_dtype(uniques.dtype):
+        uniques = pd.Series(np.trunc(uniques)).astype('Int64')
+    uniques = uniques.astype('string').str.strip().str.replace(r'\..*', '', regex=True)
+    uniques = uniques.mask(uniques.str.lower().isin(MISSING))
+    return pd.Series(uniques.array.take(labels, allow_fill=True), index=values.index, name=values.name)
+
+
+def normalize_codes(frame, columns):
+    """
+    Нормализовать несколько столбцов с кодами; возвращает новую таблицу.
+
+    Входные параметры:
+    frame -- таблица pandas
+    columns -- столбцы с кодами
+    """
+    return frame.assign(**{column: normalize_code(frame[column]) for column in columns})
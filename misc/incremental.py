@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Инкрементальная загрузка: только вакансии, измененные после предыдущего запуска.
+  - Для каждого региона в таблице vacs.tv_fetch_state хранится отметка -- наибольшая дата изменения
+    (vacancy.modify-date) среди загруженных вакансий -- и время последней полной загрузки.
+  - Инкрементальный запуск запрашивает в API вакансии, измененные начиная с отметки (с запасом OVERLAP),
+    а строки с более ранней датой изменения, если API их все же вернул, отбрасываются до очистки.
+  - Отсутствие вакансии в инкрементальной выгрузке не означает ее закрытия, поэтому вакансии
+    закрываются только при полной загрузке; полная загрузка выполняется, если отметки еще нет
+    или с предыдущей полной загрузки прошло больше FULL_SWEEP_DAYS дней.
+  - Отметки хранятся в UTC без часового пояса (как и даты изменения, см. modify_dates), и период
+    полной загрузки отсчитывается по UTC, а не по местному времени сервера БД или процесса.
+"""
+
+import datetime
+
+import misc.lazy as lazy
+
+# константы модуля нужны при разборе параметров командной строки, а pandas и sqlalchemy -- только при загрузке
+pd = lazy.LazyModule('pandas')
+sa = lazy.LazyModule('sqlalchemy')
+
+# таблица с отметками загрузки по регионам
+STATE_TABLE = 'vacs.tv_fetch_state'
+
+# параметр API: вакансии, измененные начиная с указанного времени
+MODIFIED_FROM_PARAM = 'modifiedFrom'
+
+# период полной загрузки (дней), при которой закрываются отсутствующие в выгрузке вакансии
+FULL_SWEEP_DAYS = 7
+
+# запас при запросе изменений (даты изменения в API могут быть без времени и в другом часовом поясе)
+OVERLAP = datetime.timedelta(days=1)
+
+# столбец "сырой" таблицы с датой изменения вакансии
+MODIFY_DATE_COLUMN = 'vacancy.modify-date'
+
+
+def get_state(engine, region):
+    """
+    Отметка загрузки региона: пара (наибольшая дата изменения, время последней полной загрузки)
+    или (None, None), если регион еще не загружался.
+
+    Входные параметры:
+    engine -- подключение к БД
+    region -- двузначный код региона
+    """
+    row = engine.execute(sa.text(
+        f"SELECT modified_to, full_sweep_time FROM {STATE_TABLE} WHERE region_code = :region")
+        .bindparams(region=region)).fetchone()
+    return (row[0], row[1]) if row is not None else (None, None)
+
+
+def save_state(engine, region, modified_to, full_sweep):
+    """
+    Сохранить отметку загрузки региона.
+
+    Входные параметры:
+    engine -- подключение к БД
+    region -- двузначный код региона
+    modified_to -- наибольшая дата изменения загруженных вакансий (None -- не изменять)
+    full_sweep -- выполнена полная загрузка (обновляется время полной загрузки)
+    """
+    engine.execute(sa.text(
+        f"INSERT INTO {STATE_TABLE} AS s (region_code, modified_to, full_sweep_time, date_add) "
+        "VALUES (:region, :modified_to, CASE WHEN :full_sweep THEN timezone('UTC', now()) END, now()) "
+        "ON CONFLICT (region_code) DO UPDATE SET "
+        "modified_to = greatest(s.modified_to, excluded.modified_to), "
+        "full_sweep_time = coalesce(excluded.full_sweep_time, s.full_sweep_time), date_add = now()")
+        .bindparams(region=region, modified_to=modified_to, full_sweep=bool(full_sweep)))
+
+
+def utc_now():
+    """Текущее время в UTC без часового пояса (как отметки в STATE_TABLE)."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def modified_since(state, now=None, full_sweep_days=FULL_SWEEP_DAYS):
+    """
+    Время, начиная с которого запрашиваются изменения, или None, если нужна полная загрузка.
+
+    Входные параметры:
+    state -- отметка загрузки региона (см. get_state)
+    now -- текущее время в UTC без часового пояса (по умолчанию utc_now())
+    full_sweep_days -- период полной загрузки (дней)
+    """
+    modified_to, full_sweep_time = state
+    now = now if now is not None else utc_now()
+    if modified_to is None or full_sweep_time is None:
+        return None
+    if now - full_sweep_time >= datetime.timedelta(days=full_sweep_days):
+        return None
+    return modified_to - OVERLAP
+
+
+def api_params(since):
+    """
+    Параметры запроса страниц API для изменений начиная с since (пустой словарь -- полная загрузка).
+
+    Входные параметры:
+    since -- время (datetime) или None
+    """
+    if since is None:
+        return {}
+    return {MODIFIED_FROM_PARAM: since.strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+
+def modify_dates(df_raw):
+    """
+    Даты изменения вакансий порции (UTC без часового пояса; NaT, если даты нет или она не разобрана).
+
+    Входные параметры:
+    df_raw -- "сырая" таблица порции
+    """
+    if MODIFY_DATE_COLUMN not in df_raw.columns:
+        return pd.Series(pd.NaT, index=df_raw.index)
+    return pd.to_datetime(df_raw[MODIFY_DATE_COLUMN].astype(object), errors='coerce', utc=True).dt.tz_localize(None)
+
+
+def drop_unchanged(df_raw, dates, since):
+    """
+    Отбросить вакансии, измененные раньше since (вакансии без даты изменения остаются).
+
+    Входные параметры:
+    df_raw -- "сырая" таблица порции
+    dates -- даты изменения вакансий порции (см. modify_dates)
+    since -- время, начиная с которого запрошены изменения (None -- без отбора)
+    """
+    if since is None:
+        return df_raw
+    return df_raw[~(dates < since)]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Нормализация имен вакансий перед сопоставлением с ОКПДТР.
+  - Имя приводится к нижнему регистру и обрезается перед первым вхождением слова-разделителя
+    (разряд, категория, класс и т.п., см. misc/okpdtr_splits.py или таблицу vacs.tv_job_splits),
+    затем из него удаляются цифры и знаки.
+  - Шаблон разделителей компилируется один раз; слова экранируются. Место разреза -- самое левое
+    вхождение любого из слов и от порядка слов в шаблоне не зависит.
+  - Столбец обрабатывается по уникальным значениям: повторяющиеся имена нормализуются один раз.
+Результат совпадает с прежним re.sub(r"[\W\d]", '', re.split('|'.join(dictionary), job.lower())[0]).
+"""
+
+import re
+
+import misc.okpdtr_splits as oks
+
+# цифры и знаки, удаляемые из имени вакансии
+NON_LETTERS_RE = re.compile(r"[\W\d]")
+
+
+class JobNormalizer:
+    """
+    Нормализатор имен вакансий.
+
+    Входные параметры:
+    words -- слова-разделители (по умолчанию misc.okpdtr_splits.dictionary)
+    """
+
+    def __init__(self, words=None):
+        words = oks.dictionary if words is None else words
+        self.words = sorted({word.strip().lower() for word in words if word and word.strip()})
+        self.split_re = re.compile('|'.join(map(re.escape, self.words))) if self.words else None
+
+    def normalize(self, job):
+        """
+        Нормализовать одно имя вакансии.
+
+        Входные параметры:
+        job -- имя вакансии
+        """
+        job = job.lower()
+        if self.split_re is not None:
+            found = self.split_re.search(job)
+            if found is not None:
+                job = job[:found.start()]
+        return NON_LETTERS_RE.sub('', job)
+
+    def normalize_column(self, jobs):
+        """
+        Нормализовать столбец имен вакансий; возвращает список в исходном порядке.
+
+        Входные параметры:
+        jobs -- список или pd.Series имен вакансий
+        """
+        memo = {}
+        result = []
+        for job in jobs:
+            value = memo.get(job)
+            if value is None:
+                value = memo[job] = self.normalize(job)
+            result.append(value)
+        return result
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Отложенный импорт модулей: модуль импортируется при первом обращении к его атрибуту.
+  - Тяжелые зависимости (pandas, numpy, sqlalchemy, rapidfuzz, jellyfish) загружаются только на том этапе,
+    которому они нужны, а подключение к БД (misc.db создает engine при импорте) -- при первом запросе к БД.
+    Поэтому команды, которым они не нужны (например, python -m tv fetch или --help), запускаются быстро.
+  - Импорт выполняется через importlib (с его блокировками), поэтому первое обращение из нескольких потоков
+    безопасно.
+"""
+
+import importlib
+
+
+class LazyModule:
+    """
+    Модуль, импортируемый при первом обращении к атрибуту.
+
+    Входные параметры:
+    name -- полное имя модуля (например, 'pandas' или 'misc.db')
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{'' if self._module is None else ' (loaded)'}>"
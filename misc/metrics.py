@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Метрики одного запуска обработки региона.
+  - Время этапов (загрузка страниц API, очистка, сопоставление с МРИГО/ОКПДТР, сравнение с БД,
+    выгрузка и т.д.); время этапа, выполняемого в нескольких порциях, суммируется.
+  - Перцентили времени ответа API на одну страницу, число строк в секунду, пиковый объем памяти
+    процесса (RSS), доли найденных в кэше и сопоставленных значений.
+  - Метрики записываются в журнал (столбец vacs.tv_log.metrics типа jsonb).
+  - Необязательное профилирование запуска (cProfile или pyinstrument, если он установлен).
+"""
+
+import cProfile
+import contextlib
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+try:
+    # модуль есть только в Unix; в Windows пиковый объем памяти берется из psutil, если он установлен
+    import resource
+except ImportError:
+    resource = None
+
+# перцентили времени ответа API
+PERCENTILES = [50, 90, 99]
+
+
+class Metrics:
+    """Время этапов и счетчики одного запуска (этапы могут выполняться в разных потоках)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.page_latencies = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Измерить время выполнения блока и добавить его к времени этапа.
+
+        Входные параметры:
+        name -- название этапа
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        """
+        Добавить время к времени этапа.
+
+        Входные параметры:
+        name -- название этапа
+        seconds -- время (сек.)
+        """
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add(self, name, value=1):
+        """
+        Увеличить счетчик.
+
+        Входные параметры:
+        name -- название счетчика
+        value -- прибавляемое значение
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """Метрики запуска в виде словаря (для записи в JSON)."""
+        total = time.perf_counter() - self.started
+        peak_rss = peak_rss_mb()
+        with self._lock:
+            stages = dict(self.stages)
+            counters = dict(self.counters)
+            latencies = list(self.page_latencies)
+        result = {
+            'total_s': round(total, 3),
+            'stages_s': {name: round(seconds, 3) for name, seconds in stages.items()},
+            'counters': counters,
+            'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+        }
+        if counters.get('rows_fetched'):
+            result['rows_per_s'] = round(counters['rows_fetched'] / total, 1) if total else None
+        if latencies:
+            values = np.percentile(np.array(latencies) * 1000, PERCENTILES)
+            result['page_latency_ms'] = {f'p{p}': round(float(v), 1) for p, v in zip(PERCENTILES, values)}
+            result['pages'] = len(latencies)
+        for kind in ('cache', 'mrigo', 'okpdtr'):
+            hit, total_keys = counters.get(f'{kind}_hits', 0), counters.get(f'{kind}_total', 0)
+            if total_keys:
+                result[f'{kind}_hit_rate'] = round(hit / total_keys, 4)
+        return result
+
+    def to_json(self):
+        """Метрики запуска в виде строки JSON."""
+        return json.dumps(self.as_dict(), ensure_ascii=False)
+
+    def summary(self):
+        """Краткая сводка метрик для печати."""
+        data = self.as_dict()
+        stages = ', '.join(f"{name} -- {seconds:.2f} с" for name, seconds in data['stages_s'].items())
+        lines = [f">> Время этапов: {stages}"]
+        if 'page_latency_ms' in data:
+            latency = ', '.join(f"{name} -- {value} мс" for name, value in data['page_latency_ms'].items())
+            lines.append(f">> Время ответа API на страницу ({data['pages']} стр.): {latency}")
+        if 'rows_per_s' in data:
+            lines.append(f">> Строк в секунду: {data['rows_per_s']}")
+        if data['peak_rss_mb'] is not None:
+            lines.append(f">> Пиковый объем памяти (RSS): {data['peak_rss_mb']} МБ")
+        return '\n'.join(lines)
+
+
+def peak_rss_mb():
+    """
+    Пиковый объем памяти (RSS) текущего процесса в мегабайтах
+    (None, если его нельзя определить: нет модуля resource и не установлен psutil).
+    """
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # в Linux значение в килобайтах, в macOS -- в байтах
+        return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    # в Windows есть пиковый рабочий набор, в остальных системах -- только текущий RSS
+    return getattr(memory, 'peak_wset', memory.rss) / 2 ** 20
+
+
+@contextlib.contextmanager
+def profiled(path, profiler='cprofile'):
+    """
+    Профилировать блок и сохранить результат в файл (без профилирования, если path равен None).
+    cProfile сохраняет статистику для pstats/snakeviz (только для потока, в котором вызван),
+    pyinstrument -- отчет HTML.
+
+    Входные параметры:
+    path -- файл результата профилирования
+    profiler -- 'cprofile' или 'pyinstrument'
+    """
+    if path is None:
+        yield
+        return
+    if profiler == 'pyinstrument':
+        try:
+            import pyinstrument
+        except ImportError:
+            raise ImportError("Для профилирования pyinstrument установите пакет: pip install pyinstrument")
+        profile = pyinstrument.Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profile.output_html())
+    else:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
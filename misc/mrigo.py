@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Сопоставление адресов вакансий с кодами МРИГО.
+  - Справочник МРИГО разбирается один раз при создании сопоставителя.
+  - Адреса, для которых по индексу токенов уже известна оценка 100, не сравниваются нечетко.
+  - Остальные уникальные адреса оцениваются пакетно (матрица rapidfuzz.process.cdist
+    по частям ограниченного размера, на всех ядрах).
+Результат совпадает с process.extractOne(address, mrigo, scorer=fuzz.token_set_ratio):
+выбирается первое по порядку справочника наименование с наибольшей оценкой.
+Для повторного подбора порога без пересчета оценок сопоставитель возвращает и k лучших кандидатов
+с оценками (top_many, по той же матрице оценок).
+"""
+
+import numpy as np
+
+from rapidfuzz import fuzz
+from rapidfuzz import process
+from rapidfuzz import utils
+
+# максимальное число ячеек матрицы оценок в одной части (~64 МБ для float64)
+MAX_CELLS = 8_000_000
+
+# наименьшая оценка кандидата, сохраняемого для повторного подбора порога
+TOP_MIN_SCORE = 50
+
+
+class MrigoMatcher:
+    """
+    Сопоставитель адресов с наименованиями МРИГО.
+
+    Входные параметры:
+    mrigo_id_name -- таблица blinov.mrigo (столбцы mrigo, id_mrigo)
+    workers -- число потоков для нечеткого сопоставления (-1 -- все ядра)
+    max_cells -- максимальное число ячеек матрицы оценок в одной части
+    """
+
+    def __init__(self, mrigo_id_name, workers=-1, max_cells=MAX_CELLS):
+        self.names = mrigo_id_name['mrigo'].tolist()
+        # при повторяющихся наименованиях используется последний код, как в dict(zip(mrigo, id_mrigo))
+        id_by_name = dict(zip(self.names, mrigo_id_name['id_mrigo'].tolist()))
+        self.ids = [id_by_name[name] for name in self.names]
+        self.workers = workers
+        self.chunk_rows = max(1, max_cells // max(1, len(self.names)))
+
+        self.token_sets = [set(utils.default_process(name).split()) for name in self.names]
+        # токен -> номера наименований, содержащих токен
+        self.index = {}
+        for i, tokens in enumerate(self.token_sets):
+            for token in tokens:
+                self.index.setdefault(token, []).append(i)
+
+    def exact_hit(self, address):
+        """
+        Номер первого наименования с оценкой token_set_ratio, равной 100 (None, если такого нет).
+        Оценка равна 100, когда множество токенов одной строки содержится в множестве токенов другой.
+
+        Входные параметры:
+        address -- очищенный адрес вакансии
+        """
+        tokens = set(utils.default_process(address).split())
+        if not tokens:
+            return None
+        counts = {}
+        for token in tokens:
+            for i in self.index.get(token, ()):
+                counts[i] = counts.get(i, 0) + 1
+        hits = [i for i, n in counts.items() if n == len(tokens) or n == len(self.token_sets[i])]
+        return min(hits) if hits else None
+
+    def score(self, addresses):
+        """
+        Номера лучших наименований и их оценки для списка адресов.
+
+        Входные параметры:
+        addresses -- список уникальных очищенных адресов
+        """
+        best = np.zeros(len(addresses), dtype=np.int64)
+        scores = np.zeros(len(addresses), dtype=np.float64)
+        for start in range(0, len(addresses), self.chunk_rows):
+            matrix = process.cdist(
+                addresses[start:start + self.chunk_rows], self.names,
+                scorer=fuzz.token_set_ratio, processor=utils.default_process,
+                dtype=np.float64, workers=self.workers)
+            rows = np.arange(matrix.shape[0])
+            # argmax возвращает первый из равных максимумов, как и extractOne
+            best[start:start + len(rows)] = matrix.argmax(axis=1)
+            scores[start:start + len(rows)] = matrix[rows, best[start:start + len(rows)]]
+        return best, scores
+
+    def match(self, addresses):
+        """
+        Сопоставить адреса с МРИГО; возвращает список пар (id_mrigo, оценка) в порядке адресов.
+
+        Входные параметры:
+        addresses -- список очищенных адресов вакансий
+        """
+        unique = list(dict.fromkeys(addresses))
+        result = {}
+        fuzzy = []
+        for address in unique:
+            hit = self.exact_hit(address)
+            if hit is None:
+                fuzzy.append(address)
+            else:
+                result[address] = (self.ids[hit], 100.0)
+        if fuzzy and self.names:
+            best, scores = self.score(fuzzy)
+            for address, i, score in zip(fuzzy, best, scores):
+                result[address] = (self.ids[i], float(score))
+        return [result[address] for address in addresses]
+
+    def top_many(self, addresses, k, min_score=TOP_MIN_SCORE):
+        """
+        k лучших кандидатов для списка адресов: для каждого адреса -- список пар (id_mrigo, оценка)
+        по убыванию оценки (при равных оценках -- по порядку справочника), без оценок ниже min_score.
+        Первый элемент совпадает с результатом match.
+
+        Входные параметры:
+        addresses -- список очищенных адресов вакансий
+        k -- число кандидатов
+        min_score -- наименьшая оценка кандидата (от 0 до 100)
+        """
+        unique = list(dict.fromkeys(addresses))
+        result = {}
+        k = min(k, len(self.names))
+        for start in range(0, len(unique), self.chunk_rows):
+            part = unique[start:start + self.chunk_rows]
+            matrix = process.cdist(
+                part, self.names, scorer=fuzz.token_set_ratio, processor=utils.default_process,
+                dtype=np.float64, workers=self.workers)
+            # устойчивая сортировка по убыванию оценки сохраняет порядок справочника при равных оценках
+            best = np.argsort(-matrix, axis=1, kind='stable')[:, :k]
+            for row, address in enumerate(part):
+                result[address] = [(self.ids[i], float(matrix[row, i])) for i in best[row]
+                                   if matrix[row, i] >= min_score]
+        return [result[address] for address in addresses]
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Сопоставление имен вакансий с кодами ОКПДТР.
+  - Наименования ОКПДТР очищаются и индексируются один раз при создании сопоставителя.
+  - Для каждого уникального имени вакансии векторно вычисляется верхняя граница
+    оценки Джаро по длинам строк и числу общих символов; кандидаты, у которых
+    граница ниже порога или ниже уже найденной оценки, не оцениваются.
+  - Оставшиеся кандидаты оцениваются нативной реализацией Джаро (jellyfish).
+Результат совпадает с полным перебором: выбирается первое по порядку наименование
+с наибольшей оценкой, а при оценке ниже порога код не назначается.
+Для повторного подбора порога без пересчета оценок сопоставитель возвращает и k лучших кандидатов
+с оценками (top_many): кандидаты, граница которых ниже k-й найденной оценки, не оцениваются.
+"""
+
+import heapq
+import re
+
+import jellyfish
+import numpy as np
+
+# jellyfish >= 0.8 называет функцию jaro_similarity, более ранние версии -- jaro_distance
+jaro = getattr(jellyfish, 'jaro_similarity', None) or jellyfish.jaro_distance
+
+# допуск при сравнении верхней границы с оценками (погрешность вычислений с плавающей точкой)
+EPS = 1e-9
+
+
+def clean_name(name):
+    """
+    Очистка наименования ОКПДТР: нижний регистр, без цифр и знаков.
+
+    Входные параметры:
+    name -- наименование ОКПДТР
+    """
+    return re.sub(r"[\W\d]", '', name.lower())
+
+
+# наименьшая оценка кандидата, сохраняемого для повторного подбора порога
+TOP_MIN_SCORE = 0.5
+
+
+class OkpdtrMatcher:
+    """
+    Сопоставитель очищенных имен вакансий с наименованиями ОКПДТР.
+
+    Входные параметры:
+    okpdtr_id_name -- объединенная таблица blinov.okpdtr и blinov.okpdtr_assoc (столбцы id, name)
+    """
+
+    def __init__(self, okpdtr_id_name):
+        self.ids = okpdtr_id_name['id'].tolist()
+        self.names = [clean_name(name) for name in okpdtr_id_name['name'].tolist()]
+        self.alphabet = {c: i for i, c in enumerate(sorted(set(''.join(self.names))))}
+        # число вхождений каждого символа алфавита в каждое наименование
+        self.counts = np.zeros((len(self.names), len(self.alphabet)), dtype=np.int32)
+        for row, name in enumerate(self.names):
+            for c in name:
+                self.counts[row, self.alphabet[c]] += 1
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.float64)
+
+    def upper_bounds(self, job):
+        """
+        Верхние границы оценки Джаро имени вакансии со всеми наименованиями.
+        Число совпавших символов m не больше числа общих символов с учетом кратности,
+        а доля транспозиций неотрицательна, поэтому jaro <= (m/|a| + m/|b| + 1) / 3.
+
+        Входные параметры:
+        job -- очищенное имя вакансии
+        """
+        query = np.zeros(len(self.alphabet), dtype=np.int32)
+        for c in job:
+            i = self.alphabet.get(c)
+            if i is not None:
+                query[i] += 1
+        common = np.minimum(self.counts, query).sum(axis=1).astype(np.float64)
+        bounds = np.zeros(len(self.names), dtype=np.float64)
+        nonzero = (common > 0) & (self.lengths > 0)
+        bounds[nonzero] = (common[nonzero] / self.lengths[nonzero] + common[nonzero] / len(job) + 1) / 3
+        return bounds
+
+    def best(self, job, threshold):
+        """
+        Номер первого наименования с наибольшей оценкой Джаро и сама оценка.
+        Возвращает (None, оценка), если наибольшая оценка меньше порога.
+
+        Входные параметры:
+        job -- очищенное имя вакансии
+        threshold -- порог оценки (от 0 до 1)
+        """
+        bounds = self.upper_bounds(job) if job else np.zeros(len(self.names))
+        candidates = np.flatnonzero(bounds >= threshold - EPS)
+        order = candidates[np.argsort(-bounds[candidates], kind='stable')]
+        best_index, best_score = None, -1.0
+        for i in order:
+            if bounds[i] < best_score - EPS:
+                break
+            score = jaro(self.names[i], job)
+            if score > best_score or (score == best_score and i < best_index):
+                best_index, best_score = i, score
+        if best_index is None or best_score < threshold:
+            return None, max(best_score, 0.0)
+        return int(best_index), best_score
+
+    def match(self, jobs, threshold):
+        """
+        Коды ОКПДТР для списка очищенных имен вакансий (NaN, если оценка ниже порога).
+
+        Входные параметры:
+        jobs -- список очищенных имен вакансий
+        threshold -- порог оценки (от 0 до 1)
+        """
+        result = {}
+        for job in dict.fromkeys(jobs):
+            index, _ = self.best(job, threshold)
+            result[job] = np.nan if index is None else self.ids[index]
+        return [result[job] for job in jobs]
+
+    def top(self, job, k, min_score=TOP_MIN_SCORE):
+        """
+        k лучших наименований для имени вакансии: список пар (номер наименования, оценка)
+        по убыванию оценки (при равных оценках -- по порядку наименований), без оценок ниже min_score.
+        Первый элемент совпадает с результатом best при пороге не выше его оценки.
+
+        Входные параметры:
+        job -- очищенное имя вакансии
+        k -- число кандидатов
+        min_score -- наименьшая оценка кандидата (от 0 до 1)
+        """
+        if not job:
+            return []
+        bounds = self.upper_bounds(job)
+        candidates = np.flatnonzero(bounds >= min_score - EPS)
+        order = candidates[np.argsort(-bounds[candidates], kind='stable')]
+        # куча из k лучших пар (оценка, -номер): в вершине -- худшая из отобранных
+        heap = []
+        for i in order:
+            if len(heap) == k and bounds[i] < heap[0][0] - EPS:
+                break
+            score = jaro(self.names[i], job)
+            if score < min_score:
+                continue
+            item = (score, -int(i))
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        return [(-i, score) for score, i in sorted(heap, reverse=True)]
+
+    def top_many(self, jobs, k, min_score=TOP_MIN_SCORE):
+        """
+        k лучших кандидатов для списка очищенных имен вакансий: для каждого имени -- список пар
+        (код ОКПДТР, оценка) по убыванию оценки.
+
+        Входные параметры:
+        jobs -- список очищенных имен вакансий
+        k -- число кандидатов
+        min_score -- наименьшая оценка кандидата (от 0 до 1)
+        """
+        result = {}
+        for job in dict.fromkeys(jobs):
+            result[job] = [(self.ids[i], score) for i, score in self.top(job, k, min_score)]
+        return [result[job] for job in jobs]
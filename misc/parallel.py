@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Параллельное сопоставление в пуле процессов.
+  - Сопоставители (с уже построенными индексами справочников) регистрируются в исполнителе
+    до первого сопоставления, и пул создается один раз; дочерние процессы получают сопоставители
+    один раз на процесс через initializer. Справочники не сериализуются для каждой задачи --
+    в задачу передаются только ключи.
+  - Процессы пула запускаются через forkserver (или spawn, где его нет, например в Windows), а не fork:
+    к моменту сопоставления в процессе уже работают потоки загрузки страниц и выгрузки в БД
+    с открытыми соединениями, и fork такого процесса может унаследовать захваченные блокировки.
+  - Уникальные ключи делятся на части по порядку, части обрабатываются в пуле,
+    а результаты собираются в исходном порядке ключей, поэтому совпадают с последовательным вызовом.
+"""
+
+import math
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+# число частей на один процесс (мелкие части выравнивают загрузку процессов)
+SHARDS_PER_WORKER = 8
+
+# меньше этого числа уникальных ключей сопоставление выполняется в текущем процессе
+MIN_PARALLEL_KEYS = 64
+
+# сопоставители, доступные в дочерних процессах пула (по имени)
+_MATCHERS = {}
+
+# способы запуска процессов пула в порядке предпочтения (fork не используется, см. выше)
+START_METHODS = ['forkserver', 'spawn']
+
+
+def _init_worker(matchers):
+    _MATCHERS.update(matchers)
+
+
+def _match_shard(task):
+    name, method, keys, args = task
+    return getattr(_MATCHERS[name], method)(keys, *args)
+
+
+class MatchExecutor:
+    """
+    Исполнитель сопоставления: последовательно (workers <= 1) или в пуле процессов.
+
+    Входные параметры:
+    workers -- число процессов для сопоставления
+    """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, int(workers))
+        self.matchers = {}
+        self.pool = None
+
+    def __contains__(self, name):
+        return name in self.matchers
+
+    def register(self, name, matcher):
+        """
+        Зарегистрировать сопоставитель (все сопоставители регистрируются до первого сопоставления,
+        иначе уже созданный пул процессов создается заново, чтобы дочерние процессы получили новый).
+
+        Входные параметры:
+        name -- имя сопоставителя
+        matcher -- объект с методом match(keys, *args), возвращающим список результатов в порядке keys
+        """
+        self.matchers[name] = matcher
+        self._shutdown()
+
+    def _start(self):
+        available = multiprocessing.get_all_start_methods()
+        method = next(method for method in START_METHODS if method in available)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method),
+                                        initializer=_init_worker, initargs=(self.matchers,))
+
+    def _shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def match(self, name, keys, *args, method='match'):
+        """
+        Сопоставить список ключей; результат совпадает с matcher.match(keys, *args)
+        (или с вызовом другого метода сопоставителя с теми же соглашениями, например top_many).
+
+        Входные параметры:
+        name -- имя зарегистрированного сопоставителя
+        keys -- список ключей
+        args -- прочие параметры метода (например, порог оценки)
+        method -- имя метода сопоставителя
+        """
+        matcher = self.matchers[name]
+        unique = list(dict.fromkeys(keys))
+        if self.workers <= 1 or len(unique) < MIN_PARALLEL_KEYS:
+            return getattr(matcher, method)(keys, *args)
+        if self.pool is None:
+            self._start()
+        size = math.ceil(len(unique) / (self.workers * SHARDS_PER_WORKER))
+        tasks = [(name, method, unique[start:start + size], args) for start in range(0, len(unique), size)]
+        found = {}
+        for shard, values in zip(tasks, self.pool.map(_match_shard, tasks)):
+            found.update(zip(shard[2], values))
+        return [found[key] for key in keys]
+
+    def close(self):
+        """Остановить пул процессов."""
+        self._shutdown()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Потоковая обработка порциями с ограниченными очередями между этапами.
+  - prefetch: источник порций (загрузка страниц API) работает в отдельном потоке
+    и опережает обработку не более чем на заданное число порций.
+  - Worker: последний этап (выгрузка в БД) выполняется в отдельном потоке;
+    передача порции блокируется, пока очередь заполнена.
+Ошибка этапа передается в основной поток и возбуждается там заново.
+"""
+
+import queue
+import threading
+
+# число порций, ожидающих обработки между соседними этапами
+QUEUE_SIZE = 2
+
+# признак окончания потока порций
+DONE = object()
+
+# период проверки признака остановки при заполненной очереди (сек.)
+POLL_INTERVAL = 0.1
+
+
+def prefetch(iterable, maxsize=QUEUE_SIZE):
+    """
+    Генератор элементов iterable, которые вычисляются в отдельном потоке заранее
+    (в очереди не более maxsize элементов). Исключение источника возбуждается при получении
+    следующего элемента. При закрытии генератора источник останавливается и закрывается.
+
+    Входные параметры:
+    iterable -- источник элементов (например, генератор порций)
+    maxsize -- наибольшее число заранее вычисленных элементов
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((DONE, None))
+        except BaseException as e:
+            put((DONE, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class Worker:
+    """
+    Поток, последовательно обрабатывающий переданные элементы.
+    После первой ошибки остальные элементы пропускаются, а ошибка возбуждается
+    при следующей передаче элемента или при закрытии.
+
+    Входные параметры:
+    function -- функция обработки одного элемента
+    maxsize -- наибольшее число элементов, ожидающих обработки
+    """
+
+    def __init__(self, function, maxsize=QUEUE_SIZE):
+        self.function = function
+        self.items = queue.Queue(maxsize)
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.items.get()
+            if item is DONE:
+                return
+            if self.error is None:
+                try:
+                    self.function(item)
+                except BaseException as e:
+                    self.error = e
+
+    def put(self, item):
+        """
+        Передать элемент на обработку (ожидает, если очередь заполнена).
+
+        Входные параметры:
+        item -- элемент
+        """
+        if self.error is not None:
+            raise self.error
+        self.items.put(item)
+
+    def close(self):
+        """Дождаться обработки переданных элементов и остановить поток."""
+        if not self.closed:
+            self.closed = True
+            self.items.put(DONE)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Параметры регионов для загрузки вакансий:
+  - список кодов субъектов РФ;
+  - правила нормализации адресов для сопоставления с МРИГО;
+  - таблицы-справочники МРИГО по регионам.
+"""
+
+import os
+
+# адрес API ТРУДВСЕМ (переменная окружения TRUDVSEM_API_URL -- например, локальная заглушка для бенчмарков)
+API_BASE = os.environ.get('TRUDVSEM_API_URL', 'http://opendata.trudvsem.ru/api/v1')
+
+# коды субъектов РФ (первые две цифры кода КЛАДР)
+REGIONS = [f'{code:02d}' for code in range(1, 80)] + ['83', '86', '87', '89', '91', '92']
+
+# регион по умолчанию (исторически единственный)
+DEFAULT_REGION = '54'
+
+# общие шаблоны выделения населенного пункта/района из адреса (применяются по порядку)
+DEFAULT_PATTERNS = [r'рн\s\w+\s', r'г\s\w+\s']
+
+# правила нормализации адресов:
+# prefix -- строка, удаляемая из начала адреса (None -- название региона из вакансии);
+# patterns -- шаблоны, применяемые по порядку, каждый совпавший фрагмент заменяет адрес
+ADDRESS_RULES = {
+    '54': {
+        'prefix': 'Новосибирская область, ',
+        'patterns': [r'Новосибирский'] + DEFAULT_PATTERNS,
+    },
+}
+
+# справочники МРИГО по регионам (для остальных регионов сопоставление с МРИГО не выполняется)
+MRIGO_TABLES = {
+    '54': 'blinov.mrigo',
+}
+
+
+def api_url(region):
+    """
+    Адрес ресурса API ТРУДВСЕМ с вакансиями региона.
+
+    Входные параметры:
+    region -- двузначный код региона
+    """
+    return f"{API_BASE.rstrip('/')}/vacancies/region/{region}"
+
+
+def address_rules(region):
+    """
+    Правила нормализации адресов для региона.
+
+    Входные параметры:
+    region -- двузначный код региона
+    """
+    return ADDRESS_RULES.get(region, {'prefix': None, 'patterns': DEFAULT_PATTERNS})
+
+
+def clean_addresses(addresses, region_names, rules):
+    """
+    Привести адреса вакансий к виду, пригодному для сопоставления с МРИГО (по столбцу целиком).
+    Каждый шаблон из правил применяется к результату предыдущего; совпавший фрагмент заменяет адрес.
+
+    Входные параметры:
+    addresses -- столбец (pd.Series) с адресами вакансий
+    region_names -- столбец (pd.Series) с названиями регионов из вакансий
+    rules -- правила нормализации адресов региона (см. address_rules)
+    """
+    addresses = addresses.astype('str')
+    if rules['prefix'] is not None:
+        addresses = addresses.str.replace(rules['prefix'], '', n=1, regex=False)
+    else:
+        for region_name in region_names.dropna().unique():
+            mask = region_names == region_name
+            addresses[mask] = addresses[mask].str.replace(f"{region_name}, ", '', n=1, regex=False)
+    addresses = addresses.str.replace(r"[\,\-\.\d]", '', regex=True)
+    for pattern in rules['patterns']:
+        found = addresses.str.extract(f"({pattern})", expand=False)
+        addresses = found.where(found.notna(), addresses)
+    return addresses
+
+
+def parse_regions(value):
+    """
+    Разобрать список регионов из командной строки ("54", "54,42,22" или "all").
+
+    Входные параметры:
+    value -- строка со списком кодов через запятую
+    """
+    if value.strip().lower() == 'all':
+        return list(REGIONS)
+    regions = [f'{int(code):02d}' for code in value.split(',') if code.strip()]
+    unknown = sorted(set(regions) - set(REGIONS))
+    if unknown:
+        raise ValueError(f"Неизвестные коды регионов: {', '.join(unknown)}")
+    return regions
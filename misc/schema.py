@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Типы столбцов таблиц в памяти.
+  - Состав столбцов "сырой" таблицы постоянный (RAW_COLUMNS): API не передает необязательные поля,
+    и в порции, где их нет ни у одной вакансии, json_normalize не создает соответствующих столбцов.
+  - Столбцы "сырой" таблицы с небольшим числом различных значений (источник, регион, график,
+    образование, отрасль и т.п.) хранятся как категории; типы сохраняются при разбиении на
+    отношения 'Компании' и 'Вакансии' и при выгрузке (COPY записывает те же строки).
+  - Коды МРИГО/ОКПДТР после сопоставления хранятся в целочисленном типе с пропусками (Int64),
+    если все коды -- числа без ведущих нулей; иначе -- строками (см. misc.codes).
+  - Отчет об объеме памяти, занимаемой таблицами, на каждом этапе.
+"""
+
+import numpy as np
+import pandas as pd
+
+import misc.codes as codes
+
+# столбцы "сырой" таблицы, используемые при обработке (отсутствующие в порции столбцы добавляются пустыми)
+RAW_COLUMNS = [
+    'vacancy.id',
+    'vacancy.source',
+    'vacancy.region.region_code',
+    'vacancy.region.name',
+    'vacancy.company.companycode',
+    'vacancy.company.inn',
+    'vacancy.company.ogrn',
+    'vacancy.company.kpp',
+    'vacancy.company.name',
+    'vacancy.company.hr-agency',
+    'vacancy.company.url',
+    'vacancy.company.site',
+    'vacancy.company.phone',
+    'vacancy.company.fax',
+    'vacancy.company.email',
+    'vacancy.company.code_industry_branch',
+    'vacancy.addresses.address',
+    'vacancy.requirement.experience',
+    'vacancy.requirement.education',
+    'vacancy.requirement.qualification',
+    'vacancy.employment',
+    'vacancy.schedule',
+    'vacancy.job-name',
+    'vacancy.category.specialisation',
+    'vacancy.category.industry',
+    'vacancy.duty',
+    'vacancy.term.text',
+    'vacancy.social_protected',
+    'vacancy.salary_min',
+    'vacancy.salary_max',
+    'vacancy.salary',
+    'vacancy.currency',
+    'vacancy.vac_url',
+    'vacancy.creation-date',
+    'vacancy.modify-date',
+]
+
+# столбцы "сырой" таблицы, которые хранятся как категории
+RAW_CATEGORIES = [
+    'vacancy.source',
+    'vacancy.region.name',
+    'vacancy.requirement.experience',
+    'vacancy.employment',
+    'vacancy.schedule',
+    'vacancy.job-name',
+    'vacancy.category.specialisation',
+    'vacancy.requirement.education',
+    'vacancy.term.text',
+    'vacancy.social_protected',
+    'vacancy.salary',
+    'vacancy.currency',
+    'vacancy.category.industry',
+    'vacancy.company.code_industry_branch',
+]
+
+# столбцы с кодами справочников в отношении 'Вакансии'
+VACANCIES_INT_CODES = ['id_mrigo', 'id_okpdtr']
+
+# доля различных значений, выше которой категория не дает выигрыша по памяти
+MAX_CATEGORY_SHARE = 0.5
+
+# целочисленный код без ведущих нулей (помещается в int64)
+INT_CODE_PATTERN = r'[1-9]\d{0,17}|0'
+
+
+def apply_raw(frame):
+    """
+    Привести столбцы "сырой" таблицы к компактным типам; возвращает новую таблицу.
+    Столбцы, которых нет в таблице, и столбцы с большой долей различных значений пропускаются.
+
+    Входные параметры:
+    frame -- "сырая" таблица после разбора страниц API
+    """
+    columns = {}
+    for column in RAW_CATEGORIES:
+        if column not in frame.columns or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            continue
+        values = frame[column]
+        if values.nunique() > MAX_CATEGORY_SHARE * max(len(values), 1):
+            continue
+        columns[column] = values.astype('category')
+    return frame.assign(**columns)
+
+
+def int_code(values):
+    """
+    Нормализовать столбец с кодами и привести его к Int64, если все коды -- целые числа
+    без ведущих нулей (строковое представление при выгрузке не меняется); иначе вернуть строки.
+
+    Входные параметры:
+    values -- столбец (pd.Series) с кодами в виде строк или чисел
+    """
+    normalized = codes.normalize_code(values)
+    labels, uniques = pd.factorize(normalized)
+    uniques = pd.Series(uniques, dtype='string')
+    if not uniques.str.fullmatch(INT_CODE_PATTERN).all():
+        return normalized
+    numbers = pd.array(np.array([int(code) for code in uniques], dtype='int64'), dtype='Int64')
+    return pd.Series(numbers.take(labels, allow_fill=True), index=values.index, name=values.name)
+
+
+def int_codes(frame, columns):
+    """
+    Привести несколько столбцов с кодами справочников к Int64 (см. int_code); возвращает новую таблицу.
+
+    Входные параметры:
+    frame -- таблица pandas
+    columns -- столбцы с кодами
+    """
+    return frame.assign(**{column: int_code(frame[column]) for column in columns})
+
+
+def memory_mb(frame):
+    """
+    Объем памяти, занимаемой таблицей (с учетом строк), в мегабайтах.
+
+    Входные параметры:
+    frame -- таблица pandas
+    """
+    return frame.memory_usage(index=True, deep=True).sum() / 2 ** 20
+
+
+def memory_report(stage, **frames):
+    """
+    Строка с объемом памяти таблиц на этапе обработки.
+
+    Входные параметры:
+    stage -- название этапа
+    frames -- таблицы pandas по именам
+    """
+    sizes = ', '.join(f"{name} -- {memory_mb(frame):.1f} МБ" for name, frame in frames.items())
+    return f">> Память ({stage}): {sizes}"
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Режим службы: долгоживущий процесс, обрабатывающий регионы по расписанию.
+  - Регионы обрабатываются последовательно в одном процессе, поэтому импорт модулей, пул соединений с БД,
+    справочники МРИГО/ОКПДТР вместе с индексами сопоставления (misc/snapshot.py) и кэш сопоставления
+    остаются в памяти между циклами обработки.
+  - У каждого региона свой интервал обработки (по умолчанию общий); после ошибки регион обрабатывается
+    повторно через RETRY_MINUTES минут (но не позже, чем через свой интервал).
+  - HTTP: GET /health -- состояние службы и регионов (JSON), GET /metrics -- метрики в текстовом формате
+    Prometheus (результаты и время этапов последней обработки каждого региона).
+  - SIGINT/SIGTERM: обработка текущего региона завершается, и служба останавливается
+    (повторный SIGINT прерывает обработку немедленно).
+"""
+
+import json
+import signal
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import misc.lazy as lazy
+
+# numpy (через misc.metrics) нужен только при обработке, а не при разборе параметров командной строки
+metrics_ = lazy.LazyModule('misc.metrics')
+
+# интервал обработки региона по умолчанию (мин.)
+INTERVAL_MINUTES = 60
+
+# задержка повторной обработки региона после ошибки (мин.)
+RETRY_MINUTES = 10
+
+# адрес и порт HTTP-сервера состояния и метрик
+HOST = '127.0.0.1'
+PORT = 8000
+
+
+def parse_intervals(text):
+    """
+    Разобрать интервалы регионов вида '54=30,42=120' (минуты); возвращает словарь {регион: минуты}.
+
+    Входные параметры:
+    text -- строка интервалов (пустая строка или None -- без отдельных интервалов)
+    """
+    intervals = {}
+    for item in (text or '').split(','):
+        if not item.strip():
+            continue
+        region, sep, minutes = item.partition('=')
+        if not sep or not region.strip() or float(minutes) <= 0:
+            raise ValueError(f"Неверный интервал региона: '{item}' (ожидается 'регион=минуты')")
+        intervals[region.strip().zfill(2)] = float(minutes)
+    return intervals
+
+
+class Service:
+    """
+    Планировщик обработки регионов с состоянием для /health и /metrics.
+
+    Входные параметры:
+    run -- функция (регион, метрики) -> (регион, код завершения, компаний, вакансий, закрыто), как tv_.run_region
+    region_list -- список двузначных кодов регионов
+    interval -- интервал обработки региона по умолчанию (мин.)
+    intervals -- отдельные интервалы регионов {регион: минуты}
+    """
+
+    def __init__(self, run, region_list, interval=INTERVAL_MINUTES, intervals=None):
+        self.run = run
+        self.intervals = {region: (intervals or {}).get(region, interval) * 60 for region in region_list}
+        self.stopping = threading.Event()
+        self.started = time.time()
+        self.server = None
+        # время следующей обработки (time.monotonic) и результаты последней обработки регионов
+        self.due = {region: time.monotonic() for region in region_list}
+        self.state = {region: {'runs': 0, 'errors': 0} for region in region_list}
+        self._lock = threading.Lock()
+
+    def run_once(self, region):
+        """
+        Обработать регион и запомнить результат; возвращает код завершения.
+
+        Входные параметры:
+        region -- двузначный код региона
+        """
+        metrics = metrics_.Metrics()
+        started = time.time()
+        with self._lock:
+            self.state[region]['running_since'] = started
+        try:
+            _, code, companies, vacancies, closed = self.run(region, metrics)
+        except Exception as e:
+            print(f">>> Регион {region}: необработанная ошибка -- {e}")
+            code, companies, vacancies, closed = 1, 0, 0, 0
+        finished = time.time()
+        delay = self.intervals[region] if code == 0 else min(RETRY_MINUTES * 60, self.intervals[region])
+        with self._lock:
+            self.due[region] = time.monotonic() + delay
+            state = self.state[region]
+            state.pop('running_since', None)
+            state['runs'] += 1
+            state['errors'] += int(code != 0)
+            state.update(last_start=started, last_end=finished, last_exit_point=code, companies=companies,
+                         vacancies=vacancies, closed=closed, metrics=metrics.as_dict(), next_run=finished + delay)
+            if code == 0:
+                state['last_success'] = finished
+        return code
+
+    def run_forever(self):
+        """Обрабатывать регионы по расписанию до остановки (см. stop)."""
+        while not self.stopping.is_set():
+            with self._lock:
+                region = min(self.due, key=self.due.get)
+                delay = self.due[region] - time.monotonic()
+            if delay > 0:
+                print(f"\n> Следующая обработка: регион {region} через {delay / 60:.1f} мин.")
+                self.stopping.wait(delay)
+                continue
+            self.run_once(region)
+
+    def stop(self):
+        """Остановить службу после обработки текущего региона."""
+        self.stopping.set()
+
+    def health(self):
+        """Состояние службы и регионов (словарь для JSON)."""
+        with self._lock:
+            regions = {region: {key: value for key, value in state.items() if key != 'metrics'}
+                       for region, state in self.state.items()}
+        failing = sorted(region for region, state in regions.items() if state.get('last_exit_point', 0) != 0)
+        return {
+            'status': 'stopping' if self.stopping.is_set() else ('degraded' if failing else 'ok'),
+            'started': self.started,
+            'uptime_s': round(time.time() - self.started, 1),
+            'failing': failing,
+            'regions': regions,
+        }
+
+    def prometheus(self):
+        """Метрики службы в текстовом формате Prometheus."""
+        lines = [
+            f"tv_up {0 if self.stopping.is_set() else 1}",
+            f"tv_uptime_seconds {time.time() - self.started:.1f}",
+        ]
+        peak_rss = metrics_.peak_rss_mb()
+        if peak_rss is not None:
+            lines.append(f"tv_peak_rss_megabytes {peak_rss:.1f}")
+        with self._lock:
+            states = {region: dict(state) for region, state in self.state.items()}
+        for region, state in states.items():
+            label = f'region="{region}"'
+            lines.append(f'tv_region_runs_total{{{label}}} {state["runs"]}')
+            lines.append(f'tv_region_errors_total{{{label}}} {state["errors"]}')
+            lines.append(f'tv_region_running{{{label}}} {int("running_since" in state)}')
+            if 'last_end' not in state:
+                continue
+            lines.append(f'tv_region_last_exit_point{{{label}}} {state["last_exit_point"]}')
+            lines.append(f'tv_region_last_end_timestamp_seconds{{{label}}} {state["last_end"]:.0f}')
+            if 'last_success' in state:
+                lines.append(f'tv_region_last_success_timestamp_seconds{{{label}}} {state["last_success"]:.0f}')
+            lines.append(f'tv_region_last_duration_seconds{{{label}}} {state["last_end"] - state["last_start"]:.3f}')
+            for name in ('companies', 'vacancies', 'closed'):
+                lines.append(f'tv_region_last_{name}{{{label}}} {state[name]}')
+            for stage, seconds in state['metrics'].get('stages_s', {}).items():
+                lines.append(f'tv_region_last_stage_seconds{{{label},stage="{stage}"}} {seconds}')
+            if 'rows_per_s' in state['metrics']:
+                lines.append(f'tv_region_last_rows_per_second{{{label}}} {state["metrics"]["rows_per_s"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve_http(self, host=HOST, port=PORT):
+        """
+        Запустить HTTP-сервер состояния и метрик в отдельном потоке.
+
+        Входные параметры:
+        host -- адрес
+        port -- порт
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/health':
+                    health = service.health()
+                    body = json.dumps(health, ensure_ascii=False).encode('utf-8')
+                    status, content_type = 503 if health['status'] == 'stopping' else 200, 'application/json'
+                elif path == '/metrics':
+                    body = service.prometheus().encode('utf-8')
+                    status, content_type = 200, 'text/plain; version=0.0.4'
+                else:
+                    body, status, content_type = b'not found', 404, 'text/plain'
+                self.send_response(status)
+                self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"> Состояние службы: http://{host}:{self.server.server_address[1]}/health, метрики -- /metrics")
+
+    def close(self):
+        """Остановить HTTP-сервер."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def serve(service, host=HOST, port=PORT):
+    """
+    Запустить службу в текущем (главном) потоке до SIGINT/SIGTERM.
+
+    Входные параметры:
+    service -- служба (Service)
+    host -- адрес HTTP-сервера состояния и метрик
+    port -- порт HTTP-сервера (None -- без HTTP-сервера)
+    """
+    def on_signal(signum, frame):
+        if service.stopping.is_set() and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        print(f"\n> Получен сигнал остановки: служба остановится после обработки текущего региона.")
+        service.stop()
+
+    previous = {signum: signal.signal(signum, on_signal) for signum in (signal.SIGINT, signal.SIGTERM)}
+    if port is not None:
+        service.serve_http(host, port)
+    try:
+        service.run_forever()
+    finally:
+        service.close()
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    print(f"\n> Служба остановлена.")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Локальный снимок справочников (blinov.mrigo, blinov.okpdtr, blinov.okpdtr_assoc)
+вместе с построенными по ним индексами сопоставления (misc.mrigo, misc.okpdtr).
+  - Снимок хранится в файле pickle; при запуске проверяется только отпечаток исходных таблиц
+    в БД (число строк и md5 содержимого, вычисляемые на стороне сервера), и при совпадении
+    таблицы и индексы читаются из файла без загрузки таблиц и повторной очистки наименований.
+  - При изменении таблиц, формата снимка или при ошибке чтения файла снимок строится заново.
+  - Файл записывается во временный файл и переименовывается, поэтому параллельные запуски
+    читают либо старый, либо новый снимок целиком.
+  - Последний прочитанный или построенный снимок хранится в памяти процесса: в долгоживущем процессе
+    (режим службы, misc/service.py) при неизменном отпечатке данные используются без чтения файла.
+"""
+
+import os
+import pickle
+import tempfile
+
+import sqlalchemy as sa
+
+# версия формата снимка (увеличивается при изменении состава данных или классов сопоставителей)
+SNAPSHOT_FORMAT = 1
+
+# снимки в памяти процесса: файл снимка -> (отпечаток, данные)
+_MEMORY = {}
+
+
+def fingerprint(engine, tables):
+    """
+    Отпечаток таблиц БД: число строк и md5 текстового представления строк каждой таблицы.
+    Строки упорядочиваются по тексту: без ORDER BY порядок строк в string_agg не определен
+    (например, после VACUUM или при параллельном сканировании), и отпечаток менялся бы без изменения данных.
+
+    Входные параметры:
+    engine -- подключение к БД
+    tables -- список таблиц в виде 'схема.таблица'
+    """
+    result = {}
+    for table in tables:
+        count, digest = engine.execute(sa.text(
+            f"SELECT count(*), md5(coalesce(string_agg(t::text, E'\\n' ORDER BY t::text), '')) "
+            f"FROM {table} t")).fetchone()
+        result[table] = [int(count), digest]
+    return result
+
+
+def load(path, expected):
+    """
+    Прочитать снимок; возвращает данные снимка или None, если файла нет, он поврежден
+    или построен по другим версиям таблиц.
+
+    Входные параметры:
+    path -- файл снимка
+    expected -- текущий отпечаток исходных таблиц
+    """
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('fingerprint') != expected:
+        return None
+    return snapshot['data']
+
+
+def save(path, current, data):
+    """
+    Записать снимок (через временный файл в том же каталоге).
+
+    Входные параметры:
+    path -- файл снимка
+    current -- отпечаток исходных таблиц
+    data -- данные снимка (сериализуемые pickle)
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'format': SNAPSHOT_FORMAT, 'fingerprint': current, 'data': data}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def cached(engine, directory, name, tables, build):
+    """
+    Данные снимка name: из файла, если исходные таблицы не изменились, иначе -- результат build(),
+    который сохраняется в новый снимок (без снимка, если directory равен None).
+    Возвращает пару (данные, признак чтения из снимка).
+
+    Входные параметры:
+    engine -- подключение к БД
+    directory -- каталог снимков
+    name -- имя снимка (имя файла без расширения)
+    tables -- исходные таблицы снимка
+    build -- функция без параметров, загружающая таблицы и строящая индексы
+    """
+    if directory is None:
+        return build(), False
+    path = os.path.join(directory, f"{name}.pkl")
+    current = fingerprint(engine, tables)
+    if path in _MEMORY and _MEMORY[path][0] == current:
+        return _MEMORY[path][1], True
+    data = load(path, current)
+    from_snapshot = data is not None
+    if not from_snapshot:
+        data = build()
+        save(path, current, data)
+    _MEMORY[path] = (current, data)
+    return data, from_snapshot
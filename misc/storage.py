@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Работа с таблицами "Компании" и "Вакансии" в БД.
+  - Сравнение текущей выгрузки с БД выполняется на стороне БД: ключи выгрузки
+    загружаются во временную таблицу, новые записи находятся запросом по индексированным
+    ключам, а отсутствующие в выгрузке вакансии закрываются одним запросом UPDATE.
+    В память загружаются только ключи текущей выгрузки.
+  - Загрузка строк выполняется через COPY из CSV-буфера в памяти во временную таблицу
+    и одну вставку INSERT ... SELECT ... ON CONFLICT в той же транзакции.
+  - В режиме обновления (upsert) для каждой строки хранится хэш содержательных столбцов
+    (row_hash); перезаписываются только новые строки и строки с изменившимся хэшем.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+# таблица кандидатов сопоставления с МРИГО/ОКПДТР (см. misc/candidates.py)
+CANDIDATES_TABLE = 'vacs.vacancies_tv_candidates'
+CANDIDATES_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {CANDIDATES_TABLE} ("
+    "id varchar NOT NULL, kind varchar NOT NULL, rank smallint NOT NULL, code varchar, "
+    "score double precision NOT NULL, date_add timestamp without time zone DEFAULT CURRENT_TIMESTAMP, "
+    "PRIMARY KEY (id, kind, rank))")
+
+# типы столбцов при создании таблиц
+COMPANIES_DTYPE = {
+    'ogrn': sa.String,
+    'inn': sa.String,
+    'kpp': sa.String,
+    'companycode': sa.String,
+    'name': sa.String,
+    'address': sa.String,
+    'hr_agency': sa.String,
+    'url': sa.String,
+    'site': sa.String,
+    'phone': sa.String,
+    'fax': sa.String,
+    'email': sa.String,
+    'row_hash': sa.String,
+}
+VACANCIES_DTYPE = {
+    'id': sa.String,
+    'ogrn': sa.String,
+    'source': sa.String,
+    'region_code': sa.String,
+    'region_name': sa.String,
+    'address': sa.String,
+    'id_mrigo': sa.String,
+    'experience': sa.String,
+    'employment': sa.String,
+    'schedule': sa.String,
+    'job_name': sa.String,
+    'id_okpdtr': sa.String,
+    'specialisation': sa.String,
+    'duty': sa.String,
+    'education': sa.String,
+    'qualification': sa.String,
+    'term_text': sa.String,
+    'social_protected': sa.String,
+    'salary_min': sa.Float,
+    'salary_max': sa.Float,
+    'salary': sa.String,
+    'currency': sa.String,
+    'vac_url': sa.String,
+    'creation_date_from_api': sa.DateTime,
+    # 'modify_date_from_api': sa.DateTime,
+    'download_time': sa.DateTime,
+    'is_closed': sa.Boolean,
+    'closing_time': sa.DateTime,
+    'row_hash': sa.String,
+}
+
+# столбцы, добавляемые в существующие таблицы
+COMPANIES_COLUMNS = [
+    'ogrn', 'inn', 'kpp', 'companycode', 'name', 'address', 'hr_agency', 'url', 'site', 'phone', 'fax', 'email',
+]
+VACANCIES_COLUMNS = [
+    'id', 'ogrn', 'source', 'region_code', 'address', 'id_mrigo', 'experience', 'employment', 'schedule',
+    'job_name', 'id_okpdtr', 'specialisation', 'duty', 'education', 'qualification', 'term_text',
+    'social_protected', 'salary_min', 'salary_max', 'salary', 'currency', 'vac_url', 'creation_date_from_api',
+    'download_time', 'is_closed', 'closing_time',
+]
+
+# столбцы, изменение которых считается изменением записи (и обновляется в режиме upsert)
+COMPANIES_HASH_COLUMNS = [c for c in COMPANIES_COLUMNS if c != 'ogrn']
+VACANCIES_HASH_COLUMNS = [
+    c for c in VACANCIES_COLUMNS if c not in ('id', 'download_time', 'is_closed', 'closing_time')
+]
+
+# ограничения, добавляемые при создании таблиц
+COMPANIES_CONSTRAINTS = [
+    'ADD PRIMARY KEY(ogrn)',
+]
+VACANCIES_CONSTRAINTS = [
+    'ADD PRIMARY KEY(id)',
+    'ADD CONSTRAINT vac_comp_f_key FOREIGN KEY (ogrn) REFERENCES vacs.companies_tv (ogrn)',
+    'ADD CONSTRAINT vac_mrigo_f_key FOREIGN KEY (id_mrigo) REFERENCES blinov.mrigo (id_mrigo)',
+    'ADD CONSTRAINT vac_okpdtr_f_key FOREIGN KEY (id_okpdtr) REFERENCES blinov.okpdtr (id)',
+]
+
+
+def table_exists(engine, table):
+    """
+    Проверить наличие таблицы в БД.
+
+    Входные параметры:
+    engine -- подключение к БД (sqlalchemy.engine.Engine)
+    table -- имя таблицы со схемой, например 'vacs.vacancies_tv'
+    """
+    schema, name = table.split('.')
+    return engine.has_table(name, schema=schema)
+
+
+def stage_keys(conn, name, values, hashes=None):
+    """
+    Загрузить ключи текущей выгрузки (и хэши строк) через COPY во временную таблицу,
+    которая удаляется в конце транзакции. Размер SQL-запросов не зависит от числа ключей.
+
+    Входные параметры:
+    conn -- соединение с открытой транзакцией
+    name -- имя временной таблицы
+    values -- список ключей
+    hashes -- список хэшей строк в порядке ключей (None -- без хэшей)
+    """
+    conn.execute(f"CREATE TEMP TABLE {name} (key varchar, row_hash varchar) ON COMMIT DROP")
+    if values:
+        keys = pd.DataFrame({'key': values, 'row_hash': hashes if hashes is not None else None})
+        copy_frame(conn, keys, name, ['key', 'row_hash'])
+    conn.execute(f"CREATE INDEX ON {name} (key)")
+    conn.execute(f"ANALYZE {name}")
+
+
+def _write_keys_query(table, key, hashes):
+    # новые ключи, а при наличии хэшей -- еще и ключи строк с изменившимся хэшем
+    if hashes is None:
+        return f"SELECT b.key FROM batch_keys b WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{key} = b.key)"
+    return (f"SELECT b.key FROM batch_keys b LEFT JOIN {table} t ON t.{key} = b.key "
+            f"WHERE t.{key} IS NULL OR t.row_hash IS DISTINCT FROM b.row_hash")
+
+
+def new_keys(engine, table, key, values, hashes=None):
+    """
+    Ключи текущей выгрузки, которых еще нет в таблице
+    (а если переданы хэши -- также ключи строк, хэш которых изменился).
+
+    Входные параметры:
+    engine -- подключение к БД
+    table -- имя таблицы со схемой
+    key -- столбец-ключ таблицы
+    values -- список ключей текущей выгрузки
+    hashes -- список хэшей строк в порядке ключей (None -- только новые ключи)
+    """
+    with engine.begin() as conn:
+        stage_keys(conn, 'batch_keys', values, hashes)
+        rows = conn.execute(_write_keys_query(table, key, hashes))
+        return {row[0] for row in rows}
+
+
+def close_vacancies(engine, ids, region):
+    """
+    Закрыть одним запросом UPDATE все незакрытые вакансии региона, которых нет в выгрузке.
+    Возвращает число закрытых вакансий.
+
+    Входные параметры:
+    engine -- подключение к БД
+    ids -- идентификаторы всех вакансий текущей выгрузки региона
+    region -- двузначный код региона
+    """
+    with engine.begin() as conn:
+        stage_keys(conn, 'batch_keys', ids)
+        result = conn.execute(sa.text(
+            "UPDATE vacs.vacancies_tv v SET is_closed = TRUE, closing_time = coalesce(v.closing_time, now()) "
+            "WHERE (v.is_closed = FALSE OR v.closing_time IS NULL) AND left(v.region_code, 2) = :region "
+            "AND NOT EXISTS (SELECT 1 FROM batch_keys b WHERE b.key = v.id)").bindparams(region=region))
+        return result.rowcount
+
+
+def replace_candidates(engine, frame, columns, ids):
+    """
+    Заменить кандидатов сопоставления вакансий порции (таблица создается при первой записи).
+    Удаляются прежние кандидаты всех вакансий порции, а не только тех, у которых есть новые кандидаты,
+    иначе у вакансии, для которой кандидатов больше нет, остались бы устаревшие.
+    Возвращает число записанных строк.
+
+    Входные параметры:
+    engine -- подключение к БД
+    frame -- таблица кандидатов порции
+    columns -- загружаемые столбцы
+    ids -- идентификаторы всех вакансий порции
+    """
+    with engine.begin() as conn:
+        conn.execute(CANDIDATES_DDL)
+        stage_keys(conn, 'batch_keys', list(dict.fromkeys(ids)))
+        conn.execute(f"DELETE FROM {CANDIDATES_TABLE} c USING batch_keys b WHERE c.id = b.key")
+        copy_frame(conn, frame, CANDIDATES_TABLE, columns)
+    return len(frame)
+
+
+def _canonical(value):
+    # целые числа, записанные как float (столбец с пропусками), приводятся к виду целых,
+    # остальные float -- к кратчайшей точной записи
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def row_hashes(frame, columns):
+    """
+    Хэши строк по заданным столбцам (16 шестнадцатеричных символов).
+    Значения приводятся к строкам, а пропуски (None, NaN, pd.NA) -- к одной строке '\\N',
+    поэтому хэш не зависит от типа столбца в pandas (object, категория, Int64, string, int64/float64:
+    json_normalize выбирает float64, если в порции есть пропуск, и 50000.0 записывается как 50000).
+
+    Входные параметры:
+    frame -- таблица pandas
+    columns -- столбцы, входящие в хэш
+    """
+    values = frame[columns].astype(object)
+    values = values.where(values.notna(), '\\N')
+    for column in columns:
+        if frame[column].dtype.kind in 'fO' or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            values[column] = values[column].map(_canonical)
+    values = values.astype('str')
+    hashes = pd.util.hash_pandas_object(values, index=False)
+    return [format(h, '016x') for h in hashes.tolist()]
+
+
+def ensure_hash_column(engine, table):
+    """
+    Добавить в таблицу столбец row_hash, если его нет (см. sql/alter/row_hash.sql).
+
+    Входные параметры:
+    engine -- подключение к БД
+    table -- имя таблицы со схемой
+    """
+    engine.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_hash character varying(16)")
+
+
+def copy_frame(conn, frame, table, columns):
+    """
+    Загрузить строки таблицы pandas в таблицу БД командой COPY из CSV-буфера в памяти.
+    Логические значения в текстовых столбцах записываются как 'true'/'false' (как при INSERT).
+
+    Входные параметры:
+    conn -- соединение с открытой транзакцией
+    frame -- таблица pandas
+    table -- имя таблицы БД
+    columns -- загружаемые столбцы
+    """
+    frame = frame[columns]
+    for column in frame.columns[frame.dtypes == object]:
+        is_bool = frame[column].map(type) == bool
+        if is_bool.any():
+            frame = frame.assign(**{column: frame[column].where(~is_bool, frame[column].map({True: 'true', False: 'false'}))})
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+def insert_frame(engine, frame, table, key, columns, update_columns=None):
+    """
+    Добавить строки в существующую таблицу: COPY во временную таблицу и одна вставка
+    в той же транзакции. Без update_columns существующие строки не изменяются
+    (ON CONFLICT DO NOTHING); с update_columns строки с тем же ключом обновляются,
+    если их row_hash отличается. Возвращает число добавленных и обновленных строк.
+
+    Входные параметры:
+    engine -- подключение к БД
+    frame -- таблица pandas
+    table -- имя таблицы со схемой
+    key -- первичный ключ таблицы
+    columns -- загружаемые столбцы
+    update_columns -- обновляемые при изменении хэша столбцы (None -- не обновлять)
+    """
+    names = ', '.join(columns)
+    if update_columns is None:
+        conflict = 'DO NOTHING'
+    else:
+        assignments = ', '.join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        conflict = f"DO UPDATE SET {assignments} WHERE {table}.row_hash IS DISTINCT FROM EXCLUDED.row_hash"
+    with engine.begin() as conn:
+        conn.execute(f"CREATE TEMP TABLE stage (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        copy_frame(conn, frame, 'stage', columns)
+        result = conn.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM stage ON CONFLICT ({key}) {conflict}")
+        return result.rowcount
+
+
+def create_table(engine, frame, table, dtype, constraints):
+    """
+    Создать таблицу по структуре таблицы pandas, загрузить в нее строки через COPY
+    и добавить ограничения (в одной транзакции).
+
+    Входные параметры:
+    engine -- подключение к БД
+    frame -- таблица pandas
+    table -- имя таблицы со схемой
+    dtype -- типы столбцов
+    constraints -- ограничения (фрагменты ALTER TABLE)
+    """
+    schema, name = table.split('.')
+    with engine.begin() as conn:
+        frame.head(0).to_sql(name, con=conn, schema=schema, index=False, dtype=dtype)
+        copy_frame(conn, frame, table, list(frame.columns))
+        for constraint in constraints:
+            conn.execute(f"ALTER TABLE {table} {constraint}")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Нормализация текстовых полей вакансий.
+  - Удаление HTML-тэгов и экранирование (как html.escape) по столбцу без apply:
+    повторяющиеся тексты обрабатываются один раз, тексты без тэгов и спецсимволов
+    не проходят через регулярное выражение и замены.
+  - Преобразование структурированного списка адресов вакансии в строку при разборе JSON
+    (без получения и очистки repr вложенных словарей).
+"""
+
+import re
+
+import pandas as pd
+
+# HTML-комментарии и тэги
+TAG_RE = re.compile(r'(<!--.*?-->|<[^>]*>)')
+
+# замены html.escape(text, quote=True); '&' заменяется первым
+ESCAPES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')]
+
+# символы, которые удалялись из repr списка адресов
+ADDRESS_CHARS = "'{}[]"
+
+
+def remove_tags(text):
+    """
+    Удалить HTML-тэги из произвольного текста и экранировать спецсимволы
+    (результат совпадает с html.escape(re.sub(TAG_RE, '', text))).
+
+    Входные параметры:
+    text -- строка, в которой могут содержаться HTML-тэги
+    """
+    if '<' in text:
+        text = TAG_RE.sub('', text)
+    for char, escape in ESCAPES:
+        if char in text:
+            text = text.replace(char, escape)
+    return text
+
+
+def strip_tags(column):
+    """
+    Удалить HTML-тэги из текстов столбца и экранировать спецсимволы.
+    Пустые значения остаются пустыми, остальные приводятся к строкам.
+
+    Входные параметры:
+    column -- столбец (pd.Series) с текстами
+    """
+    cleaned = {}
+    result = []
+    for text in column.tolist():
+        if text is None or text != text:
+            result.append(None)
+            continue
+        value = cleaned.get(text)
+        if value is None:
+            value = cleaned[text] = remove_tags(str(text))
+        result.append(value)
+    return pd.Series(result, index=column.index, name=column.name, dtype='object')
+
+
+def address_text(addresses):
+    """
+    Строка адреса вакансии из списка адресов API: значения полей всех адресов
+    (location, lng, lat) через запятую, как в очищенном repr списка.
+
+    Входные параметры:
+    addresses -- значение поля addresses.address (список словарей, словарь или строка)
+    """
+    def clean(value):
+        for char in ADDRESS_CHARS:
+            value = value.replace(char, '')
+        return value
+
+    if isinstance(addresses, dict):
+        addresses = [addresses]
+    if isinstance(addresses, list):
+        return ', '.join(clean(str(value))
+                         for address in addresses for value in address.values())
+    if addresses is None:
+        return None
+    return clean(str(addresses))
+
+
+def flatten_addresses(vacancies):
+    """
+    Заменить в записях страницы API список адресов вакансии строкой (на месте);
+    возвращает тот же список записей.
+
+    Входные параметры:
+    vacancies -- список вакансий со страницы API
+    """
+    for record in vacancies:
+        addresses = record.get('vacancy', {}).get('addresses')
+        if isinstance(addresses, dict) and 'address' in addresses:
+            addresses['address'] = address_text(addresses['address'])
+    return vacancies
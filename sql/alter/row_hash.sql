@@ -0,0 +1,6 @@
+-- Хэш содержательных столбцов строки для режима обновления (python tv_.py --upsert).
+-- Столбцы добавляются скриптом автоматически при первом запуске в режиме --upsert.
+ALTER TABLE vacs.companies_tv
+    ADD COLUMN IF NOT EXISTS row_hash character varying(16);
+ALTER TABLE vacs.vacancies_tv
+    ADD COLUMN IF NOT EXISTS row_hash character varying(16);
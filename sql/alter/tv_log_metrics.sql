@@ -0,0 +1,3 @@
+-- Метрики запуска (время этапов, перцентили времени ответа API, RSS, доли сопоставленных значений)
+ALTER TABLE vacs.tv_log
+    ADD COLUMN IF NOT EXISTS metrics jsonb;
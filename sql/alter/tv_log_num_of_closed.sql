@@ -0,0 +1,3 @@
+-- Число закрытых за запуск вакансий в журнале работы скрипта
+ALTER TABLE vacs.tv_log
+    ADD COLUMN IF NOT EXISTS num_of_closed integer;
@@ -0,0 +1,3 @@
+-- Код региона в журнале работы скрипта (многорегиональная загрузка)
+ALTER TABLE vacs.tv_log
+    ADD COLUMN IF NOT EXISTS region_code character varying(2) COLLATE pg_catalog."default";
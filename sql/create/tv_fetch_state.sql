@@ -0,0 +1,19 @@
+-- Table: vacs.tv_fetch_state
+
+-- DROP TABLE vacs.tv_fetch_state;
+
+CREATE TABLE vacs.tv_fetch_state
+(
+    region_code character varying(2) COLLATE pg_catalog."default" NOT NULL,
+    modified_to timestamp without time zone,
+    full_sweep_time timestamp without time zone,
+    date_add timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT tv_fetch_state_pkey PRIMARY KEY (region_code)
+)
+WITH (
+    OIDS = FALSE
+)
+TABLESPACE pg_default;
+
+ALTER TABLE vacs.tv_fetch_state
+    OWNER to dba;
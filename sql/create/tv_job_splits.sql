@@ -0,0 +1,19 @@
+-- Table: vacs.tv_job_splits
+
+-- DROP TABLE vacs.tv_job_splits;
+
+CREATE TABLE vacs.tv_job_splits
+(
+    id integer NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 1 MINVALUE 1 MAXVALUE 2147483647 CACHE 1 ),
+    word character varying COLLATE pg_catalog."default" NOT NULL,
+    date_add timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT tv_job_splits_pkey PRIMARY KEY (id),
+    CONSTRAINT tv_job_splits_word_key UNIQUE (word)
+)
+WITH (
+    OIDS = FALSE
+)
+TABLESPACE pg_default;
+
+ALTER TABLE vacs.tv_job_splits
+    OWNER to dba;
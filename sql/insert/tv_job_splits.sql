@@ -0,0 +1,4 @@
+-- Слова-разделители имен вакансий (имя обрезается перед первым вхождением слова), как в misc/okpdtr_splits.py
+INSERT INTO vacs.tv_job_splits(word)
+	VALUES ('разряд'), ('разряда'), ('категория'), ('категории'), ('класс'), ('класса'),
+	       ('яслей'), ('ясли'), ('сад'), ('сада'), ('младший'), ('высшей');
@@ -0,0 +1,92 @@
+import types
+
+import pandas as pd
+import pytest
+
+import misc.regions as regions
+import misc.storage as storage
+import tv_
+
+from bench import stub_api
+from bench.synthetic import SETTLEMENTS, make_okpdtr
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Заглушка API ТРУДВСЕМ (bench/stub_api.py): serve(страницы) запускает ее и направляет на нее tv_."""
+    servers = []
+
+    def serve(pages):
+        server = stub_api.serve(pages)
+        servers.append(server)
+        monkeypatch.setattr(regions, 'API_BASE', stub_api.base_url(server))
+        return stub_api.base_url(server)
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeDb:
+    """
+    БД в памяти для tv_.main: справочники МРИГО/ОКПДТР, таблицы 'Компании'/'Вакансии', журнал и закрытые вакансии.
+    Функции misc.storage, обращающиеся к БД, заменяются функциями над таблицами pandas.
+    """
+
+    def __init__(self):
+        ids, names = make_okpdtr(500)
+        self.references = {
+            'blinov.mrigo': pd.DataFrame({'id_mrigo': range(1, len(SETTLEMENTS) + 1), 'mrigo': SETTLEMENTS}),
+            'blinov.okpdtr': pd.DataFrame({'id': ids[:250], 'name': names[:250]}),
+            'blinov.okpdtr_assoc': pd.DataFrame({'id': ids[250:], 'name': names[250:]}),
+            'vacs.tv_params': pd.DataFrame({'similarity_level_mrigo': [90], 'similarity_level_okpdtr': [85]}),
+        }
+        self.tables = {}
+        self.log = []
+        self.closed = []
+        # таблица, запись в которую завершается ошибкой (и сколько раз)
+        self.fail_table = None
+        self.fail_times = 0
+
+    def get_table_from_db_by_table_name(self, name):
+        return self.references[name].copy()
+
+    def log_to_db(self, message, exit_point=None, region=None, **kwargs):
+        self.log.append((message, exit_point, region))
+
+    def table_exists(self, engine, table):
+        return table in self.tables
+
+    def new_keys(self, engine, table, key, values, hashes=None):
+        return set(values) - set(self.tables[table][key])
+
+    def _fail(self, table):
+        if table == self.fail_table and self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError(f"запись в {table} недоступна")
+
+    def insert_frame(self, engine, frame, table, key, columns, update_columns=None):
+        self._fail(table)
+        self.tables[table] = pd.concat([self.tables[table], frame[columns]], ignore_index=True)
+        return len(frame)
+
+    def create_table(self, engine, frame, table, dtype, constraints):
+        self._fail(table)
+        self.tables[table] = frame.copy()
+
+    def close_vacancies(self, engine, ids, region):
+        self.closed.append((region, sorted(ids)))
+        return 0
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """БД в памяти (FakeDb) вместо misc.db и функций misc.storage, обращающихся к БД."""
+    db = FakeDb()
+    monkeypatch.setattr(tv_, 'db', types.SimpleNamespace(
+        engine=None, get_table_from_db_by_table_name=db.get_table_from_db_by_table_name))
+    monkeypatch.setattr(tv_, 'log_to_db', db.log_to_db)
+    for name in ('table_exists', 'new_keys', 'insert_frame', 'create_table', 'close_vacancies'):
+        monkeypatch.setattr(storage, name, getattr(db, name))
+    return db
@@ -0,0 +1,97 @@
+import json
+import threading
+import urllib.parse
+
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import misc.api as api
+
+from bench import stub_api
+from bench.synthetic import make_pages
+
+
+@pytest.fixture
+def server():
+    """
+    Заглушка API (bench/stub_api.py) с журналом запрошенных страниц и заменой ответов на отдельные страницы:
+    responses -- страница -> список ответов (HTTP-статус, JSON или None), которые отдаются по одному
+    на каждый запрос страницы, затем -- обычная страница.
+    """
+    servers = []
+
+    def serve(pages, responses=None):
+        offsets = []
+        responses = {offset: list(items) for offset, items in (responses or {}).items()}
+
+        class Handler(stub_api.make_handler(pages)):
+            def do_GET(self):
+                offset = int(urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)['offset'][0])
+                offsets.append(offset)
+                if not responses.get(offset):
+                    return super().do_GET()
+                status, data = responses[offset].pop(0)
+                body = json.dumps(data).encode('utf-8') if data is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        instance = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        instance.daemon_threads = True
+        threading.Thread(target=instance.serve_forever, daemon=True).start()
+        servers.append(instance)
+        return f"{stub_api.base_url(instance)}/vacancies/region/54", offsets
+
+    yield serve
+    for instance in servers:
+        instance.shutdown()
+        instance.server_close()
+
+
+def page(vacancies, total=None):
+    return {'status': '200', 'meta': {'total': total if total is not None else len(vacancies)},
+            'results': {'vacancies': vacancies}}
+
+
+def test_pages_are_bounded_by_meta_total(server):
+    pages = make_pages(250)
+    url, offsets = server(pages)
+    fetched = list(api.Fetcher(url, workers=4).fetch(0))
+    assert fetched == pages
+    # последняя страница известна по meta.total пробной страницы: лишних запросов нет
+    assert sorted(offsets) == [0, 1, 2]
+
+
+def test_pages_without_meta_total_until_first_missing_page(server):
+    pages = make_pages(250)
+    url, offsets = server(pages, {0: [(200, {'status': '200', 'results': {'vacancies': pages[0]}})]})
+    fetcher = api.Fetcher(url, workers=1)
+    assert list(fetcher.fetch(0)) == pages
+    # без meta.total страницы запрашиваются заранее (не больше 2 * workers), пока не встретится пустая
+    assert {0, 1, 2, 3} <= set(offsets) and max(offsets) <= 3 + 2 * fetcher.workers
+
+
+@pytest.mark.parametrize('response', [{'status': '404'}, page([], total=500)])
+def test_fetch_stops_at_first_non_200_or_empty_page(server, response):
+    pages = make_pages(500)
+    url, offsets = server(pages, {2: [(200, response)]})
+    assert list(api.Fetcher(url, workers=2).fetch(0)) == pages[:2]
+
+
+def test_page_error_after_retries(server):
+    pages = make_pages(300)
+    url, offsets = server(pages, {1: [(503, None)] * 3})
+    fetcher = api.Fetcher(url, workers=1, retries=2, backoff=0)
+    with pytest.raises(api.PageError):
+        list(fetcher.fetch(0))
+    assert offsets.count(1) == 3
+
+
+def test_retry_after_temporary_error(server):
+    pages = make_pages(300)
+    url, offsets = server(pages, {1: [(503, None), (500, None)]})
+    fetcher = api.Fetcher(url, workers=1, retries=2, backoff=0)
+    assert list(fetcher.fetch(0)) == pages
+    assert offsets.count(1) == 3
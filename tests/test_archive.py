@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import misc.archive as archive
+
+PAGES = [[{'vacancy': {'id': f"{page}-{i}", 'job-name': 'Водитель'}} for i in range(3)] for page in range(4)]
+
+
+def region_file(tmp_path, name):
+    return str(tmp_path / '54' / f"{name}{archive.GZIP_SUFFIX}")
+
+
+def test_file_is_renamed_only_after_all_pages(tmp_path):
+    path = region_file(tmp_path, '20200101_000000_1')
+    pages = archive.record(iter(PAGES), path)
+    assert next(pages) == PAGES[0]
+    # пока страницы не получены полностью, файл не виден как полный
+    assert os.path.exists(path + archive.PART_SUFFIX) and not os.path.exists(path)
+    assert archive.latest(str(tmp_path), '54') is None
+    assert list(pages) == PAGES[1:]
+    assert not os.path.exists(path + archive.PART_SUFFIX)
+    assert archive.latest(str(tmp_path), '54') == path
+    assert list(archive.read_pages(path)) == PAGES
+
+
+def test_interrupted_fetch_leaves_no_file(tmp_path):
+    def fetch():
+        yield PAGES[0]
+        raise ConnectionError('соединение разорвано')
+
+    path = region_file(tmp_path, '20200101_000000_1')
+    with pytest.raises(ConnectionError):
+        list(archive.record(fetch(), path))
+    assert os.listdir(tmp_path / '54') == []
+
+    # генератор закрыт до получения всех страниц (например, ошибка на следующих этапах)
+    pages = archive.record(iter(PAGES), path)
+    next(pages)
+    pages.close()
+    assert os.listdir(tmp_path / '54') == []
+
+
+def test_old_files_are_pruned(tmp_path):
+    names = [f"2020010{day}_000000_1" for day in range(1, 6)]
+    for name in names[:4]:
+        list(archive.record(iter(PAGES), region_file(tmp_path, name), keep=3))
+    assert sorted(os.listdir(tmp_path / '54')) == [f"{name}{archive.GZIP_SUFFIX}" for name in names[1:4]]
+
+    # незавершенный файл другого запуска не учитывается и не удаляется
+    part = region_file(tmp_path, '20200109_000000_2') + archive.PART_SUFFIX
+    open(part, 'w').close()
+    list(archive.record(iter(PAGES), region_file(tmp_path, names[4]), keep=3))
+    assert sorted(os.listdir(tmp_path / '54')) == [f"{name}{archive.GZIP_SUFFIX}" for name in names[2:]] + [
+        os.path.basename(part)]
+    assert archive.latest(str(tmp_path), '54') == region_file(tmp_path, names[4])
+
+    list(archive.record(iter(PAGES), region_file(tmp_path, '20200110_000000_1'), keep=None))
+    assert len(os.listdir(tmp_path / '54')) == 5
+
+
+def test_default_number_of_kept_files(tmp_path):
+    for day in range(1, archive.KEEP_FILES + 3):
+        list(archive.record(iter(PAGES), region_file(tmp_path, f"202001{day:02d}_000000_1")))
+    assert len(os.listdir(tmp_path / '54')) == archive.KEEP_FILES
+    assert os.path.basename(archive.latest(str(tmp_path), '54')).startswith(f"202001{archive.KEEP_FILES + 2:02d}")
+
+
+def test_incremental_files_are_not_full(tmp_path):
+    full = archive.archive_path(str(tmp_path), '54', archive.GZIP_SUFFIX)
+    incremental = archive.archive_path(str(tmp_path), '54', archive.GZIP_SUFFIX, full=False)
+    assert full != incremental and incremental.endswith(archive.GZIP_SUFFIX)
+    assert archive.is_full(full) and not archive.is_full(incremental)
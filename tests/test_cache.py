@@ -0,0 +1,58 @@
+import pandas as pd
+
+import misc.cache as cache_
+
+
+def test_lookup_computes_only_missing_keys(tmp_path):
+    path = str(tmp_path / 'match_cache.sqlite')
+    computed = []
+
+    def compute(keys):
+        computed.append(list(keys))
+        return [[len(key), 100.0] for key in keys]
+
+    cache = cache_.MatchCache(path)
+    assert cache_.cached(cache, 'mrigo', 'v1', ['а', 'бб', 'а'], compute) == [[1, 100.0], [2, 100.0], [1, 100.0]]
+    assert cache_.cached(cache, 'mrigo', 'v1', ['бб', 'ввв'], compute) == [[2, 100.0], [3, 100.0]]
+    assert computed == [['а', 'бб'], ['ввв']]
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.close()
+
+    # записи сохраняются в файле и находятся после повторного открытия
+    cache = cache_.MatchCache(path)
+    assert cache_.cached(cache, 'mrigo', 'v1', ['а', 'ввв'], compute) == [[1, 100.0], [3, 100.0]]
+    assert (cache.hits, cache.misses) == (2, 0)
+    cache.close()
+
+
+def test_new_reference_version_invalidates_entries(tmp_path):
+    table = pd.DataFrame({'id': ['1', '2'], 'name': ['Водитель', 'Бухгалтер']})
+    v1 = cache_.reference_version(table, 79)
+    assert cache_.reference_version(table.copy(), 79) == v1
+    assert cache_.reference_version(table, 80) != v1
+    v2 = cache_.reference_version(table.assign(name=['Водитель', 'Кассир']), 79)
+    assert v2 != v1
+
+    cache = cache_.MatchCache(str(tmp_path / 'match_cache.sqlite'))
+    cache_.cached(cache, 'okpdtr', v1, ['водитель'], lambda keys: ['1'] * len(keys))
+    assert cache_.cached(cache, 'okpdtr', v2, ['водитель'], lambda keys: ['3'] * len(keys)) == ['3']
+    assert cache.conn.execute("SELECT count(*) FROM matches WHERE version = ?", (v1,)).fetchone()[0] == 0
+    # другие виды сопоставления не затрагиваются
+    cache_.cached(cache, 'mrigo:blinov.mrigo', v1, ['г Обь'], lambda keys: [[6, 100.0]] * len(keys))
+    cache_.cached(cache, 'okpdtr', v2, ['кассир'], lambda keys: ['4'] * len(keys))
+    assert cache.get_many('mrigo:blinov.mrigo', v1, ['г Обь']) == {'г Обь': [6, 100.0]}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = cache_.MatchCache(str(tmp_path / 'match_cache.sqlite'), max_entries=3)
+    cache.put_many('okpdtr', 'v1', {'а': '1', 'б': '2', 'в': '3'})
+    cache.conn.execute("UPDATE matches SET last_used = 0 WHERE key = 'б'")
+    cache.conn.commit()
+    cache.put_many('okpdtr', 'v1', {'г': '4'})
+    assert sorted(cache.get_many('okpdtr', 'v1', ['а', 'б', 'в', 'г'])) == ['а', 'в', 'г']
+    cache.close()
+
+
+def test_without_cache_everything_is_computed():
+    assert cache_.cached(None, 'okpdtr', 'v1', ['а', 'а'], lambda keys: [key * 2 for key in keys]) == ['аа', 'аа']
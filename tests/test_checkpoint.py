@@ -0,0 +1,87 @@
+import os
+
+import pandas as pd
+import pytest
+
+import misc.checkpoint as checkpoint_
+
+OPTIONS = {'chunk_rows': 100, 'since': None}
+
+
+def api_pages(count):
+    return [[{'vacancy': {'id': f"{page}-{i}"}} for i in range(3)] for page in range(count)]
+
+
+def fetch_from(pages, requested, fail_at=None):
+    # функция загрузки страниц API с журналом начальных страниц и обрывом на странице fail_at
+    def fetch(first):
+        requested.append(first)
+        for number in range(first, len(pages)):
+            if number == fail_at:
+                raise ConnectionError('соединение разорвано')
+            yield pages[number]
+    return fetch
+
+
+def test_interrupted_fetch_is_resumed_from_next_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_, 'SPOOL_PAGES', 2)
+    pages, requested = api_pages(7), []
+    checkpoint = checkpoint_.Checkpoint(str(tmp_path), '54', OPTIONS)
+    assert not checkpoint.resumed
+    received = []
+    with pytest.raises(ConnectionError):
+        for page in checkpoint.pages(fetch_from(pages, requested, fail_at=5)):
+            received.append(page)
+    assert received == pages[:5]
+    # полученные страницы сохранены полностью: и заполненные файлы, и неполный последний
+    assert sorted(name for name in os.listdir(checkpoint.path) if name.startswith('pages_')) == [
+        'pages_0000000.jsonl.gz', 'pages_0000002.jsonl.gz', 'pages_0000004.jsonl.gz']
+    assert not [name for name in os.listdir(checkpoint.path) if name.endswith('.tmp')]
+
+    resumed = checkpoint_.Checkpoint(str(tmp_path), '54', OPTIONS, resume='latest')
+    assert resumed.resumed and resumed.run_id == checkpoint.run_id
+    assert list(resumed.pages(fetch_from(pages, requested))) == pages
+    assert requested == [0, 5]
+
+    # после полной загрузки API больше не запрашивается
+    again = checkpoint_.Checkpoint(str(tmp_path), '54', OPTIONS, resume=checkpoint.run_id)
+    assert list(again.pages(fetch_from(pages, requested))) == pages
+    assert requested == [0, 5]
+
+
+def test_resume_only_runs_with_the_same_options(tmp_path):
+    directory = str(tmp_path)
+    other = checkpoint_.Checkpoint(directory, '54', dict(OPTIONS, chunk_rows=50))
+    first = checkpoint_.Checkpoint(directory, '54', OPTIONS)
+    second = checkpoint_.Checkpoint(directory, '54', OPTIONS)
+    assert len({other.run_id, first.run_id, second.run_id}) == 3
+    # новый запуск удаляет незавершенные запуски с теми же параметрами, с другими -- сохраняет
+    assert sorted(run for run, _ in checkpoint_.runs(directory, '54')) == sorted([other.run_id, second.run_id])
+
+    assert checkpoint_.Checkpoint(directory, '54', OPTIONS, resume='latest').run_id == second.run_id
+    assert checkpoint_.Checkpoint(directory, '54', dict(OPTIONS, chunk_rows=50), resume='latest').run_id == other.run_id
+    assert not checkpoint_.Checkpoint(directory, '54', dict(OPTIONS, chunk_rows=10), resume='latest').resumed
+    # запуск с другими параметрами не продолжается по идентификатору
+    fresh = checkpoint_.Checkpoint(directory, '77', OPTIONS, resume=other.run_id)
+    assert not fresh.resumed and fresh.run_id != other.run_id
+
+
+def test_chunks_and_created_tables_survive_resume(tmp_path):
+    checkpoint = checkpoint_.Checkpoint(str(tmp_path), '54', OPTIONS)
+    vacancies = pd.DataFrame({'id': ['1', '2'], 'okpdtr': ['11442', None]})
+    checkpoint.save_chunk(0, ['1', '2'], (None, vacancies, None))
+    checkpoint.mark_loaded(0)
+    checkpoint.save_chunk(1, ['3'], (None, vacancies.iloc[:1], None))
+    checkpoint.add_created('vacs.vacancies_tv')
+
+    resumed = checkpoint_.Checkpoint(str(tmp_path), '54', OPTIONS, resume=checkpoint.run_id)
+    assert resumed.loaded(0) and not resumed.loaded(1)
+    ids, chunk = resumed.chunk(0)
+    assert ids == ['1', '2']
+    pd.testing.assert_frame_equal(chunk[1], vacancies)
+    assert resumed.chunk(1)[0] == ['3'] and resumed.chunk(2) is None
+    assert resumed.created == {'vacs.vacancies_tv'}
+
+    resumed.finish()
+    assert not os.path.exists(resumed.path)
+    assert checkpoint_.runs(str(tmp_path), '54') == []
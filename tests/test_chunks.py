@@ -0,0 +1,36 @@
+import misc.api as api
+import misc.schema as schema
+import misc.text as text
+import tv_
+
+from bench.synthetic import make_pages
+
+
+def pages_without_optional_keys(vacancies, missing, limit=100):
+    # у последних missing вакансий нет необязательных полей (API их не передает)
+    records = [vacancy for page in make_pages(vacancies) for vacancy in page]
+    for record in records[vacancies - missing:]:
+        del record['vacancy']['company']['fax']
+        del record['vacancy']['salary_max']
+    return [text.flatten_addresses(records[i:i + limit]) for i in range(0, vacancies, limit)]
+
+
+def test_short_last_chunk_keeps_raw_columns():
+    frames = list(api.iter_frames(pages_without_optional_keys(250, 50), 200, schema.RAW_COLUMNS))
+    assert [len(frame) for frame in frames] == [200, 50]
+    assert all(list(frame.columns) == schema.RAW_COLUMNS for frame in frames)
+    assert frames[1]['vacancy.company.fax'].isna().all() and frames[1]['vacancy.salary_max'].isna().all()
+
+    for frame in frames:
+        df_raw = tv_.prepare_raw(frame)
+        companies = tv_.split_companies(df_raw)
+        vacancies = tv_.split_vacancies(df_raw)
+        assert 'fax' in companies.columns and 'salary_max' in vacancies.columns
+        assert len(vacancies) == len(df_raw)
+
+
+def test_columns_are_optional():
+    pages = pages_without_optional_keys(30, 30)
+    frame = api.collect_frame(pages)
+    assert 'vacancy.salary_max' not in frame.columns and 'vacancy.id' in frame.columns
+    assert list(api.collect_frame(pages, schema.RAW_COLUMNS).columns) == schema.RAW_COLUMNS
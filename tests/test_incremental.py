@@ -0,0 +1,45 @@
+import datetime
+
+import misc.incremental as incremental_
+import misc.metrics as metrics_
+import misc.regions as regions
+import tv_
+
+from bench import stub_api
+from bench.synthetic import make_pages
+
+
+def test_modified_since_uses_utc():
+    now = incremental_.utc_now()
+    utc = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    assert now.tzinfo is None and abs(now - utc) < datetime.timedelta(minutes=1)
+    modified_to = datetime.datetime(2020, 9, 20)
+    # полная загрузка выполнена по UTC 6 дней 23 часа назад -- период еще не прошел
+    state = (modified_to, now - datetime.timedelta(days=7) + datetime.timedelta(hours=1))
+    assert incremental_.modified_since(state) == modified_to - incremental_.OVERLAP
+    assert incremental_.modified_since((modified_to, now - datetime.timedelta(days=7))) is None
+    assert incremental_.modified_since((None, None)) is None
+
+
+def test_small_modified_from_fetch(monkeypatch):
+    # несколько сотен измененных вакансий -- одна неполная порция, в которой нет необязательных полей
+    records = [vacancy for page in make_pages(2000) for vacancy in page]
+    for record in records:
+        if record['vacancy']['modify-date'] >= '2020-09-27':
+            del record['vacancy']['company']['fax']
+            del record['vacancy']['salary_max']
+    server = stub_api.serve([records[i:i + 100] for i in range(0, len(records), 100)])
+    try:
+        monkeypatch.setattr(regions, 'API_BASE', stub_api.base_url(server))
+        # запрос изменений с 26-го (строки modify-date сравниваются в заглушке как текст: 27-е и 28-е)
+        since = datetime.datetime(2020, 9, 26)
+        frames = list(tv_.get_data_from_api(0, '54', 2, 20000, metrics_.Metrics(), incremental_.api_params(since)))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(frames) == 1
+    df_raw = incremental_.drop_unchanged(frames[0], incremental_.modify_dates(frames[0]), since)
+    assert 0 < len(df_raw) == len(frames[0]) < 200
+    df_raw = tv_.prepare_raw(df_raw)
+    assert tv_.split_companies(df_raw)['fax'].isna().all()
+    assert tv_.split_vacancies(df_raw)['salary_max'].isna().all()
@@ -0,0 +1,15 @@
+import re
+
+import misc.jobs as jobs_
+import misc.okpdtr_splits as oks
+
+JOBS = ['Водитель категории С', 'Слесарь 5 разряда', 'Электрик разряд 3', 'Машинист крана 6 разр.',
+        'Продавец-консультант', 'ВОДИТЕЛЬ КАТЕГОРИИ Е', '']
+
+
+def test_normalize_is_identical_to_re_split():
+    expected = [re.sub(r"[\W\d]", '', re.split('|'.join(oks.dictionary), job.lower())[0]) for job in JOBS]
+    normalizer = jobs_.JobNormalizer()
+    assert normalizer.normalize_column(JOBS) == expected
+    # место разреза не зависит от порядка слов-разделителей
+    assert jobs_.JobNormalizer(reversed(normalizer.words)).normalize_column(JOBS) == expected
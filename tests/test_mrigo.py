@@ -0,0 +1,39 @@
+import pandas as pd
+
+from rapidfuzz import fuzz
+from rapidfuzz import process
+from rapidfuzz import utils
+
+import misc.mrigo as mrigo
+
+# небольшой справочник: похожие наименования, вложенные токены и повторяющееся наименование с другим кодом
+MRIGO = pd.DataFrame({
+    'id_mrigo': [11, 12, 13, 14, 15, 16, 17, 18],
+    'mrigo': ['г Новосибирск', 'рн Новосибирский', 'г Бердск', 'г Искитим', 'рн Искитимский', 'г Обь',
+              'рн Коченевский', 'г Обь'],
+})
+
+ADDRESSES = [
+    'г Новосибирск', 'Новосибирск', 'г Новосибирск ул Ленина', 'г Новосибирк', 'Новосибирский',
+    'рн Новосибирский с Барышево', 'Бердск', 'г Бердск', 'Искитим', 'Искитимский рн', 'г Обь',
+    'Коченево', 'рп Коченево', 'г Куйбышев', 'рн Тогучинский', 'Новосибирская обл', 'г Новосибирск',
+]
+
+
+def extract_one(addresses, table):
+    # прежний цикл: process.extractOne с обработкой строк по умолчанию rapidfuzz 0.x (default_process)
+    names = table['mrigo'].tolist()
+    id_by_name = dict(zip(names, table['id_mrigo'].tolist()))
+    result = []
+    for address in addresses:
+        name, score = process.extractOne(address, names, scorer=fuzz.token_set_ratio,
+                                         processor=utils.default_process)[:2]
+        result.append((id_by_name[name], score))
+    return result
+
+
+def test_match_is_identical_to_extract_one():
+    expected = extract_one(ADDRESSES, MRIGO)
+    assert mrigo.MrigoMatcher(MRIGO).match(ADDRESSES) == expected
+    # разбиение матрицы оценок на части не меняет результат
+    assert mrigo.MrigoMatcher(MRIGO, workers=1, max_cells=len(MRIGO)).match(ADDRESSES) == expected
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+import misc.okpdtr as okpdtr
+
+# небольшой справочник: одинаковые после очистки наименования с разными кодами, цифры и знаки в наименованиях
+OKPDTR = pd.DataFrame({
+    'id': ['11442', '11453', '16199', '17353', '18559', '19756', '20346', '23369', '25047', '11442-2'],
+    'name': ['Водитель автомобиля', 'Водитель погрузчика', 'Машинист крана (крановщик)', 'Продавец продовольственных товаров',
+             'Слесарь-ремонтник', 'Электрогазосварщик', 'Бухгалтер', 'Инженер-программист', 'Врач-терапевт участковый',
+             'Водитель   автомобиля (1)'],
+})
+
+JOBS = [
+    'водительавтомобиля', 'водитель', 'водительпогрузчика', 'машинисткрана', 'продавец', 'продавецконсультант',
+    'слесарьремонтник', 'слесарь', 'электросварщик', 'бухгалтер', 'главныйбухгалтер', 'инженерпрограммист',
+    'программист', 'врачтерапевт', 'уборщик', 'кассир', '', 'водительавтомобиля',
+]
+
+
+def full_scan(jobs, table, threshold):
+    # прежний цикл: jaro со всеми наименованиями и первое наименование с наибольшей оценкой (find_locate_max)
+    names = [okpdtr.clean_name(name) for name in table['name'].tolist()]
+    ids = table['id'].tolist()
+    result = []
+    for job in jobs:
+        scores = [okpdtr.jaro(name, job) for name in names]
+        biggest = max(scores)
+        result.append(np.nan if biggest < threshold else ids[scores.index(biggest)])
+    return result
+
+
+def test_match_is_identical_to_full_scan():
+    matcher = okpdtr.OkpdtrMatcher(OKPDTR)
+    for threshold in (0.0, 0.5, 0.79, 0.85, 0.95, 1.0):
+        expected = full_scan(JOBS, OKPDTR, threshold)
+        got = matcher.match(JOBS, threshold)
+        assert [str(value) for value in got] == [str(value) for value in expected], threshold
+
+
+def test_equal_scores_keep_first_name():
+    # 'Водитель автомобиля' и 'Водитель   автомобиля (1)' после очистки совпадают: выбирается первый код
+    assert okpdtr.OkpdtrMatcher(OKPDTR).match(['водительавтомобиля'], 0.79) == ['11442']
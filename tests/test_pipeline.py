@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import misc.checkpoint as checkpoint_
+import misc.pipeline as pipeline
+import tv_
+
+from bench.synthetic import make_pages
+
+# параметры обработки региона без кэша, снимков, архива и контрольных точек
+OPTIONS = dict(api_workers=2, cache_path=None, snapshot_dir=None, runs_dir=None, archive_dir=None)
+
+
+def raw_pages(vacancies, missing=0, limit=100):
+    # у последних missing вакансий нет необязательных полей (API их не передает)
+    records = [vacancy for page in make_pages(vacancies) for vacancy in page]
+    for record in records[vacancies - missing:]:
+        del record['vacancy']['company']['fax']
+        del record['vacancy']['salary_max']
+    return [records[i:i + limit] for i in range(0, vacancies, limit)]
+
+
+def assert_same_rows(left, right, key):
+    # типы столбцов могут различаться: категории порций объединяются в таблице-заглушке в object
+    left, right = (frame.drop(columns=['download_time'], errors='ignore').sort_values(key).reset_index(drop=True)
+                   for frame in (left, right))
+    pd.testing.assert_frame_equal(left, right, check_dtype=False, check_categorical=False)
+
+
+def test_prefetch_queue_is_bounded():
+    produced = []
+    closed = threading.Event()
+
+    def source():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    items = pipeline.prefetch(source(), maxsize=2)
+    assert next(items) == 0
+    time.sleep(5 * pipeline.POLL_INTERVAL)
+    # в очереди не больше maxsize элементов и еще один ожидает места в очереди
+    assert len(produced) <= 1 + 2 + 1
+    items.close()
+    assert closed.wait(1)
+
+
+def test_prefetch_reraises_source_error():
+    def source():
+        yield 1
+        raise ValueError('страница не получена')
+
+    items = pipeline.prefetch(source())
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_worker_skips_items_after_error():
+    done = []
+
+    def function(item):
+        if item == 2:
+            raise RuntimeError('БД недоступна')
+        done.append(item)
+
+    worker = pipeline.Worker(function, maxsize=1)
+    for item in (1, 2, 3):
+        worker.put(item)
+    with pytest.raises(RuntimeError):
+        worker.close()
+    assert done == [1]
+
+
+def test_chunks_give_the_same_tables_as_one_frame(api, fake_db):
+    # последняя порция -- 50 вакансий без необязательных полей
+    api(raw_pages(250, missing=50))
+    assert tv_.run_region('54', chunk_rows=100, **OPTIONS)[:4] == ('54', 0, fake_db.tables['vacs.companies_tv'].shape[0], 250)
+    chunked = dict(fake_db.tables)
+    assert fake_db.log == [("Программа успешно завершила свою работу.", 0, '54')]
+    assert len(fake_db.closed) == 1 and len(fake_db.closed[0][1]) == 250
+
+    fake_db.tables.clear()
+    assert tv_.run_region('54', chunk_rows=1000, **OPTIONS)[1] == 0
+    assert_same_rows(chunked['vacs.vacancies_tv'], fake_db.tables['vacs.vacancies_tv'], 'id')
+    assert_same_rows(chunked['vacs.companies_tv'], fake_db.tables['vacs.companies_tv'], 'ogrn')
+
+
+def test_load_error_is_logged_once_and_run_can_be_resumed(api, fake_db, tmp_path):
+    api(raw_pages(250, missing=50))
+    options = dict(OPTIONS, runs_dir=str(tmp_path))
+    # выгрузка вакансий первых двух порций завершается ошибкой
+    fake_db.fail_table, fake_db.fail_times = 'vacs.vacancies_tv', 2
+    assert tv_.run_region('54', chunk_rows=100, **options)[1] == 0
+    errors = [entry for entry in fake_db.log if entry[1] is None]
+    assert len(errors) == 1 and "'Вакансии'" in errors[0][0]
+    assert len(fake_db.tables['vacs.vacancies_tv']) == 50
+    # запуск не завершен: порции с ошибкой выгружаются при продолжении
+    assert len(checkpoint_.runs(str(tmp_path), '54')) == 1
+
+    assert tv_.run_region('54', chunk_rows=100, resume='latest', **options)[1] == 0
+    assert sorted(fake_db.tables['vacs.vacancies_tv']['id']) == sorted(
+        vacancy['vacancy']['id'] for page in raw_pages(250) for vacancy in page)
+    assert checkpoint_.runs(str(tmp_path), '54') == []
+
+
+def test_no_data_exit_code(api, fake_db):
+    api([])
+    assert tv_.run_region('54', chunk_rows=100, **OPTIONS)[1] == 2
+    assert [entry[1] for entry in fake_db.log] == [2]
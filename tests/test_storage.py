@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+import misc.storage as storage
+
+
+def test_row_hashes_do_not_depend_on_numeric_dtype():
+    # одна и та же вакансия в порции без пропусков (int64) и в порции с пропуском (float64)
+    ints = pd.DataFrame({'id': ['1', '2'], 'salary_min': [50000, 30000]})
+    floats = pd.DataFrame({'id': ['1', '3'], 'salary_min': [50000.0, np.nan]})
+    assert ints['salary_min'].dtype == np.int64 and floats['salary_min'].dtype == np.float64
+    columns = ['id', 'salary_min']
+    assert storage.row_hashes(ints, columns)[0] == storage.row_hashes(floats, columns)[0]
+    assert storage.row_hashes(ints.astype({'salary_min': object}), columns) == storage.row_hashes(ints, columns)
+
+
+def test_row_hashes_keep_fractions_and_missing_values():
+    frame = pd.DataFrame({'id': ['1', '1', '1'], 'salary_min': [50000.5, 50000.0, np.nan]})
+    hashes = storage.row_hashes(frame, ['id', 'salary_min'])
+    assert len(set(hashes)) == 3
+    missing = pd.DataFrame({'id': ['1'], 'salary_min': [None]})
+    assert storage.row_hashes(missing, ['id', 'salary_min'])[0] == hashes[2]
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+"""
+Командная строка загрузки вакансий ТРУДВСЕМ: python -m tv <команда> [параметры].
+  - fetch -- загрузить страницы API в архив (archive/<регион>/...) без обработки и без подключения к БД.
+  - match -- очистить и сопоставить страницы из архива (по умолчанию -- последнего файла региона);
+    сопоставленные порции сохраняются в контрольных точках запуска (cache/runs).
+  - load -- выгрузить в БД порции, сопоставленные командой match. Если сопоставлен последний архив
+    полной загрузки (без --replay), отсутствующие в нем вакансии закрываются и отметка загрузки сохраняется,
+    как в run; для архива, указанного в --replay, и архивов инкрементальной загрузки -- нет.
+  - run -- все этапы сразу (то же, что python tv_.py), в том числе режим службы --serve.
+Модули с тяжелыми зависимостями и подключение к БД загружаются только на этапах, которым они нужны
+(см. misc/lazy.py), поэтому --help и fetch не импортируют pandas, sqlalchemy, rapidfuzz и jellyfish.
+"""
+
+import argparse
+import os
+import sys
+
+import misc.archive as archive
+import misc.checkpoint as checkpoint_
+import misc.incremental as incremental_
+import misc.regions as regions
+import misc.service as service
+import tv_
+
+
+def fetch(args):
+    """
+    Команда fetch: загрузить страницы регионов в архив.
+
+    Входные параметры:
+    args -- разобранные параметры командной строки
+    """
+    results = []
+    for region in regions.parse_regions(args.regions):
+        try:
+            path, count = tv_.fetch_pages(region, args.api_workers, tv_.ARCHIVE_DIR, args.archive_keep)
+        except Exception as e:
+            print(f">>> Регион {region}: сервера TRUDVSEM недоступны -- {e}")
+            results.append((region, 1))
+            continue
+        print(f">> Страниц получено -- {count}, архив: {path}")
+        results.append((region, 0 if count else 2))
+    return results
+
+
+def match(args):
+    """
+    Команда match: сопоставить страницы из архива и сохранить порции в контрольных точках.
+
+    Входные параметры:
+    args -- разобранные параметры командной строки
+    """
+    results = []
+    for region in regions.parse_regions(args.regions):
+        path = args.replay or archive.latest(tv_.ARCHIVE_DIR, region)
+        if path is None:
+            print(f">>> Регион {region}: архива страниц нет (python -m tv fetch).")
+            results.append((region, 1))
+            continue
+        # по последнему архиву полной загрузки команда load закрывает отсутствующие вакансии, как run
+        full = args.replay is None and archive.is_full(path)
+        result = tv_.run_region(
+            region, replay=os.path.abspath(path), replay_full=full, load=False, runs_dir=tv_.RUNS_DIR, archive_dir=None,
+            chunk_rows=args.chunk_rows, match_workers=args.workers, top_k=args.top_k,
+            cache_path=None if args.no_match_cache else tv_.MATCH_CACHE_PATH,
+            snapshot_dir=None if args.no_snapshot else tv_.SNAPSHOT_DIR,
+            profile_dir=args.profile, profiler=args.profiler)
+        results.append(result[:2])
+    return results
+
+
+def load(args):
+    """
+    Команда load: выгрузить в БД порции, сопоставленные командой match.
+
+    Входные параметры:
+    args -- разобранные параметры командной строки
+    """
+    results = []
+    for region in regions.parse_regions(args.regions):
+        runs = dict(checkpoint_.runs(tv_.RUNS_DIR, region))
+        # по умолчанию -- последний запуск match (незавершенные запуски run хранятся там же)
+        matched = [run for run, options in runs.items() if options.get('replay') is not None]
+        run_id = args.run or (matched[-1] if matched else None)
+        options = runs.get(run_id)
+        if options is None or options.get('replay') is None:
+            print(f">>> Регион {region}: сопоставленных порций {'запуска ' + run_id + ' ' if run_id else ''}нет "
+                  f"(python -m tv match; прерванный запуск run продолжается командой run --resume).")
+            results.append((region, 1))
+            continue
+        # параметры берутся из запуска match, иначе запуск не будет продолжен
+        full = bool(options.get('replay_full'))
+        print(f"> Регион {region}: выгрузка запуска {run_id} ({options['replay']}) -- "
+              + ("полная загрузка, отсутствующие вакансии закрываются." if full else
+                 "архив не полной загрузки или указан в --replay, отсутствующие вакансии не закрываются."))
+        result = tv_.run_region(
+            region, resume=run_id, replay=options['replay'], replay_full=full, chunk_rows=options['chunk_rows'],
+            top_k=options['top_k'], upsert=args.upsert, runs_dir=tv_.RUNS_DIR, archive_dir=None,
+            profile_dir=args.profile, profiler=args.profiler)
+        results.append(result[:2])
+    return results
+
+
+def run(args):
+    """
+    Команда run: загрузка, сопоставление и выгрузка (или режим службы при --serve).
+
+    Входные параметры:
+    args -- разобранные параметры командной строки
+    """
+    region_list = regions.parse_regions(args.regions)
+    options = dict(
+        api_workers=args.api_workers,
+        cache_path=None if args.no_match_cache else tv_.MATCH_CACHE_PATH,
+        upsert=args.upsert,
+        chunk_rows=args.chunk_rows,
+        match_workers=args.workers,
+        snapshot_dir=None if args.no_snapshot else tv_.SNAPSHOT_DIR,
+        incremental=args.incremental,
+        full_sweep_days=args.full_sweep_days,
+        top_k=args.top_k,
+        runs_dir=None if args.no_checkpoint else tv_.RUNS_DIR,
+        resume=args.resume,
+        archive_dir=None if args.no_archive else tv_.ARCHIVE_DIR,
+        archive_keep=args.archive_keep,
+        replay=args.replay,
+        profile_dir=args.profile,
+        profiler=args.profiler,
+    )
+    if args.serve:
+        service.serve(service.Service(lambda region, metrics: tv_.run_region(region, metrics=metrics, **options),
+                                      region_list, args.interval, service.parse_intervals(args.region_interval)),
+                      args.host, args.port or None)
+        return []
+    return [result[:2] for result in tv_.run_regions(region_list, args.processes, **options)]
+
+
+def make_parser():
+    """Разбор параметров командной строки: команды fetch, match, load, run."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--regions', default=regions.DEFAULT_REGION,
+                        help="коды регионов через запятую или 'all' (по умолчанию %(default)s)")
+    common.add_argument('--profile', metavar='DIR',
+                        help="профилировать обработку каждого региона и сохранить результаты в каталог")
+    common.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                        help="профилировщик для --profile (по умолчанию %(default)s)")
+
+    fetching = argparse.ArgumentParser(add_help=False)
+    fetching.add_argument('--api-workers', type=int, default=tv_.API_WORKERS,
+                          help="число одновременно загружаемых страниц API")
+    fetching.add_argument('--archive-keep', type=int, default=archive.KEEP_FILES, metavar='N',
+                          help="число хранимых файлов архива страниц на регион (по умолчанию %(default)s)")
+
+    matching = argparse.ArgumentParser(add_help=False)
+    matching.add_argument('--chunk-rows', type=int, default=tv_.CHUNK_ROWS,
+                          help="число вакансий в порции при потоковой обработке (по умолчанию %(default)s)")
+    matching.add_argument('--workers', type=int, default=tv_.MATCH_WORKERS,
+                          help="число процессов для сопоставления с МРИГО/ОКПДТР в каждом регионе (по умолчанию %(default)s)")
+    matching.add_argument('--no-match-cache', action='store_true', help="не использовать кэш результатов сопоставления")
+    matching.add_argument('--no-snapshot', action='store_true',
+                          help="загружать справочники МРИГО/ОКПДТР из БД без локального снимка")
+    matching.add_argument('--top-k', type=int, nargs='?', const=tv_.TOP_K, default=0,
+                          help=f"сохранять k лучших кандидатов сопоставления с оценками в vacs.vacancies_tv_candidates "
+                               f"(без значения -- {tv_.TOP_K})")
+
+    loading = argparse.ArgumentParser(add_help=False)
+    loading.add_argument('--upsert', action='store_true',
+                         help="обновлять компании и вакансии, данные которых изменились (по хэшу строки)")
+
+    parser = argparse.ArgumentParser(prog='python -m tv', description="Загрузка вакансий ТРУДВСЕМ в БД.")
+    commands = parser.add_subparsers(dest='command', metavar='{fetch,match,load,run}')
+    commands.required = True
+
+    commands.add_parser('fetch', parents=[common, fetching], help="загрузить страницы API в архив",
+                        description="Загрузить страницы API в архив без обработки и без подключения к БД.")
+
+    parser_match = commands.add_parser('match', parents=[common, matching], help="сопоставить страницы из архива",
+                                       description="Очистить и сопоставить страницы из архива, сохранить порции "
+                                                   "для выгрузки командой load.")
+    parser_match.add_argument('--replay', metavar='FILE',
+                              help="файл архива (один регион, см. --regions; по умолчанию -- последний файл региона)")
+
+    parser_load = commands.add_parser('load', parents=[common, loading], help="выгрузить сопоставленные порции в БД",
+                                      description="Выгрузить в БД порции, сопоставленные командой match.")
+    parser_load.add_argument('--run', metavar='RUN_ID', help="запуск match (по умолчанию -- последний запуск региона)")
+
+    parser_run = commands.add_parser('run', parents=[common, fetching, matching, loading],
+                                     help="загрузка, сопоставление и выгрузка (как python tv_.py)",
+                                     description="Загрузка вакансий ТРУДВСЕМ в БД.")
+    parser_run.add_argument('--processes', type=int, default=1, help="число процессов для обработки регионов")
+    parser_run.add_argument('--incremental', action='store_true',
+                            help="загружать только вакансии, измененные после предыдущего запуска (нужна таблица vacs.tv_fetch_state)")
+    parser_run.add_argument('--full-sweep-days', type=int, default=incremental_.FULL_SWEEP_DAYS,
+                            help="период полной загрузки в режиме --incremental, дней (по умолчанию %(default)s)")
+    parser_run.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                            help="продолжить прерванный запуск (без значения -- последний прерванный запуск региона)")
+    parser_run.add_argument('--no-checkpoint', action='store_true',
+                            help="не сохранять страницы API и результаты порций для продолжения запуска")
+    parser_run.add_argument('--no-archive', action='store_true', help="не записывать полученные страницы API в архив")
+    parser_run.add_argument('--replay', metavar='FILE',
+                            help="обработать страницы из файла архива вместо загрузки из API (один регион, см. --regions)")
+    parser_run.add_argument('--serve', action='store_true',
+                            help="режим службы: обрабатывать регионы по расписанию в одном процессе, не завершаясь")
+    parser_run.add_argument('--interval', type=float, default=service.INTERVAL_MINUTES,
+                            help="интервал обработки региона в режиме --serve, мин. (по умолчанию %(default)s)")
+    parser_run.add_argument('--region-interval', metavar='REGION=MIN,...',
+                            help="отдельные интервалы регионов в режиме --serve, например 54=30,42=120")
+    parser_run.add_argument('--host', default=service.HOST,
+                            help="адрес HTTP-сервера состояния (/health) и метрик (/metrics) в режиме --serve")
+    parser_run.add_argument('--port', type=int, default=service.PORT,
+                            help="порт HTTP-сервера состояния и метрик (0 -- без сервера; по умолчанию %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    """
+    Разобрать параметры, выполнить команду и завершить процесс с наибольшим кодом завершения регионов.
+
+    Входные параметры:
+    argv -- параметры командной строки (по умолчанию sys.argv[1:])
+    """
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'archive_keep', 1) < 1:
+        parser.error("--archive-keep: хранится хотя бы один файл архива")
+    if getattr(args, 'replay', None) is not None and len(regions.parse_regions(args.regions)) != 1:
+        parser.error("--replay обрабатывает архив одного региона: укажите его в --regions")
+    if args.command == 'run' and args.serve:
+        if args.processes > 1 or args.resume is not None or args.replay is not None:
+            parser.error("--serve обрабатывает регионы последовательно в одном процессе и несовместим "
+                         "с --processes, --resume и --replay (для сопоставления в нескольких процессах -- --workers)")
+        try:
+            service.parse_intervals(args.region_interval)
+        except ValueError as e:
+            parser.error(str(e))
+
+    results = {'fetch': fetch, 'match': match, 'load': load, 'run': run}[args.command](args)
+    failed = [region for region, code in results if code]
+    if failed:
+        print(f"\n> Регионы с ошибками (для повторного запуска): {','.join(failed)}")
+    sys.exit(max((code for _, code in results), default=0))
+
+
+if __name__ == "__main__":
+    main()
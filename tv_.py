@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf8 -*-
 """
-  - Получение данных через API ТРУДВСЕМ.
+  - Получение данных через API ТРУДВСЕМ и потоковая обработка порциями.
   - Распределение исходных данных на два отношения -- "Компании" и "Вакансии" (2NF).
   - Получение из БД таблиц с кодами и названиями МРИГО/ОКПДТР, а также с параметрами для сопоставления.
   - Cопоставление адресов вакансий с кодами МРИГО и имен вакансий с кодами ОКПДТР.
@@ -10,616 +10,1034 @@
   - Измерение времени выполнения.
 """
 
-import html
-import jellyfish
-import json
-import numpy as np
+import itertools
 import os
-import pandas as pd
-import re
-import sqlalchemy as sa
-import string
 import sys
 import time
-import urllib.request
 
-from rapidfuzz import fuzz
-from rapidfuzz import process
+from concurrent.futures import ProcessPoolExecutor
 
-import misc.db as db
-import misc.okpdtr_splits as oks
+import misc.api as api
+import misc.archive as archive
+import misc.checkpoint as checkpoint_
+import misc.incremental as incremental_
+import misc.jobs as jobs_
+import misc.lazy as lazy
+import misc.parallel as parallel
+import misc.pipeline as pipeline
+import misc.regions as regions
 
+# тяжелые зависимости импортируются на том этапе, которому они нужны (см. misc/lazy.py);
+# misc.db создает подключение к БД при импорте, т.е. при первом запросе к БД
+np = lazy.LazyModule('numpy')
+pd = lazy.LazyModule('pandas')
+sa = lazy.LazyModule('sqlalchemy')
+candidates_ = lazy.LazyModule('misc.candidates')
+codes = lazy.LazyModule('misc.codes')
+db = lazy.LazyModule('misc.db')
+match_cache = lazy.LazyModule('misc.cache')
+metrics_ = lazy.LazyModule('misc.metrics')
+mrigo = lazy.LazyModule('misc.mrigo')
+okpdtr = lazy.LazyModule('misc.okpdtr')
+schema = lazy.LazyModule('misc.schema')
+snapshot = lazy.LazyModule('misc.snapshot')
+storage = lazy.LazyModule('misc.storage')
+text = lazy.LazyModule('misc.text')
 
-def find_locate_max(lst):
+# число одновременно загружаемых страниц API
+API_WORKERS = 8
+
+# число процессов для сопоставления с МРИГО/ОКПДТР (1 -- в текущем процессе)
+MATCH_WORKERS = 1
+
+# число вакансий в порции при потоковой обработке
+CHUNK_ROWS = 20000
+
+# файл постоянного кэша результатов сопоставления
+MATCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'match_cache.sqlite')
+
+# число сохраняемых кандидатов сопоставления с МРИГО/ОКПДТР для ключа --top-k без значения
+TOP_K = 5
+
+# каталог архива "сырых" страниц API (для повторной обработки без загрузки)
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+
+# каталог контрольных точек запусков (страницы API и результаты порций для продолжения запуска)
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'runs')
+
+# таблица слов-разделителей имен вакансий (если ее нет в БД, используется misc/okpdtr_splits.py)
+JOB_SPLITS_TABLE = 'vacs.tv_job_splits'
+
+# каталог снимков справочников МРИГО/ОКПДТР с индексами сопоставления
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'snapshots')
+
+
+def log_to_db(message, exit_point=None, region=None, num_of_companies=None, num_of_vacancies=None, num_of_closed=None,
+              metrics=None):
     """
-    Поиск наибольшего значения в списке.
+    Записать сообщение в журнал работы скрипта (vacs.tv_log).
 
     Входные параметры:
-    lst -- список с числами
+    message -- текст сообщения
+    exit_point -- точка выхода (None -- работа продолжается)
+    region -- двузначный код региона
+    num_of_companies -- число загруженных компаний
+    num_of_vacancies -- число загруженных вакансий
+    num_of_closed -- число закрытых вакансий
+    metrics -- метрики запуска (misc.metrics.Metrics), записываются в столбец metrics в виде JSON
     """
-    biggest = max(lst)
-    return biggest, [index for index, element in enumerate(lst) if biggest == element]
+    db.engine.execute(
+        sa.text("INSERT INTO vacs.tv_log (exit_point, message, region_code, num_of_companies, num_of_vacancies, num_of_closed, metrics) VALUES (:ep, :msg, :rc, :noc, :nov, :ncl, CAST(:mt AS jsonb))")
+        .bindparams(ep=exit_point, msg=message, rc=region, noc=num_of_companies, nov=num_of_vacancies, ncl=num_of_closed,
+                    mt=metrics.to_json() if metrics is not None else None))
 
 
-def remove_tags(text):
+def get_data_from_api(start_offset, region=regions.DEFAULT_REGION, workers=API_WORKERS, chunk_rows=CHUNK_ROWS, metrics=None,
+                      params=None, checkpoint=None, archive_path=None, replay=None, archive_keep=archive.KEEP_FILES):
     """
-    Удалить HTML-тэги из произвольного текста.
+    Генератор порций ("сырых" таблиц) с данными о вакансиях, полученными через API ТРУДВСЕМ.
 
     Входные параметры:
-    text -- строка, в которой могут содержаться HTML-тэги
+    start_offset -- начальная страница для загрузки данных
+    region -- двузначный код региона
+    workers -- число одновременно загружаемых страниц
+    chunk_rows -- число вакансий в порции
+    metrics -- метрики запуска (время ответа API на страницу и общее время загрузки)
+    params -- дополнительные параметры запроса страниц (например, для инкрементальной загрузки)
+    checkpoint -- контрольные точки запуска (сохраненные страницы читаются из них, новые -- сохраняются)
+    archive_path -- файл архива, в который записываются полученные страницы (None -- без архива)
+    replay -- файл архива, страницы которого обрабатываются вместо загрузки из API (None -- загрузка из API)
+    archive_keep -- число хранимых файлов архива региона (None -- не удалять старые файлы)
     """
-    return html.escape(re.sub(r'(<!--.*?-->|<[^>]*>)', '', text))
+    metrics = metrics if metrics is not None else metrics_.Metrics()
+    if replay is not None:
+        def fetch(offset):
+            return itertools.islice(archive.read_pages(replay), offset, None)
+        print(f">> Чтение страниц из архива {replay}...")
+    else:
+        fetcher = api.Fetcher(regions.api_url(region), workers=workers, params=params)
+        metrics.page_latencies = fetcher.latencies
+        fetch = fetcher.fetch
+        print(">> Загрузка данных через API TRUDVSEM...")
+    # время загрузки включает ожидание, пока обработка освободит место в очереди порций
+    with metrics.stage('api_fetch'):
+        pages = checkpoint.pages(fetch) if checkpoint is not None else fetch(start_offset)
+        if archive_path is not None:
+            pages = archive.record(pages, archive_path, archive_keep)
+        # приводим полученные данные к таблицам с постоянным составом столбцов;
+        # список адресов заменяется строкой при разборе страниц
+        yield from api.iter_frames((text.flatten_addresses(page) for page in pages), chunk_rows, schema.RAW_COLUMNS)
+    print(">> Загрузка данных через API TRUDVSEM заверешна.")
 
 
-def get_page_from_api(offset):
+def fetch_pages(region=regions.DEFAULT_REGION, workers=API_WORKERS, archive_dir=ARCHIVE_DIR, archive_keep=archive.KEEP_FILES):
     """
-    Получить данные с заданной страницы через API ТРУДВСЕМ.
+    Загрузить страницы региона из API в архив без обработки (pandas и подключение к БД не нужны).
+    Возвращает путь к файлу архива и число страниц.
 
     Входные параметры:
-    offset -- сдвиг (текущая страница)
+    region -- двузначный код региона
+    workers -- число одновременно загружаемых страниц
+    archive_dir -- каталог архива страниц API
+    archive_keep -- число хранимых файлов архива региона (None -- не удалять старые файлы)
     """
-    with urllib.request.urlopen("http://opendata.trudvsem.ru/api/v1/vacancies/region/54?offset=" + str(offset) + "&limit=100") as url:
-        data = json.loads(url.read().decode("utf-8"))
-        status = int(data['status'])
-        if status != 200:
-            return None, status
-        return data, status
+    fetcher = api.Fetcher(regions.api_url(region), workers=workers)
+    path = archive.archive_path(archive_dir, region)
+    print(f"> Загрузка страниц региона {region} через API TRUDVSEM в архив...")
+    count = sum(1 for _ in archive.record(fetcher.fetch(0), path, archive_keep))
+    return path, count
 
 
-def get_data_from_api(start_offset):
+def prepare_raw(df_raw):
     """
-    Получить доступные данные о вакансиях через API ТРУДВСЕМ.
+    Очистить "сырую" таблицу порции: HTML-тэги, пустые значения, типы столбцов, коды,
+    строки без ОГРН и повторы вакансий внутри порции.
 
     Входные параметры:
-    start_offset -- начальная страница для загрузки данных
+    df_raw -- "сырая" таблица порции
     """
-    df_raw = pd.DataFrame()
-    offset = start_offset
-    print(">> Загрузка данных через API TRUDVSEM...")
-    while True:
-        # print(f">> Текущая страница: -- {offset}")
-        data, status = get_page_from_api(offset)
-        if status != 200:
-            break
-        new_data = data['results']['vacancies']
-        # приводим полученные данные к таблице
-        df_tmp = pd.json_normalize(new_data)
-        df_raw = pd.concat([df_raw, df_tmp], sort=False, ignore_index=True)
-        offset += 1
-    print(">> Загрузка данных через API TRUDVSEM заверешна.")
+    df_raw['vacancy.duty'] = text.strip_tags(df_raw['vacancy.duty'])
+    df_raw['vacancy.requirement.qualification'] = text.strip_tags(df_raw['vacancy.requirement.qualification'])
+    df_raw = df_raw.replace({False: np.nan})
+    # столбцы с небольшим числом различных значений хранятся как категории
+    df_raw = schema.apply_raw(df_raw)
+
+    # время загрузки данных (фактическое)
+    df_raw['download_time'] = pd.to_datetime('now')
+
+    # коды нормализуются один раз для всех последующих этапов
+    df_raw = codes.normalize_codes(df_raw, [
+        'vacancy.region.region_code', 'vacancy.company.inn', 'vacancy.company.ogrn', 'vacancy.company.kpp',
+    ])
+    # выбираем ОГРН первичным ключом
+    df_raw = df_raw[pd.notnull(df_raw['vacancy.company.ogrn'])]
+    df_raw = df_raw.drop_duplicates(
+        subset="vacancy.id",
+        keep='last'
+    )
+    # df_raw.to_csv('df_raw.csv', index=False)
     return df_raw
 
 
-def main():
-    ################################
-    '''получение данных через API'''
-    ################################
-    print(f"> Получение данных:")
-    start = time.time()
-    # получение "сырого" датафрейма с вакансиями
-    try:
-        df_raw = get_data_from_api(0)
-    except:
-        s1 = "Сервера TRUDVSEM недоступны. Завершение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=1, msg=s1))
-        print(f">>> " + s1)
-        sys.exit(1)
-
-    if df_raw.empty:
-        s2 = "Данных не найдено, возможно они были перенесены. Завершение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=2, msg=s2))
-        print(f">>> " + s2)
-        sys.exit(2)
+def split_companies(df_raw):
+    """
+    Отношение 'Компании' из "сырой" таблицы порции.
 
-    try:
-        df_raw = df_raw.astype({
-            'vacancy.region.region_code': 'str',
-            'vacancy.company.inn': 'str',
-            'vacancy.company.ogrn': 'str',
-            'vacancy.company.kpp': 'str',
-            'vacancy.addresses.address': 'str',
-            'vacancy.duty': 'str',
-            'vacancy.requirement.qualification': 'str',
-        })
-        
-        df_raw['vacancy.addresses.address'] = df_raw['vacancy.addresses.address'].apply(lambda s: re.sub("'location': |{|\[|lng': |'lat': |}|\]|\'", '', s))
-        df_raw['vacancy.duty'] = df_raw['vacancy.duty'].apply(remove_tags)
-        df_raw['vacancy.requirement.qualification'] = df_raw['vacancy.requirement.qualification'].apply(remove_tags)
-        df_raw = df_raw.replace({False: np.nan})
-        
-        # время загрузки данных (фактическое)
-        df_raw['download_time'] = pd.to_datetime('now')
-        
-        # выбираем ОГРН первичным ключом
-        df_raw['vacancy.company.ogrn'] = df_raw['vacancy.company.ogrn'].str.strip()
-        df_raw['vacancy.company.ogrn'] = df_raw['vacancy.company.ogrn'].replace(['nan', 'NaN', 'Nan', 'naN', 'nAn', ''], np.nan)
-        df_raw = df_raw[pd.notnull(df_raw['vacancy.company.ogrn'])]
-        df_raw = df_raw.drop_duplicates(
-            subset="vacancy.id",
-            keep='last'
+    Входные параметры:
+    df_raw -- очищенная "сырая" таблица порции
+    """
+    companies = df_raw[
+        ['vacancy.company.companycode', 'vacancy.company.inn', 'vacancy.company.ogrn', 'vacancy.company.kpp',
+        'vacancy.company.name',
+        'vacancy.addresses.address',
+        'vacancy.company.hr-agency',
+        'vacancy.company.url', 'vacancy.company.site',
+        'vacancy.company.phone', 'vacancy.company.fax', 'vacancy.company.email',
+        'vacancy.company.code_industry_branch',
+        ]]
+    companies = companies.drop_duplicates(
+        subset="vacancy.company.ogrn",
+        keep='first'
         )
-        # df_raw.to_csv('df_raw.csv', index=False)
-    except:
-        s3 = "Проблемы с исходным датафреймом (df_raw). Завершение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=3, msg=s3))
-        print(f">>> " + s3)
-        sys.exit(3)
+    companies = companies.reset_index(drop=True)
+    companies = companies.rename(columns={
+        'vacancy.company.ogrn': 'ogrn',
+        'vacancy.company.inn': 'inn',
+        'vacancy.company.kpp': 'kpp',
+        'vacancy.company.companycode': 'companycode',
+        'vacancy.company.name': 'name',
+        'vacancy.addresses.address': 'address',
+        'vacancy.company.hr-agency': 'hr_agency',
+        'vacancy.company.url': 'url',
+        'vacancy.company.site': 'site',
+        'vacancy.company.phone': 'phone',
+        'vacancy.company.fax': 'fax',
+        'vacancy.company.email': 'email',
+        'vacancy.company.code_industry_branch': 'code_industry_branch',
+    })
+    return companies
 
 
-    ######################################################################################
-    '''распределение исходных данных на два отношения -- 'Компании' и 'Вакансии' (2NF)'''
-    ######################################################################################
-    try:
-        # отношение 'Компании'
-        companies = df_raw[
-            ['vacancy.company.companycode', 'vacancy.company.inn', 'vacancy.company.ogrn', 'vacancy.company.kpp',
-            'vacancy.company.name',
-            'vacancy.addresses.address',
-            'vacancy.company.hr-agency',
-            'vacancy.company.url', 'vacancy.company.site',
-            'vacancy.company.phone', 'vacancy.company.fax', 'vacancy.company.email',
-            'vacancy.company.code_industry_branch',
-            ]]
-        companies = companies.drop_duplicates(
-            subset="vacancy.company.ogrn",
-            keep='first'
-            )
-        companies = companies.reset_index(drop=True)
-        companies = companies.rename(columns={
-            'vacancy.company.ogrn': 'ogrn',
-            'vacancy.company.inn': 'inn',
-            'vacancy.company.kpp': 'kpp',
-            'vacancy.company.companycode': 'companycode',
-            'vacancy.company.name': 'name',
-            'vacancy.addresses.address': 'address',
-            'vacancy.company.hr-agency': 'hr_agency',
-            'vacancy.company.url': 'url',
-            'vacancy.company.site': 'site',
-            'vacancy.company.phone': 'phone',
-            'vacancy.company.fax': 'fax',
-            'vacancy.company.email': 'email',
-            'vacancy.company.code_industry_branch': 'code_industry_branch',
-        })
-        print(">> Новое отношение 'Компании' успешно сформированно")
-    except:
-        s4 = "Проблема с формированием отношения 'Компании'. Завершение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=4, msg=s4))
-        print(f">>> " + s4)
-        sys.exit(4)
+def split_vacancies(df_raw):
+    """
+    Отношение 'Вакансии' из "сырой" таблицы порции.
 
-    try:
-        # отношение 'Вакансии'
-        vacancies = df_raw[
-            ['vacancy.id', 'vacancy.company.ogrn',
-            'vacancy.source',
-            'vacancy.region.region_code', 'vacancy.region.name', 'vacancy.addresses.address',
-            'vacancy.requirement.experience',
-            'vacancy.employment', 'vacancy.schedule',
-            'vacancy.job-name', 'vacancy.category.specialisation', 'vacancy.duty',
-            'vacancy.requirement.education', 'vacancy.requirement.qualification',
-            'vacancy.term.text', 'vacancy.social_protected',
-            'vacancy.salary_min', 'vacancy.salary_max', 'vacancy.salary', 'vacancy.currency',
-            'vacancy.vac_url',
-            'vacancy.category.industry',
-            'vacancy.creation-date',
-            # 'vacancy.modify-date',
-            'download_time',
-            ]]
-
-        vacancies = vacancies.rename(columns={
-            'vacancy.id': 'id',
-            'vacancy.company.ogrn': 'ogrn',
-            'vacancy.source': 'source',
-            'vacancy.region.region_code': 'region_code',
-            'vacancy.region.name': 'region_name',
-            'vacancy.addresses.address': 'address',
-            'vacancy.requirement.experience': 'experience',
-            'vacancy.employment': 'employment',
-            'vacancy.schedule': 'schedule',
-            'vacancy.job-name': 'job_name',
-            'vacancy.category.specialisation': 'specialisation',
-            'vacancy.duty': 'duty',
-            'vacancy.requirement.education': 'education',
-            'vacancy.requirement.qualification': 'qualification',
-            'vacancy.term.text': 'term_text',
-            'vacancy.social_protected': 'social_protected',
-            'vacancy.salary_min': 'salary_min',
-            'vacancy.salary_max': 'salary_max',
-            'vacancy.salary': 'salary',
-            'vacancy.currency': 'currency',
-            'vacancy.vac_url': 'vac_url',
-            'vacancy.category.industry': 'industry',
-            'vacancy.creation-date': 'creation_date_from_api',
-            # 'vacancy.modify-date': 'modify_date_from_api',
-        })
-        vacancies['is_closed'] = False
-        vacancies['closing_time'] = np.nan
-        print(">> Новое отношение 'Вакансии' успешно сформированно.")
-    except Exception as e:
-        s5 = "Проблема с формированием отношения 'Вакансии'. Завершение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=5, msg=s5))
-        print(f">>> " + s5 + ': '+ str(e))
-        sys.exit(5)
-
-    ########################################################################################################
-    '''получение из БД таблиц с кодами и названиями МРИГО/ОКПДТР, а также с параметрами для сопоставления'''
-    ########################################################################################################
-    try:
-        mrigo_id_name = db.get_table_from_db_by_table_name('blinov.mrigo')
-        print(f"\n> Таблица с кодами и наименованиям МРИГО успешно загружена.")
+    Входные параметры:
+    df_raw -- очищенная "сырая" таблица порции
+    """
+    vacancies = df_raw[
+        ['vacancy.id', 'vacancy.company.ogrn',
+        'vacancy.source',
+        'vacancy.region.region_code', 'vacancy.region.name', 'vacancy.addresses.address',
+        'vacancy.requirement.experience',
+        'vacancy.employment', 'vacancy.schedule',
+        'vacancy.job-name', 'vacancy.category.specialisation', 'vacancy.duty',
+        'vacancy.requirement.education', 'vacancy.requirement.qualification',
+        'vacancy.term.text', 'vacancy.social_protected',
+        'vacancy.salary_min', 'vacancy.salary_max', 'vacancy.salary', 'vacancy.currency',
+        'vacancy.vac_url',
+        'vacancy.category.industry',
+        'vacancy.creation-date',
+        # 'vacancy.modify-date',
+        'download_time',
+        ]]
+
+    vacancies = vacancies.rename(columns={
+        'vacancy.id': 'id',
+        'vacancy.company.ogrn': 'ogrn',
+        'vacancy.source': 'source',
+        'vacancy.region.region_code': 'region_code',
+        'vacancy.region.name': 'region_name',
+        'vacancy.addresses.address': 'address',
+        'vacancy.requirement.experience': 'experience',
+        'vacancy.employment': 'employment',
+        'vacancy.schedule': 'schedule',
+        'vacancy.job-name': 'job_name',
+        'vacancy.category.specialisation': 'specialisation',
+        'vacancy.duty': 'duty',
+        'vacancy.requirement.education': 'education',
+        'vacancy.requirement.qualification': 'qualification',
+        'vacancy.term.text': 'term_text',
+        'vacancy.social_protected': 'social_protected',
+        'vacancy.salary_min': 'salary_min',
+        'vacancy.salary_max': 'salary_max',
+        'vacancy.salary': 'salary',
+        'vacancy.currency': 'currency',
+        'vacancy.vac_url': 'vac_url',
+        'vacancy.category.industry': 'industry',
+        'vacancy.creation-date': 'creation_date_from_api',
+        # 'vacancy.modify-date': 'modify_date_from_api',
+    })
+    vacancies['is_closed'] = False
+    vacancies['closing_time'] = np.nan
+    return vacancies
+
+
+def load_references(region, workers=MATCH_WORKERS, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Получить таблицы с кодами и названиями МРИГО/ОКПДТР вместе с индексами сопоставления
+    (из локального снимка, если таблицы в БД не изменились), параметры сопоставления
+    и слова-разделители имен вакансий из БД.
+    Возвращает словарь, в котором также хранится исполнитель сопоставления.
+
+    Входные параметры:
+    region -- двузначный код региона
+    workers -- число процессов для сопоставления
+    snapshot_dir -- каталог снимков справочников (None -- всегда загружать из БД)
+    """
+    references = {'mrigo_table': regions.MRIGO_TABLES.get(region), 'executor': parallel.MatchExecutor(workers)}
+    if references['mrigo_table'] is not None:
+        def build_mrigo():
+            table = db.get_table_from_db_by_table_name(references['mrigo_table'])
+            return {'table': table, 'matcher': mrigo.MrigoMatcher(table)}
+
+        data, from_snapshot = snapshot.cached(db.engine, snapshot_dir, references['mrigo_table'],
+                                              [references['mrigo_table']], build_mrigo)
+        references['mrigo'] = data['table']
+        # при сопоставлении в пуле процессов каждый процесс считает оценки в одном потоке
+        data['matcher'].workers = 1 if workers > 1 else -1
+        references['mrigo_matcher'] = data['matcher']
+        references['executor'].register('mrigo', data['matcher'])
+        print(f"> Таблица с кодами и наименованиям МРИГО успешно загружена{' (снимок)' if from_snapshot else ''}.")
 
+    def build_okpdtr():
         okpdtr_id_name = db.get_table_from_db_by_table_name('blinov.okpdtr')
         okpdtr_assoc_id_name = db.get_table_from_db_by_table_name('blinov.okpdtr_assoc')
-        okpdtr_id_name = pd.concat([okpdtr_id_name, okpdtr_assoc_id_name], sort=False, ignore_index=True)
-        print(f"> Таблица с кодами и наименованиям ОКПДТР успешно загружена.")
-        
-        similarity_levels = db.get_table_from_db_by_table_name('vacs.tv_params')
-        print(f"> Таблица с параметрами для сопоставления успешно загружена.")
-    except:
-        s6 = "Нет доступа к БД в данный момент, либо проблемы с запросом. Заверешение работы."
-        db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message) VALUES (:ep, :msg)").bindparams(ep=6, msg=s6))
-        print(f">>> " + s6)
-        sys.exit(6)
-
-
-    ###################################################################################
-    '''сопоставление адресов вакансий с кодами МРИГО и имен вакансий с кодами ОКПДТР'''
-    ###################################################################################
-    # константы
-    SIMILARITY_LEVEL_MRIGO = similarity_levels['similarity_level_mrigo'].tolist()[-1]
-    SIMILARITY_LEVEL_OKPDTR = similarity_levels['similarity_level_okpdtr'].tolist()[-1]
+        table = pd.concat([okpdtr_id_name, okpdtr_assoc_id_name], sort=False, ignore_index=True)
+        # очистка наименований ОКПДТР выполняется при построении индекса
+        return {'table': table, 'matcher': okpdtr.OkpdtrMatcher(table)}
+
+    data, from_snapshot = snapshot.cached(db.engine, snapshot_dir, 'okpdtr',
+                                          ['blinov.okpdtr', 'blinov.okpdtr_assoc'], build_okpdtr)
+    references['okpdtr'] = data['table']
+    references['okpdtr_matcher'] = data['matcher']
+    # сопоставители регистрируются до первого сопоставления, поэтому пул процессов создается один раз
+    references['executor'].register('okpdtr', data['matcher'])
+    print(f"> Таблица с кодами и наименованиям ОКПДТР успешно загружена{' (снимок)' if from_snapshot else ''}.")
+
+    words = None
+    if storage.table_exists(db.engine, JOB_SPLITS_TABLE):
+        words = db.get_table_from_db_by_table_name(JOB_SPLITS_TABLE)['word'].tolist()
+    references['jobs'] = jobs_.JobNormalizer(words)
+    print(f"> Слова-разделители имен вакансий загружены ({'БД' if words is not None else 'по умолчанию'} -- {len(references['jobs'].words)}).")
+
+    similarity_levels = db.get_table_from_db_by_table_name('vacs.tv_params')
+    references['similarity_level_mrigo'] = similarity_levels['similarity_level_mrigo'].tolist()[-1]
+    references['similarity_level_okpdtr'] = similarity_levels['similarity_level_okpdtr'].tolist()[-1]
+    print(f"> Таблица с параметрами для сопоставления успешно загружена.")
+    return references
+
+
+def match_vacancies(vacancies, region, references, cache=None, metrics=None, top_k=0):
+    """
+    Сопоставить адреса вакансий порции с кодами МРИГО и имена вакансий с кодами ОКПДТР;
+    возвращает отношение 'Вакансии' со столбцами id_mrigo и id_okpdtr и таблицу k лучших
+    кандидатов с оценками (None, если top_k равен 0; см. misc/candidates.py).
+
+    Входные параметры:
+    vacancies -- отношение 'Вакансии' порции
+    region -- двузначный код региона
+    references -- справочники и параметры сопоставления (см. load_references)
+    cache -- постоянный кэш результатов сопоставления (None -- без кэша)
+    metrics -- метрики запуска (время и доля сопоставленных значений)
+    top_k -- число сохраняемых кандидатов (0 -- только лучший код); лучший код выбирается из кандидатов
+    """
+    metrics = metrics if metrics is not None else metrics_.Metrics()
+    found = []
+    mrigo_table = references['mrigo_table']
+    executor = references['executor']
+    SIMILARITY_LEVEL_MRIGO = references['similarity_level_mrigo']
+    SIMILARITY_LEVEL_OKPDTR = references['similarity_level_okpdtr']
+
+    def match_mrigo(keys):
+        # пул процессов создается только если в кэше нет части адресов
+        if top_k:
+            return executor.match('mrigo', keys, top_k, min(mrigo.TOP_MIN_SCORE, SIMILARITY_LEVEL_MRIGO), method='top_many')
+        return executor.match('mrigo', keys)
+
+    def match_okpdtr(keys):
+        if top_k:
+            return executor.match('okpdtr', keys, top_k, min(okpdtr.TOP_MIN_SCORE, SIMILARITY_LEVEL_OKPDTR / 100.0),
+                                  method='top_many')
+        return executor.match('okpdtr', keys, SIMILARITY_LEVEL_OKPDTR / 100.0)
+
+    # кандидаты кэшируются отдельно от лучших кодов
+    suffix = f':top{top_k}' if top_k else ''
 
     print(f"\n> Сопоставление вакансий с кодами МРИГО:")
-    addresses = vacancies['address'].tolist()
-    mrigo = mrigo_id_name['mrigo'].tolist()
-    id_mrigo = mrigo_id_name['id_mrigo'].tolist()
-    d1 = dict(zip(mrigo, id_mrigo))
-
-    for i in range(len(addresses)):
-        addresses[i] = addresses[i].replace('Новосибирская область, ', '', 1)
-        addresses[i] = re.sub(r"[\,\-\.\d]", '', addresses[i])
-        if re.search(r'Новосибирский', addresses[i]) != None:
-            addresses[i] = re.search(r'Новосибирский', addresses[i]).group(0)
-        if re.search(r'рн\s\w+\s', addresses[i]) != None:
-            addresses[i] = re.search(r'рн\s\w+\s', addresses[i]).group(0)
-        if re.search(r'г\s\w+\s', addresses[i]) != None:
-            addresses[i] = re.search(r'г\s\w+\s', addresses[i]).group(0)
-    print(f">> Очистка адресов в отношении 'Вакансии' прошла успешно.")
-
-    matched_list = []
-    print(f">> Началось сопоставление вакансий с кодами МРИГО... (всего итераций -- {len(addresses)})")
-    for _address in addresses:
-        a = process.extractOne(_address, mrigo, scorer=fuzz.token_set_ratio)
-        matched_list.append((d1[a[0]], a[1]))
-
-    # из полученного списка кортежей получаем датафрейм
-    df_with_id_mrigo = pd.DataFrame(matched_list, columns=['id_mrigo', 'score'])
-    # если полученная оценка меньше заданной, то выбранный МРИГО не рассматривается
-    df_with_id_mrigo['fix_id_mrigo'] = np.where(df_with_id_mrigo['score'] > SIMILARITY_LEVEL_MRIGO, df_with_id_mrigo['id_mrigo'], np.nan)
-    # печать результатов (статистики) сопоставления
-    df_with_id_mrigo_ = pd.DataFrame(df_with_id_mrigo['fix_id_mrigo'].tolist(), columns=['fix_id_mrigo'])
-    print(((df_with_id_mrigo_.isnull() | df_with_id_mrigo_.isna()).sum() * 100 / df_with_id_mrigo_.index.size).round(2))
-    
-    # вставка кодов МРИГО в таблицу
-    vacancies.insert(6, 'id_mrigo', df_with_id_mrigo['fix_id_mrigo'].tolist(), True)
-    print(f">> Сопоставление вакансий с кодами МРИГО завершено.")
+    if mrigo_table is None:
+        vacancies.insert(6, 'id_mrigo', np.nan, True)
+        print(f">> Для региона {region} нет справочника МРИГО, сопоставление пропущено.")
+    else:
+        rules = regions.address_rules(region)
+        addresses = regions.clean_addresses(vacancies['address'], vacancies['region_name'], rules).tolist()
+        print(f">> Очистка адресов в отношении 'Вакансии' прошла успешно.")
+
+        print(f">> Началось сопоставление вакансий с кодами МРИГО... (всего адресов -- {len(addresses)}, уникальных -- {len(set(addresses))})")
+        with metrics.stage('mrigo_match'):
+            matched_list = match_cache.cached(
+                cache, f'mrigo:{mrigo_table}{suffix}', match_cache.reference_version(references['mrigo'], SIMILARITY_LEVEL_MRIGO),
+                addresses, match_mrigo)
+        if top_k:
+            found.append(candidates_.frame(vacancies['id'], 'mrigo', matched_list))
+            matched_list = candidates_.best_mrigo(matched_list)
+
+        # из полученного списка кортежей получаем датафрейм
+        df_with_id_mrigo = pd.DataFrame(matched_list, columns=['id_mrigo', 'score'])
+        # если полученная оценка меньше заданной, то выбранный МРИГО не рассматривается
+        df_with_id_mrigo['fix_id_mrigo'] = np.where(df_with_id_mrigo['score'] > SIMILARITY_LEVEL_MRIGO, df_with_id_mrigo['id_mrigo'], np.nan)
+        # печать результатов (статистики) сопоставления
+        df_with_id_mrigo_ = pd.DataFrame(df_with_id_mrigo['fix_id_mrigo'].tolist(), columns=['fix_id_mrigo'])
+        print(((df_with_id_mrigo_.isnull() | df_with_id_mrigo_.isna()).sum() * 100 / df_with_id_mrigo_.index.size).round(2))
+
+        metrics.add('mrigo_total', len(df_with_id_mrigo))
+        metrics.add('mrigo_hits', int(df_with_id_mrigo['fix_id_mrigo'].notna().sum()))
+
+        # вставка кодов МРИГО в таблицу
+        vacancies.insert(6, 'id_mrigo', df_with_id_mrigo['fix_id_mrigo'].tolist(), True)
+        print(f">> Сопоставление вакансий с кодами МРИГО завершено.")
 
     print(f"\n> Сопоставление вакансий с кодами ОКПДТР:")
-    jobs = vacancies['job_name'].tolist()
-    okpdtr = okpdtr_id_name['name'].tolist()
-    id_okpdtr= okpdtr_id_name['id'].tolist()
-    # d2 = dict(zip(okpdtr, id_okpdtr))
-
-    # очистка наименований ОКПДТР
-    for i in range(len(okpdtr)):
-        okpdtr[i] = re.sub(r"[\W\d]", '', okpdtr[i].lower())
-
-    # очистка названий вакансий
-    for i in range(len(jobs)):
-        jobs[i] = re.sub(r"[\W\d]", '', re.split(r'{}'.format('|'.join(oks.dictionary)), jobs[i].lower())[0])
-    print(f">> Очистка имен вакансий и наименований ОКПДТР прошла успешно.")
-
-    # очистка списка с сопоставленными данными
-    print(f">> Началось сопоставление вакансий с кодами ОКПТДР... (всего итераций -- {len(jobs)})")
-    indexes = []
-    for _job in jobs:
-        sub_lst = []
-        for _okpdtr in okpdtr:
-            sub_lst.append(jellyfish.jaro_distance(_okpdtr, _job))
-        max_indexes = find_locate_max(sub_lst)
-        if max_indexes[0] < SIMILARITY_LEVEL_OKPDTR / 100.0:
-            indexes.append(len(okpdtr))
-        else:
-            indexes.append(max_indexes[1][0])
-    id_okpdtr.append(np.nan)
-    okpdtr.append(np.nan)
-    fix_id_okpdtr = [id_okpdtr[indexes[i]] for i in range(len(jobs))]
-    
+    # очистка названий вакансий (повторяющиеся имена очищаются один раз)
+    jobs = references['jobs'].normalize_column(vacancies['job_name'])
+    print(f">> Очистка имен вакансий прошла успешно.")
+
+    # наименования ОКПДТР очищены при построении индекса (см. load_references)
+    print(f">> Началось сопоставление вакансий с кодами ОКПТДР... (всего имен -- {len(jobs)}, уникальных -- {len(set(jobs))})")
+    with metrics.stage('okpdtr_match'):
+        fix_id_okpdtr = match_cache.cached(
+            cache, f'okpdtr{suffix}', match_cache.reference_version(references['okpdtr'], SIMILARITY_LEVEL_OKPDTR),
+            jobs, match_okpdtr)
+    if top_k:
+        found.append(candidates_.frame(vacancies['id'], 'okpdtr', fix_id_okpdtr))
+        fix_id_okpdtr = candidates_.best_okpdtr(fix_id_okpdtr, SIMILARITY_LEVEL_OKPDTR / 100.0)
+
     fix_id_okpdtr_df = pd.DataFrame(fix_id_okpdtr, columns=['fix_id_okpdtr'])
     print(((fix_id_okpdtr_df.isnull() | fix_id_okpdtr_df.isna()).sum() * 100 / fix_id_okpdtr_df.index.size).round(2))
+    metrics.add('okpdtr_total', len(fix_id_okpdtr_df))
+    metrics.add('okpdtr_hits', int(fix_id_okpdtr_df['fix_id_okpdtr'].notna().sum()))
 
     # вставка кодов ОКПДТР в таблицу
     vacancies.insert(11, 'id_okpdtr', fix_id_okpdtr, True)
     # vacancies.to_csv(os.path.join('tables', 'vacancies_updated.csv'), index=None, header=True)
     print(f">> Сопоставление вакансий с кодами ОКПДТР завершено.")
+    return schema.int_codes(vacancies, schema.VACANCIES_INT_CODES), (pd.concat(found, ignore_index=True) if found else None)
 
 
-    #################################################################################
-    """выгрузка/обновление таблиц 'Компании' и дополненной таблицы 'Вакансии' в БД"""
-    #################################################################################
-    print(f"\n> Выгрузка полученных данных в БД:")
-    companies_counter = 0
-    vacancies_counter = 0
-    flag_companies = True
-    # выгрузка компаний
-    try:
-        companies_old = db.get_table_from_db_by_table_name('vacs.companies_tv')
-    except:
-        flag_companies = False
-    # если уже есть отношение 'Компании' в БД
-    if flag_companies:
-        print(f">> Отношение 'Компании' уже содержится в БД. Добавление новых записей...")
-        cond = companies['ogrn'].isin(companies_old['ogrn'])
-        companies_diff = companies.drop(companies[cond].index, inplace=False).reset_index().drop(['index'],axis=1)
-
-        companies_diff = companies_diff.astype({
-            'inn': 'str',
-            'ogrn': 'str',
-            'kpp': 'str',
-        })
-        
-        companies_diff['inn'] = companies_diff['inn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        companies_diff['ogrn'] = companies_diff['ogrn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        companies_diff['kpp'] = companies_diff['kpp'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        
-        companies_diff = companies_diff.replace({'nan': np.nan})
-        if not companies_diff.empty:
+class Loader:
+    """
+    Выгрузка порций отношений 'Компании' и 'Вакансии' в БД (выполняется в отдельном потоке).
+    Ошибка выгрузки порции не прерывает работу: сообщение записывается в журнал один раз за запуск,
+    а строки порции не учитываются в числе загруженных.
+
+    Входные параметры:
+    region -- двузначный код региона
+    upsert -- обновлять в БД компании и вакансии, данные которых изменились
+    metrics -- метрики запуска (время сравнения с БД и выгрузки)
+    checkpoint -- контрольные точки запуска (таблицы, созданные до прерывания запуска)
+    """
+
+    def __init__(self, region, upsert=False, metrics=None, checkpoint=None):
+        self.region = region
+        self.upsert = upsert
+        self.metrics = metrics if metrics is not None else metrics_.Metrics()
+        self.companies_counter = 0
+        self.vacancies_counter = 0
+        # ОГРН, уже переданные на выгрузку в этом запуске (в отношении остается первая запись компании)
+        self.ogrn = set()
+        self.logged = set()
+        # число ошибок выгрузки (порция с ошибкой не отмечается как выгруженная)
+        self.errors = 0
+        self.checkpoint = checkpoint
+        # таблицы, созданные в этом запуске по первой порции: в них загружаются все столбцы порций
+        self.created = checkpoint.created if checkpoint is not None else set()
+        # таблицы, в которых уже проверен столбец row_hash (ALTER TABLE блокирует таблицу, поэтому -- раз за запуск)
+        self.hashed = set()
+
+    def columns(self, table, frame, columns):
+        """
+        Загружаемые столбцы порции: все столбцы для таблицы, созданной в этом запуске,
+        иначе -- заданный список (и row_hash в режиме upsert).
+
+        Входные параметры:
+        table -- имя таблицы со схемой
+        frame -- порция отношения
+        columns -- столбцы, добавляемые в существующую таблицу
+        """
+        return list(frame.columns) if table in self.created else columns + (['row_hash'] if self.upsert else [])
+
+    def log_once(self, message):
+        """
+        Записать сообщение в журнал, если оно еще не записывалось в этом запуске.
+
+        Входные параметры:
+        message -- текст сообщения
+        """
+        self.errors += 1
+        if message not in self.logged:
+            self.logged.add(message)
+            # ошибка записи в журнал (например, БД недоступна) не должна прерывать поток выгрузки
             try:
-                # companies_diff.to_csv('companies_diff.csv', index=False)
-                companies_counter = companies_diff.shape[0]
-                print(f">> Число новых компаний для обновления -- {companies_counter}")
-                companies_diff.to_sql(
-                    'companies_tv_tmp',
-                    con=db.engine,
-                    schema='vacs',
-                    if_exists='replace',
-                    index=False,
-                    method='multi',
-                    dtype={
-                        'ogrn': sa.String,
-                        'inn': sa.String,
-                        'kpp': sa.String,
-                        'companycode': sa.String,
-                        'name': sa.String,
-                        'address': sa.String,
-                        'hr_agency': sa.String,
-                        'url': sa.String,
-                        'site': sa.String,
-                        'phone': sa.String,
-                        'fax': sa.String,
-                        'email': sa.String,
-                    })
-                db.engine.execute('INSERT INTO vacs.companies_tv (ogrn, inn, kpp, companycode, name, address, hr_agency, url, site, phone, fax, email) SELECT ogrn, inn, kpp, companycode, name, address, hr_agency, url, site, phone, fax, email FROM vacs.companies_tv_tmp ON CONFLICT (ogrn) DO NOTHING;')
-                db.engine.execute('DROP TABLE vacs.companies_tv_tmp;')
+                log_to_db(message, region=self.region, metrics=self.metrics)
             except Exception as e:
-                s7 = "Проблема с обновлением отношения 'Компании'. Продолжение работы."
-                db.engine.execute(sa.text("INSERT INTO vacs.tv_log (message) VALUES (:msg)").bindparams(msg=s7))
-                companies_counter = 0
-                print(f">>> " + s7 + str(e))
-            else:
-                print(f">> Выгрузка новых данных в таблицу 'Компании' завершена.")
-        else:
+                print(f">>> Не удалось записать сообщение в журнал: {e}")
+
+    def ensure_hash_column(self, table):
+        """
+        Добавить в таблицу столбец row_hash, если он еще не проверялся в этом запуске.
+
+        Входные параметры:
+        table -- имя таблицы со схемой
+        """
+        if table not in self.hashed:
+            storage.ensure_hash_column(db.engine, table)
+            self.hashed.add(table)
+
+    def add_created(self, table):
+        """
+        Запомнить таблицу, созданную в этом запуске.
+
+        Входные параметры:
+        table -- имя таблицы со схемой
+        """
+        self.created.add(table)
+        if self.checkpoint is not None:
+            self.checkpoint.add_created(table)
+
+    def __call__(self, chunk):
+        companies, vacancies, found = chunk
+        print(f"\n> Выгрузка порции в БД:")
+        self.load_companies(companies)
+        self.load_vacancies(vacancies)
+        if found is not None:
+            self.load_candidates(found, vacancies['id'].tolist())
+
+    def load_candidates(self, found, ids):
+        """
+        Заменить в БД кандидатов сопоставления вакансий порции.
+
+        Входные параметры:
+        found -- таблица кандидатов порции (см. misc/candidates.py)
+        ids -- идентификаторы всех вакансий порции
+        """
+        try:
+            with self.metrics.stage('upload'):
+                storage.replace_candidates(db.engine, found, candidates_.COLUMNS, ids)
+            print(f">> Кандидаты сопоставления с МРИГО/ОКПДТР выгружены ({len(found)} строк).")
+        except Exception as e:
+            s12 = "Проблема с выгрузкой кандидатов сопоставления. Продолжение работы."
+            self.log_once(s12)
+            print(f">>> " + s12 + str(e))
+
+    def load_companies(self, companies):
+        """
+        Выгрузить компании порции, которых еще не было в предыдущих порциях.
+
+        Входные параметры:
+        companies -- отношение 'Компании' порции
+        """
+        companies = companies[~companies['ogrn'].isin(self.ogrn)].reset_index(drop=True)
+        self.ogrn.update(companies['ogrn'].tolist())
+        if companies.empty:
             print(f">> Нет новых компаний для выгрузки в БД.")
-    else:
+            return
+        company_hashes = None
+        if self.upsert:
+            companies['row_hash'] = company_hashes = storage.row_hashes(companies, storage.COMPANIES_HASH_COLUMNS)
+
         try:
-            print(f">> Отношение 'Компании' ранее не содержалось в БД. Создание таблицы и добавление новых записей, если они есть...")
-            companies = companies.astype({
-                'inn' : 'str',
-                'ogrn' : 'str',
-                'kpp' : 'str',
-                })
-            
-            companies['inn'] = companies['inn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            companies['ogrn'] = companies['ogrn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            companies['kpp'] = companies['kpp'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            
-            companies = companies.replace({'nan' : np.nan})
-            # companies.to_csv('companies.csv', index=False)
-            companies_counter = companies.shape[0]
-            print(f">> Число новых компаний для загрузки -- {companies_counter}")
-            companies.to_sql(
-                'companies_tv',
-                con=db.engine,
-                schema='vacs',
-                if_exists='replace',
-                index=False,
-                method='multi',
-                dtype={
-                    'ogrn' : sa.String,
-                    'inn' : sa.String,
-                    'kpp' : sa.String,
-                    'companycode' : sa.String,
-                    'name' : sa.String,
-                    'address' : sa.String,
-                    'hr_agency' : sa.String,
-                    'url' : sa.String,
-                    'site' : sa.String,
-                    'phone' : sa.String,
-                    'fax' : sa.String,
-                    'email' : sa.String,
-                })
-            db.engine.execute('ALTER TABLE vacs.companies_tv ADD PRIMARY KEY(ogrn)') 
-        except:
-            s8 = f"Проблема с выгрузкой нового отношения 'Компании'. Продолжение работы."
-            db.engine.execute(sa.text("INSERT INTO vacs.tv_log (message) VALUES (:msg)").bindparams(msg=s8))
-            companies_counter = 0
-            print(f">>> " + s8)
+            with self.metrics.stage('db_diff'):
+                flag_companies = storage.table_exists(db.engine, 'vacs.companies_tv')
+                if flag_companies:
+                    if self.upsert:
+                        self.ensure_hash_column('vacs.companies_tv')
+                    # новые (и в режиме upsert -- измененные) ОГРН определяются на стороне БД,
+                    # из БД загружаются только ключи текущей порции
+                    new_ogrn = storage.new_keys(db.engine, 'vacs.companies_tv', 'ogrn', companies['ogrn'].tolist(),
+                                                company_hashes)
+        except Exception as e:
+            s7 = "Проблема с обновлением отношения 'Компании'. Продолжение работы."
+            self.log_once(s7)
+            print(f">>> " + s7 + str(e))
+            return
+        # если уже есть отношение 'Компании' в БД
+        if flag_companies:
+            print(f">> Отношение 'Компании' уже содержится в БД. Добавление новых записей...")
+            cond = ~companies['ogrn'].isin(new_ogrn)
+            companies_diff = companies.drop(companies[cond].index, inplace=False).reset_index().drop(['index'],axis=1)
+
+            if not companies_diff.empty:
+                try:
+                    # companies_diff.to_csv('companies_diff.csv', index=False)
+                    companies_counter = companies_diff.shape[0]
+                    print(f">> Число новых{' и измененных' if self.upsert else ''} компаний для обновления -- {companies_counter}")
+                    load_start = time.time()
+                    columns = self.columns('vacs.companies_tv', companies_diff, storage.COMPANIES_COLUMNS)
+                    if self.upsert:
+                        storage.insert_frame(db.engine, companies_diff, 'vacs.companies_tv', 'ogrn', columns,
+                                             update_columns=storage.COMPANIES_HASH_COLUMNS + ['row_hash'])
+                    else:
+                        storage.insert_frame(db.engine, companies_diff, 'vacs.companies_tv', 'ogrn', columns)
+                    print(f">> Время загрузки (COPY): {time.time() - load_start:.2f} с")
+                    self.metrics.record('upload', time.time() - load_start)
+                except Exception as e:
+                    s7 = "Проблема с обновлением отношения 'Компании'. Продолжение работы."
+                    self.log_once(s7)
+                    print(f">>> " + s7 + str(e))
+                else:
+                    self.companies_counter += companies_counter
+                    print(f">> Выгрузка новых данных в таблицу 'Компании' завершена.")
+            else:
+                print(f">> Нет новых компаний для выгрузки в БД.")
         else:
-            print(f">> Создание таблицы 'Компании' и выгрузка новых записей завершена.")
-    
-    # выгрузка вакансий
-    flag_vacancies = True
-    try:
-        vacancies_old = db.get_table_from_db_by_table_name('vacs.vacancies_tv')
-    except:
-        flag_vacancies = False
-
-    # если уже есть отношение 'Вакансии' в БД
-    if flag_vacancies:
-        print(f">> Отношение 'Вакансии' уже содержится в БД. Добавление новых записей, если они есть...")
-        cond = vacancies['id'].isin(vacancies_old['id'])
-        vacancies_diff = vacancies.drop(vacancies[cond].index, inplace=False).reset_index().drop(['index'], axis=1)
-
-        # обновляем is_closed и closing_time
-        id_from_old = set(vacancies_old.id) - set(vacancies.id)
-        if id_from_old:
-            print(f">> Всего закрытых вакансий (потенциально) -- {len(id_from_old)}")
-            db.engine.execute(sa.text("UPDATE vacs.vacancies_tv SET is_closed = TRUE WHERE is_closed = FALSE AND id in :values").bindparams(values=tuple(id_from_old)))
-            db.engine.execute(sa.text("UPDATE vacs.vacancies_tv SET closing_time = now() WHERE closing_time IS NULL AND id in :values").bindparams(values=tuple(id_from_old)))
+            try:
+                print(f">> Отношение 'Компании' ранее не содержалось в БД. Создание таблицы и добавление новых записей, если они есть...")
+                # companies.to_csv('companies.csv', index=False)
+                companies_counter = companies.shape[0]
+                print(f">> Число новых компаний для загрузки -- {companies_counter}")
+                load_start = time.time()
+                storage.create_table(db.engine, companies, 'vacs.companies_tv', storage.COMPANIES_DTYPE, storage.COMPANIES_CONSTRAINTS)
+                print(f">> Время загрузки (COPY): {time.time() - load_start:.2f} с")
+                self.metrics.record('upload', time.time() - load_start)
+            except:
+                s8 = f"Проблема с выгрузкой нового отношения 'Компании'. Продолжение работы."
+                self.log_once(s8)
+                print(f">>> " + s8)
+            else:
+                self.add_created('vacs.companies_tv')
+                self.companies_counter += companies_counter
+                print(f">> Создание таблицы 'Компании' и выгрузка новых записей завершена.")
+
+    def load_vacancies(self, vacancies):
+        """
+        Выгрузить вакансии порции (закрытие отсутствующих вакансий выполняется после всех порций).
+
+        Входные параметры:
+        vacancies -- отношение 'Вакансии' порции
+        """
+        vacancy_hashes = None
+        if self.upsert:
+            vacancies['row_hash'] = vacancy_hashes = storage.row_hashes(vacancies, storage.VACANCIES_HASH_COLUMNS)
+
+        try:
+            with self.metrics.stage('db_diff'):
+                flag_vacancies = storage.table_exists(db.engine, 'vacs.vacancies_tv')
+                if flag_vacancies:
+                    if self.upsert:
+                        self.ensure_hash_column('vacs.vacancies_tv')
+                    # новые (и в режиме upsert -- измененные) вакансии определяются на стороне БД
+                    new_ids = storage.new_keys(db.engine, 'vacs.vacancies_tv', 'id', vacancies['id'].tolist(),
+                                               vacancy_hashes)
+        except Exception as e:
+            s9 = "Проблема с обновлением отношения 'Вакансии'. Продолжение работы."
+            self.log_once(s9)
+            print(f">>> " + s9 + str(e))
+            return
+
+        # если уже есть отношение 'Вакансии' в БД
+        if flag_vacancies:
+            print(f">> Отношение 'Вакансии' уже содержится в БД. Добавление новых записей, если они есть...")
+            cond = ~vacancies['id'].isin(new_ids)
+            vacancies_diff = vacancies.drop(vacancies[cond].index, inplace=False).reset_index().drop(['index'], axis=1)
+
+            if not vacancies_diff.empty:
+                try:
+                    # vacancies_diff.to_csv('vacancies_diff.csv', index=False)
+                    vacancies_counter = vacancies_diff.shape[0]
+                    print(f">> Число новых{' и измененных' if self.upsert else ''} вакансий для загрузки -- {vacancies_counter}")
+                    load_start = time.time()
+                    columns = self.columns('vacs.vacancies_tv', vacancies_diff, storage.VACANCIES_COLUMNS)
+                    if self.upsert:
+                        storage.insert_frame(db.engine, vacancies_diff, 'vacs.vacancies_tv', 'id', columns,
+                                             update_columns=storage.VACANCIES_HASH_COLUMNS + ['row_hash'])
+                    else:
+                        storage.insert_frame(db.engine, vacancies_diff, 'vacs.vacancies_tv', 'id', columns)
+                    print(f">> Время загрузки (COPY): {time.time() - load_start:.2f} с")
+                    self.metrics.record('upload', time.time() - load_start)
+                except Exception as e:
+                    s9 = "Проблема с обновлением отношения 'Вакансии'. Продолжение работы."
+                    self.log_once(s9)
+                    print(f">>> " + s9 + str(e))
+                else:
+                    self.vacancies_counter += vacancies_counter
+                    print(">> Выгрузка новых данных в таблицу 'Вакансии' завершена.")
+            else:
+                print(">> Нет новых вакансий для выгрузки в БД.")
         else:
-            print(f">> Вакансий для закрытия не найдено.")
-        vacancies_diff = vacancies_diff.astype({
-            'region_code': 'str',
-            'ogrn': 'str',
-            'id_mrigo': 'str',
-            'id_okpdtr': 'str',
-        })
-        
-        vacancies_diff['region_code'] = vacancies_diff['region_code'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        vacancies_diff['ogrn'] = vacancies_diff['ogrn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        vacancies_diff['id_mrigo'] = vacancies_diff['id_mrigo'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        vacancies_diff['id_okpdtr'] = vacancies_diff['id_okpdtr'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-        vacancies_diff = vacancies_diff.replace({'nan': np.nan})
-        
-        if not vacancies_diff.empty:
             try:
-                # vacancies_diff.to_csv('vacancies_diff.csv', index=False)
-                vacancies_counter = vacancies_diff.shape[0]
+                print(f">> Отношение 'Вакансии' ранее не содержалось в БД. Создание таблицы и добавление новых записей...")
+                # vacancies.to_csv('vacancies.csv', index=False)
+                vacancies_counter = vacancies.shape[0]
                 print(f">> Число новых вакансий для загрузки -- {vacancies_counter}")
-                vacancies_diff.to_sql(
-                    'vacancies_tv_tmp',
-                    con=db.engine,
-                    schema='vacs',
-                    if_exists='replace',
-                    index=False,
-                    method='multi',
-                    dtype={
-                        'id' : sa.String,
-                        'ogrn' : sa.String,
-                        'source' : sa.String,
-                        'region_code' : sa.String,
-                        'region_name' : sa.String,
-                        'address' : sa.String,
-                        'id_mrigo' : sa.String,
-                        'experience' : sa.String,
-                        'employment' : sa.String,
-                        'schedule' : sa.String,
-                        'job_name' : sa.String,
-                        'id_okpdtr' : sa.String,
-                        'specialisation' : sa.String,
-                        'duty' : sa.String,
-                        'education' : sa.String,
-                        'qualification' : sa.String,
-                        'term_text' : sa.String,
-                        'social_protected' : sa.String,
-                        'salary_min' : sa.Float,
-                        'salary_max' : sa.Float,
-                        'salary' : sa.String,
-                        'currency' : sa.String,
-                        'vac_url' : sa.String,
-                        'creation_date_from_api' : sa.DateTime,
-                        # 'modify_date_from_api' : sa.DateTime,
-                        'download_time': sa.DateTime,
-                        'is_closed': sa.Boolean,
-                        'closing_time': sa.DateTime,
-                    })
-                db.engine.execute('INSERT INTO vacs.vacancies_tv (id, ogrn, source, region_code, address, id_mrigo, experience, employment, schedule, job_name, id_okpdtr, specialisation, duty, education, qualification, term_text, social_protected, salary_min, salary_max, salary, currency, vac_url, creation_date_from_api, download_time, is_closed, closing_time) SELECT id, ogrn, source, region_code, address, id_mrigo, experience, employment, schedule, job_name, id_okpdtr, specialisation, duty, education, qualification, term_text, social_protected, salary_min, salary_max, salary, currency, vac_url, creation_date_from_api, download_time, is_closed, closing_time FROM vacs.vacancies_tv_tmp ON CONFLICT (id) DO NOTHING;')
-                db.engine.execute('DROP TABLE vacs.vacancies_tv_tmp;')
-            except Exception as e:
-                s9 = "Проблема с обновлением отношения 'Вакансии'. Продолжение работы."
-                db.engine.execute(sa.text("INSERT INTO vacs.tv_log (message) VALUES (:msg)").bindparams(msg=s9))
-                vacancies_counter = 0
-                print(f">>> " + s9 + str(e))
+                load_start = time.time()
+                storage.create_table(db.engine, vacancies, 'vacs.vacancies_tv', storage.VACANCIES_DTYPE, storage.VACANCIES_CONSTRAINTS)
+                print(f">> Время загрузки (COPY): {time.time() - load_start:.2f} с")
+                self.metrics.record('upload', time.time() - load_start)
+            except:
+                s10 = f"Проблема с выгрузкой нового отношения 'Вакансии'. Продолжение работы."
+                self.log_once(s10)
+                print(f">>> " + s10)
             else:
-                print(">> Выгрузка новых данных в таблицу 'Вакансии' завершена.")    
+                self.add_created('vacs.vacancies_tv')
+                self.vacancies_counter += vacancies_counter
+                print(f">> Создание таблицы 'Вакансии' и выгрузка новых записей завершена.")
+
+
+def main(region=regions.DEFAULT_REGION, api_workers=API_WORKERS, cache_path=MATCH_CACHE_PATH, upsert=False,
+         chunk_rows=CHUNK_ROWS, match_workers=MATCH_WORKERS, snapshot_dir=SNAPSHOT_DIR, incremental=False,
+         full_sweep_days=incremental_.FULL_SWEEP_DAYS, top_k=0, runs_dir=RUNS_DIR, resume=None, archive_dir=ARCHIVE_DIR,
+         archive_keep=archive.KEEP_FILES, replay=None, replay_full=False, load=True, metrics=None):
+    """
+    Загрузка, сопоставление и выгрузка в БД вакансий одного региона.
+    Данные обрабатываются порциями: пока порция очищается и сопоставляется, следующие страницы
+    загружаются из API, а предыдущая порция выгружается в БД (очереди между этапами ограничены).
+    В инкрементальном режиме загружаются только вакансии, измененные после предыдущего запуска,
+    а отсутствующие в выгрузке вакансии не закрываются (см. misc/incremental.py).
+    Полученные страницы и результаты порций сохраняются в контрольных точках запуска, поэтому
+    прерванный запуск можно продолжить (см. misc/checkpoint.py). Полученные страницы записываются
+    в архив, а при повторной обработке (replay) читаются из файла архива вместо API; в этом случае
+    вакансии закрываются и отметка загрузки сохраняется, только если файл -- полная загрузка региона
+    (replay_full, например последний архив python -m tv fetch при выгрузке командой load). Без выгрузки (load равен False)
+    сопоставленные порции только сохраняются в контрольных точках, а выгружаются при продолжении запуска.
+
+    Входные параметры:
+    region -- двузначный код региона
+    api_workers -- число одновременно загружаемых страниц API
+    cache_path -- файл кэша результатов сопоставления (None -- без кэша)
+    upsert -- обновлять в БД компании и вакансии, данные которых изменились
+    chunk_rows -- число вакансий в порции
+    match_workers -- число процессов для сопоставления с МРИГО/ОКПДТР
+    snapshot_dir -- каталог снимков справочников (None -- загружать справочники из БД)
+    incremental -- загружать только измененные вакансии (периодически выполняется полная загрузка)
+    full_sweep_days -- период полной загрузки в инкрементальном режиме (дней)
+    top_k -- число кандидатов сопоставления, сохраняемых в vacs.vacancies_tv_candidates (0 -- не сохранять)
+    runs_dir -- каталог контрольных точек запусков (None -- без контрольных точек)
+    resume -- продолжить запуск: идентификатор запуска или 'latest' -- последний прерванный (None -- новый запуск)
+    archive_dir -- каталог архива страниц API (None -- не записывать страницы)
+    archive_keep -- число хранимых файлов архива региона (None -- не удалять старые файлы)
+    replay -- файл архива для повторной обработки вместо загрузки из API (None -- загрузка из API)
+    replay_full -- файл replay -- полная загрузка региона: закрывать отсутствующие в нем вакансии
+                   и сохранять отметку загрузки, как при загрузке из API
+    load -- выгружать порции в БД (False -- только сохранить в контрольных точках, нужен runs_dir)
+    metrics -- метрики запуска (misc.metrics.Metrics), заполняются по ходу обработки
+    """
+    if not load and runs_dir is None:
+        raise ValueError("Без выгрузки в БД сопоставленные порции сохраняются в контрольных точках: нужен runs_dir")
+    print(f"> Получение данных (регион {region}):")
+    start = time.time()
+    metrics = metrics if metrics is not None else metrics_.Metrics()
+    # отметка загрузки региона хранится, если в БД есть таблица vacs.tv_fetch_state; до обработки она нужна
+    # только инкрементальной загрузке из API (иначе подключение к БД создается на этапе, которому оно нужно)
+    since = None
+    if incremental and replay is None:
+        try:
+            if storage.table_exists(db.engine, incremental_.STATE_TABLE):
+                since = incremental_.modified_since(incremental_.get_state(db.engine, region),
+                                                    full_sweep_days=full_sweep_days)
+        except Exception as e:
+            print(f">> Отметка загрузки региона недоступна, выполняется полная загрузка: {e}")
+    if incremental:
+        print(f">> Загрузка вакансий, измененных с {since}." if since is not None
+              else f">> Полная загрузка (отметки нет или прошло больше {full_sweep_days} дн. с последней полной загрузки).")
+    metrics.add('incremental', int(since is not None))
+    # наибольшая дата изменения среди полученных вакансий (новая отметка загрузки)
+    modified_to = None
+
+    checkpoint = None
+    if runs_dir is not None:
+        # продолжить можно только запуск с тем же разбиением на порции и теми же данными порций
+        checkpoint = checkpoint_.Checkpoint(
+            runs_dir, region, {'chunk_rows': chunk_rows, 'since': since, 'top_k': top_k, 'replay': replay,
+                                  'replay_full': replay_full}, resume)
+        print(f">> Запуск {checkpoint.run_id}{' продолжается с сохраненных страниц и порций' if checkpoint.resumed else ''}.")
+
+    loader = Loader(region, upsert, metrics, checkpoint)
+
+    def load_chunk(item):
+        index, chunk = item
+        errors = loader.errors
+        loader(chunk)
+        if checkpoint is not None and loader.errors == errors:
+            checkpoint.mark_loaded(index)
+
+    load_worker = pipeline.Worker(load_chunk)
+    archive_path = (archive.archive_path(archive_dir, region, full=since is None)
+                    if archive_dir is not None and replay is None else None)
+    chunks = pipeline.prefetch(get_data_from_api(0, region, api_workers, chunk_rows, metrics,
+                                                 incremental_.api_params(since), checkpoint, archive_path, replay,
+                                                 archive_keep))
+    references = None
+    cache = None
+    # идентификаторы всех вакансий выгрузки (для закрытия отсутствующих в ней вакансий)
+    vacancy_ids = set()
+    chunk_counter = 0
+    try:
+        while True:
+            ################################
+            '''получение данных через API'''
+            ################################
+            try:
+                # получение "сырого" датафрейма со следующей порцией вакансий
+                # (время ожидания показывает, насколько загрузка из API отстает от обработки)
+                with metrics.stage('api_wait'):
+                    df_raw = next(chunks, None)
+            except:
+                s1 = "Сервера TRUDVSEM недоступны. Завершение работы."
+                log_to_db(s1, exit_point=1, region=region, metrics=metrics)
+                print(f">>> " + s1)
+                sys.exit(1)
+            if df_raw is None:
+                break
+            chunk_counter += 1
+            metrics.add('chunks')
+            metrics.add('rows_fetched', df_raw.shape[0])
+            print(f"\n> Порция {chunk_counter} (вакансий -- {df_raw.shape[0]}):")
+
+            dates = incremental_.modify_dates(df_raw)
+            if dates.notna().any():
+                modified_to = max(modified_to, dates.max()) if modified_to is not None else dates.max()
+            if since is not None:
+                # вакансии, не измененные с предыдущего запуска (если API вернул их), не обрабатываются
+                fetched = df_raw.shape[0]
+                df_raw = incremental_.drop_unchanged(df_raw, dates, since)
+                metrics.add('rows_unchanged', fetched - df_raw.shape[0])
+                if df_raw.empty:
+                    continue
+
+            # порция, обработанная до прерывания запуска, не обрабатывается повторно
+            saved = checkpoint.chunk(chunk_counter) if checkpoint is not None and checkpoint.resumed else None
+            if saved is not None:
+                chunk_ids, chunk = saved
+                vacancy_ids.update(chunk_ids)
+                metrics.add('chunks_resumed')
+                if checkpoint.loaded(chunk_counter):
+                    print(f">> Порция выгружена в БД до прерывания запуска.")
+                elif not load:
+                    print(f">> Порция сопоставлена до прерывания запуска.")
+                else:
+                    print(f">> Порция сопоставлена до прерывания запуска, передается на выгрузку.")
+                    with metrics.stage('load_wait'):
+                        load_worker.put((chunk_counter, chunk))
+                continue
+            print(schema.memory_report('разбор страниц', df_raw=df_raw))
+
+            try:
+                with metrics.stage('clean'):
+                    df_raw = prepare_raw(df_raw)
+                    # вакансия, полученная в нескольких порциях, обрабатывается один раз (первая запись)
+                    df_raw = df_raw[~df_raw['vacancy.id'].isin(vacancy_ids)]
+                chunk_ids = df_raw['vacancy.id'].tolist()
+                vacancy_ids.update(chunk_ids)
+                print(schema.memory_report('исходная таблица', df_raw=df_raw))
+            except:
+                s3 = "Проблемы с исходным датафреймом (df_raw). Завершение работы."
+                log_to_db(s3, exit_point=3, region=region, metrics=metrics)
+                print(f">>> " + s3)
+                sys.exit(3)
+            if df_raw.empty:
+                continue
+
+            ######################################################################################
+            '''распределение исходных данных на два отношения -- 'Компании' и 'Вакансии' (2NF)'''
+            ######################################################################################
+            try:
+                with metrics.stage('split'):
+                    companies = split_companies(df_raw)
+                print(">> Новое отношение 'Компании' успешно сформированно")
+            except:
+                s4 = "Проблема с формированием отношения 'Компании'. Завершение работы."
+                log_to_db(s4, exit_point=4, region=region, metrics=metrics)
+                print(f">>> " + s4)
+                sys.exit(4)
+
+            try:
+                with metrics.stage('split'):
+                    vacancies = split_vacancies(df_raw)
+                print(">> Новое отношение 'Вакансии' успешно сформированно.")
+            except Exception as e:
+                s5 = "Проблема с формированием отношения 'Вакансии'. Завершение работы."
+                log_to_db(s5, exit_point=5, region=region, metrics=metrics)
+                print(f">>> " + s5 + ': '+ str(e))
+                sys.exit(5)
+            # исходная таблица порции больше не нужна
+            del df_raw
+            print(schema.memory_report('2NF', companies=companies, vacancies=vacancies))
+
+            ########################################################################################################
+            '''получение из БД таблиц с кодами и названиями МРИГО/ОКПДТР, а также с параметрами для сопоставления'''
+            ########################################################################################################
+            if references is None:
+                try:
+                    with metrics.stage('references'):
+                        references = load_references(region, match_workers, snapshot_dir)
+                except:
+                    s6 = "Нет доступа к БД в данный момент, либо проблемы с запросом. Заверешение работы."
+                    log_to_db(s6, exit_point=6, region=region, metrics=metrics)
+                    print(f">>> " + s6)
+                    sys.exit(6)
+                if cache_path is not None:
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    cache = match_cache.MatchCache(cache_path)
+
+            ###################################################################################
+            '''сопоставление адресов вакансий с кодами МРИГО и имен вакансий с кодами ОКПДТР'''
+            ###################################################################################
+            vacancies, found = match_vacancies(vacancies, region, references, cache, metrics, top_k)
+            print(schema.memory_report('сопоставление', vacancies=vacancies))
+
+            #################################################################################
+            """выгрузка/обновление таблиц 'Компании' и дополненной таблицы 'Вакансии' в БД"""
+            #################################################################################
+            # порция передается потоку выгрузки; при заполненной очереди сопоставление ожидает
+            if checkpoint is not None:
+                with metrics.stage('checkpoint'):
+                    checkpoint.save_chunk(chunk_counter, chunk_ids, (companies, vacancies, found))
+            if load:
+                with metrics.stage('load_wait'):
+                    load_worker.put((chunk_counter, (companies, vacancies, found)))
+
+        if chunk_counter == 0 and since is not None:
+            print(f">> Измененных вакансий не найдено.")
+        elif chunk_counter == 0:
+            s2 = "Данных не найдено, возможно они были перенесены. Завершение работы."
+            log_to_db(s2, exit_point=2, region=region, metrics=metrics)
+            print(f">>> " + s2)
+            sys.exit(2)
+    finally:
+        chunks.close()
+        if cache is not None:
+            print(f">> Кэш сопоставления: найдено {cache.hits}, сопоставлено заново {cache.misses}.")
+            metrics.add('cache_hits', cache.hits)
+            metrics.add('cache_total', cache.hits + cache.misses)
+            cache.close()
+        if references is not None:
+            references['executor'].close()
+        with metrics.stage('load_wait'):
+            load_worker.close()
+
+    # закрытие вакансий региона, которых нет в выгрузке, -- только после получения всех порций
+    # и только при полной загрузке
+    closed_counter = 0
+    if not load:
+        print(f">> Порции сопоставлены и сохранены в запуске {checkpoint.run_id}; выгрузка в БД -- python -m tv load.")
+    elif replay is not None and not replay_full:
+        print(f">> Повторная обработка архива (не полной загрузки региона или указанного явно): "
+              f"закрытие отсутствующих в выгрузке вакансий не выполняется, отметка загрузки не изменяется.")
+    elif since is not None:
+        print(f">> Инкрементальная загрузка: закрытие отсутствующих в выгрузке вакансий не выполняется.")
+    elif storage.table_exists(db.engine, 'vacs.vacancies_tv'):
+        try:
+            with metrics.stage('close'):
+                closed_counter = storage.close_vacancies(db.engine, list(vacancy_ids), region)
+        except Exception as e:
+            s11 = "Проблема с закрытием вакансий, отсутствующих в выгрузке. Продолжение работы."
+            log_to_db(s11, region=region, metrics=metrics)
+            print(f">>> " + s11 + str(e))
         else:
-            print(">> Нет новых вакансий для выгрузки в БД.")
-    else:
+            if closed_counter:
+                print(f">> Всего закрыто вакансий -- {closed_counter}")
+            else:
+                print(f">> Вакансий для закрытия не найдено.")
+    if load:
+        print(f">> Выгрузка данных в БД завершена.")
+
+    # отметка загрузки сдвигается, только если все порции выгружены без ошибок
+    if load and not loader.logged and (replay is None or replay_full):
         try:
-            print(f">> Отношение 'Вакансии' ранее не содержалось в БД. Создание таблицы и добавление новых записей...")
-            vacancies = vacancies.astype({
-                'region_code' : 'str',
-                'ogrn' : 'str',
-                'id_mrigo' : 'str',
-                'id_okpdtr' : 'str',
-                })
-            
-            vacancies['region_code'] = vacancies['region_code'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            vacancies['ogrn'] = vacancies['ogrn'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            vacancies['id_mrigo'] = vacancies['id_mrigo'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            vacancies['id_okpdtr'] = vacancies['id_okpdtr'].apply(lambda s: re.split(r'[.]', s)[0] if not pd.isna(s) else s)
-            vacancies = vacancies.replace({'nan' : np.nan})
-            # vacancies.to_csv('vacancies.csv', index=False)
-            vacancies_counter = vacancies.shape[0]
-            print(f">> Число новых вакансий для загрузки -- {vacancies_counter}")
-            vacancies.to_sql(
-                'vacancies_tv',
-                con=db.engine,
-                schema='vacs',
-                if_exists='replace',
-                index=False,
-                method='multi',
-                dtype={
-                    'id' : sa.String,
-                    'ogrn' : sa.String,
-                    'source' : sa.String,
-                    'region_code' : sa.String,
-                    'region_name' : sa.String,
-                    'address' : sa.String,
-                    'id_mrigo' : sa.String,
-                    'experience' : sa.String,
-                    'employment' : sa.String,
-                    'schedule' : sa.String,
-                    'job_name' : sa.String,
-                    'id_okpdtr' : sa.String,
-                    'specialisation' : sa.String,
-                    'duty' : sa.String,
-                    'education' : sa.String,
-                    'qualification' : sa.String,
-                    'term_text' : sa.String,
-                    'social_protected' : sa.String,
-                    'salary_min' : sa.Float,
-                    'salary_max' : sa.Float,
-                    'salary' : sa.String,
-                    'currency' : sa.String,
-                    'vac_url' : sa.String,
-                    'creation_date_from_api' : sa.DateTime,
-                    # 'modify_date_from_api' : sa.DateTime,
-                    'download_time': sa.DateTime,
-                    'is_closed': sa.Boolean,
-                    'closing_time': sa.DateTime,
-                })
-            db.engine.execute('ALTER TABLE vacs.vacancies_tv ADD PRIMARY KEY(id)')
-            db.engine.execute('ALTER TABLE vacs.vacancies_tv ADD CONSTRAINT vac_comp_f_key FOREIGN KEY (ogrn) REFERENCES vacs.companies_tv (ogrn)')
-            db.engine.execute('ALTER TABLE vacs.vacancies_tv ADD CONSTRAINT vac_mrigo_f_key FOREIGN KEY (id_mrigo) REFERENCES blinov.mrigo (id_mrigo)')
-            db.engine.execute('ALTER TABLE vacs.vacancies_tv ADD CONSTRAINT vac_okpdtr_f_key FOREIGN KEY (id_okpdtr) REFERENCES blinov.okpdtr (id)')
-        except:
-            s10 = f"Проблема с выгрузкой нового отношения 'Вакансии'. Продолжение работы."
-            db.engine.execute(sa.text("INSERT INTO vacs.tv_log (message) VALUES (:msg)").bindparams(msg=s10))
-            vacancies_counter = 0
-            print(f">>> " + s10)
+            if storage.table_exists(db.engine, incremental_.STATE_TABLE):
+                incremental_.save_state(db.engine, region,
+                                        modified_to.to_pydatetime() if modified_to is not None else None,
+                                        full_sweep=since is None)
+        except Exception as e:
+            print(f">>> Не удалось сохранить отметку загрузки региона: {e}")
+
+    if checkpoint is not None and load:
+        if loader.logged:
+            print(f">> Не все порции выгружены в БД; запуск {checkpoint.run_id} можно продолжить ключом --resume.")
         else:
-            print(f">> Создание таблицы 'Вакансии' и выгрузка новых записей завершена.")
-    print(f">> Выгрузка данных в БД завершена.")
-    
+            checkpoint.finish()
+
     end = time.time()
     print(f"\n> Всего потребовалось времени: {end - start}")
-    
-    return companies_counter, vacancies_counter
+    print(metrics.summary())
 
+    return loader.companies_counter, loader.vacancies_counter, closed_counter
 
-if __name__ == "__main__":
-    companies_counter, vacancies_counter = main()
+
+def run_region(region, profile_dir=None, profiler='cprofile', metrics=None, **options):
+    """
+    Обработать один регион; ошибка в регионе не прерывает обработку остальных.
+    Возвращает код завершения (точку выхода), число загруженных компаний и вакансий и число закрытых вакансий.
+
+    Входные параметры:
+    region -- двузначный код региона
+    profile_dir -- каталог для результатов профилирования (None -- без профилирования)
+    profiler -- 'cprofile' или 'pyinstrument'
+    metrics -- метрики запуска (misc.metrics.Metrics; по умолчанию новые)
+    options -- прочие параметры main (api_workers, cache_path, upsert, chunk_rows, match_workers, snapshot_dir,
+               incremental, full_sweep_days, top_k, runs_dir, resume, archive_dir, archive_keep, replay,
+               replay_full, load)
+    """
+    metrics = metrics if metrics is not None else metrics_.Metrics()
+    profile_path = None
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        profile_path = os.path.join(profile_dir, f"tv_{region}.{'html' if profiler == 'pyinstrument' else 'prof'}")
+    try:
+        with metrics_.profiled(profile_path, profiler):
+            companies_counter, vacancies_counter, closed_counter = main(region, metrics=metrics, **options)
+    except SystemExit as e:
+        return region, e.code, 0, 0, 0
+    except Exception as e:
+        # необработанная ошибка региона не прерывает обработку остальных (как и в пуле процессов)
+        print(f">>> Регион {region}: необработанная ошибка -- {e}")
+        return region, 1, 0, 0, 0
     s0 = "Программа успешно завершила свою работу."
-    db.engine.execute(sa.text("INSERT INTO vacs.tv_log (exit_point, message, num_of_companies, num_of_vacancies) VALUES (:ep, :msg, :noc, :nov)").bindparams(ep=0, msg=s0, noc=companies_counter, nov=vacancies_counter))
-    print(f"\n> " + s0)
\ No newline at end of file
+    try:
+        log_to_db(s0, exit_point=0, region=region, num_of_companies=companies_counter,
+                  num_of_vacancies=vacancies_counter, num_of_closed=closed_counter, metrics=metrics)
+    except Exception as e:
+        print(f">>> Регион {region}: не удалось записать сообщение в журнал -- {e}")
+    print(f"\n> " + s0)
+    return region, 0, companies_counter, vacancies_counter, closed_counter
+
+
+def init_worker():
+    """Не использовать в дочернем процессе соединения, открытые родительским процессом."""
+    db.engine.dispose()
+
+
+def run_regions(region_list, processes=1, **options):
+    """
+    Обработать несколько регионов в пуле процессов.
+    Если таблиц 'Компании'/'Вакансии' еще нет в БД, первый регион обрабатывается отдельно,
+    чтобы таблицы не создавались одновременно несколькими процессами.
+
+    Входные параметры:
+    region_list -- список двузначных кодов регионов
+    processes -- число процессов
+    options -- прочие параметры run_region и main
+    """
+    results = []
+    pending = list(region_list)
+    if processes > 1 and pending and not (storage.table_exists(db.engine, 'vacs.companies_tv')
+                                          and storage.table_exists(db.engine, 'vacs.vacancies_tv')):
+        results.append(run_region(pending.pop(0), **options))
+    if processes <= 1:
+        results += [run_region(region, **options) for region in pending]
+        return results
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker) as pool:
+        futures = {region: pool.submit(run_region, region, **options) for region in pending}
+        for region, future in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f">>> Регион {region}: необработанная ошибка -- {e}")
+                results.append((region, 1, 0, 0, 0))
+    return results
+
+
+if __name__ == "__main__":
+    # python tv_.py [параметры] -- то же, что python -m tv run [параметры]
+    import tv
+    tv.main(['run'] + sys.argv[1:])
@@ -0,0 +1,2 @@
+"C:\Users\blinov.2016\Miniconda3\python.exe" "D:\YandexDisk\Work\tv\tv_.py" --serve --incremental --upsert
+pause
\ No newline at end of file